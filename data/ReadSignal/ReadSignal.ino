@@ -75,6 +75,9 @@ void loop(){
       if (x == ADCMeasureSelection){
         Serial.print("START\nSTART\nSTART\n");
 
+        // The prints below block on the serial buffer, so the samples are far more than 10us
+        // apart. The time the capture took is reported so the host knows the real interval
+        unsigned long captureStart = micros();
         for(int i=0; i<=499; i++){
             Serial.print(i+1);
             Serial.print(": ");
@@ -84,6 +87,9 @@ void loop(){
             //(500 samples delayed by 10us each results in a sampled time interval of 5ms)
             delayMicroseconds(10); 
         }
+        Serial.print("ELAPSED: ");
+        Serial.print(micros() - captureStart);
+        Serial.print("\n");
     
         Serial.print("FINISHED\nFINISHED\nFINISHED\n");
         delay(10); //3016/1508 Delay to load the FPGA
@@ -0,0 +1,135 @@
+"""
+BitMatrix.py
+------------
+
+A population-by-bits matrix of the circuits' modifiable bits, used for the diversity measures.
+
+Bitstreams are accepted either as 0/1 integers (FULLY_SIM circuits) or as the ASCII bytes
+48/49 read from hardware files; both are reduced to 0/1 with ``& 1``. Every measure is computed
+from the matrix with NumPy reductions, and pairwise distances use packed bits and popcounts.
+"""
+
+import numpy as np
+
+# Upper bound on the size of the temporary XOR array used when building the pairwise distance matrix
+PAIRWISE_BLOCK_BYTES = 64 * 1024 * 1024
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    # NumPy < 2.0 has no popcount ufunc, so use a lookup table over every byte value
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    def _popcount(packed):
+        return _POPCOUNT_TABLE[packed]
+
+class BitMatrix:
+    """
+    Holds one row of bits per circuit and computes population-wide statistics over them.
+    """
+
+    def __init__(self):
+        self.__bits = np.zeros((0, 0), dtype=np.uint8)
+        self.__frequencies = np.zeros(0, dtype=np.int64)
+
+    def update(self, bitstreams):
+        """
+        Replaces the contents of the matrix
+
+        Parameters
+        ----------
+        bitstreams : iterable[list[int]]
+            The modifiable bits of every circuit, as 0/1 or as ASCII '0'/'1' byte values
+        """
+        rows = [np.asarray(bitstream, dtype=np.uint8) for bitstream in bitstreams]
+        if len(rows) == 0:
+            self.__bits = np.zeros((0, 0), dtype=np.uint8)
+        else:
+            self.__bits = np.stack(rows) & 1
+        self.__frequencies = self.__bits.sum(axis=0, dtype=np.int64)
+
+    def get_bits(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            The (circuits x bits) matrix of 0/1 values
+        """
+        return self.__bits
+
+    def get_bit_frequencies(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            The number of circuits with a 1 at each bit
+        """
+        return self.__frequencies
+
+    def avg_hamming_dist(self):
+        """
+        Average Hamming distance over all pairs of circuits.
+        Every bit contributes (number of ones) * (number of zeros) differing pairs.
+
+        Returns
+        -------
+        float
+            The average pairwise Hamming distance, or 0 for fewer than two circuits
+        """
+        n = self.__bits.shape[0]
+        if n < 2:
+            return 0.0
+        num_pairs = n * (n - 1) / 2
+        ones = self.__frequencies
+        return float((ones * (n - ones)).sum() / num_pairs)
+
+    def count_differing_bits(self):
+        """
+        Returns
+        -------
+        int
+            The number of bits that are not the same in every circuit
+        """
+        n = self.__bits.shape[0]
+        return int(np.count_nonzero((self.__frequencies != 0) & (self.__frequencies != n)))
+
+    def count_unique(self):
+        """
+        Returns
+        -------
+        int
+            The number of distinct bitstreams
+        """
+        if self.__bits.shape[0] == 0:
+            return 0
+        return int(np.unique(np.packbits(self.__bits, axis=1), axis=0).shape[0])
+
+    def pairwise_hamming(self):
+        """
+        Full matrix of Hamming distances between every pair of circuits, computed by XORing
+        packed rows and counting the set bits.
+
+        Returns
+        -------
+        np.ndarray
+            (circuits x circuits) array where entry i, j is the distance between circuits i and j
+        """
+        packed = np.packbits(self.__bits, axis=1)
+        n = packed.shape[0]
+        distances = np.zeros((n, n), dtype=np.int64)
+        block_rows = max(1, PAIRWISE_BLOCK_BYTES // max(1, packed.size))
+        for start in range(0, n, block_rows):
+            block = packed[start:start + block_rows]
+            distances[start:start + block.shape[0]] = _popcount(block[:, None, :] ^ packed[None, :, :]).sum(axis=2, dtype=np.int64)
+        return distances
+
+    def differing_bits_str(self):
+        """
+        Encodes the number of circuits with a 1 at each bit as one printable ASCII character per bit
+        (the count plus 32)
+
+        Returns
+        -------
+        str
+            The encoded bit frequencies
+        """
+        return (self.__frequencies + 32).astype("<u4").tobytes().decode("utf-32-le")
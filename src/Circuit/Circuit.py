@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from StageTimer import TIMER
+from Telemetry import TELEMETRY
 import Config
 
 class Circuit(ABC):
@@ -39,8 +41,28 @@ class Circuit(ABC):
     def collect_data_once(self):
         """
         Collects one round of measurement data. Can be performed multiple times before each calculate_fitness call
+
+        Returns
+        -------
+        list[float]
+            The data collected in this round
         """
-        self._data.extend(self._get_measurement())
+        measurement = self._get_measurement()
+        self._data.extend(measurement)
+        return measurement
+
+    def estimate_fitness(self, data) -> float:
+        """
+        Returns the fitness the given data would give on its own, such as a single round of
+        measurement when racing. Neither the collected data nor the circuit's fitness change.
+        Subclasses whose fitness calculation changes other state restore it as well
+        """
+        collected = self._data
+        self._data = list(data)
+        try:
+            return self._calculate_fitness()
+        finally:
+            self._data = collected
 
     def get_extra_data(self, key):
         return 0
@@ -64,7 +86,8 @@ class Circuit(ABC):
         Calculates and returns the fitness indicated by the Circuit's currently-collected data
         """
         self._fitness = self._calculate_fitness()
-        self._update_all_live_data()
+        with TIMER.stage("alllivedata"):
+            self._update_all_live_data()
         return self._fitness
 
     @abstractmethod
@@ -105,6 +128,32 @@ class Circuit(ABC):
         """
         pass
 
+    @abstractmethod
+    def crossover_mask(self, parent, mask):
+        """
+        Copy the modifiable bits selected by mask from the parent
+
+        Parameters
+        ----------
+        parent : Circuit
+            The other circuit the crossover is being performed with
+        mask : np.ndarray
+            Boolean array with one entry per modifiable bit. True bits are copied from the parent
+        """
+        pass
+
+    @abstractmethod
+    def set_bitstream(self, bits):
+        """
+        Overwrite every modifiable bit, e.g. with a genome saved from another circuit
+
+        Parameters
+        ----------
+        bits : np.ndarray
+            The 0/1 modifiable bits, in get_bitstream order
+        """
+        pass
+
     @abstractmethod
     def copy_from(self, other):
         """
@@ -120,6 +169,13 @@ class Circuit(ABC):
     def get_fitness(self):
         return self._fitness
 
+    def set_fitness(self, fitness):
+        """
+        Sets the fitness of a circuit that was not measured this generation, such as an
+        offspring the surrogate screened out
+        """
+        self._fitness = fitness
+
     @abstractmethod
     def get_file_attribute(self, name: str):
         pass
@@ -163,6 +219,7 @@ class Circuit(ABC):
         # Write these new lines to the file
         with open("workspace/alllivedata.log", "w+") as allLive:
             allLive.writelines(lines)
+        TELEMETRY.set_line("alllivedata.log", index, lines[index])
 
     @staticmethod
     def _calculate_variance_fitness(waveform):
@@ -2,13 +2,37 @@ from mmap import mmap
 from pathlib import Path
 from shutil import copyfile
 from subprocess import run
+from collections import namedtuple
 import os
+import hashlib
+import numpy as np
 from Circuit.Circuit import Circuit
+from StageTimer import TIMER
 import Config
 import Logger
 
 COMPILE_CMD = "icepack"
 
+# Replace these magic values with a more generalized solution
+# Magic values are indicative of the underlying hardware (ice40hx1k)
+# A different model will require different magic values (i.e. ice40hx8k)
+VALID_TILE_X = range(4, 10)
+VALID_TILE_Y = range(1, 17)
+
+# Where the modifiable bits of a hardware file are. Every field is an array with one entry per
+# modifiable bit, in the order _run_at_each_modifiable visits them:
+#   offsets: position of the bit relative to the start of the file body (after the FILE_ATTRIBUTES line)
+#   rows, cols: row (1-indexed) and column of the bit within its logic tile
+#   tile_x, tile_y: coordinates of the bit's logic tile
+#   tile_offsets: position of the bit relative to the start of its tile's ".logic_tile" header
+#   line_sizes: length (including the newline) of the lines of bits in the bit's tile
+ModifiableLayout = namedtuple("ModifiableLayout",
+    ["offsets", "rows", "cols", "tile_x", "tile_y", "tile_offsets", "line_sizes"])
+
+# Layouts are the same for every circuit built from the same template, so they are computed once.
+# Keyed by (length of the file body, accessed columns, routing type)
+_LAYOUT_CACHE = {}
+
 class FileBasedCircuit(Circuit):
     """
     Represents a Circuit that is based on an ASC file, in a format
@@ -22,6 +46,9 @@ class FileBasedCircuit(Circuit):
 
         self._rand = rand
         self._logger = logger
+        # Fixed for the run, and needed every time the modifiable bits are looked up
+        self._accessed_columns = config.get_accessed_columns()
+        self._routing_type = config.get_routing_type()
 
         asc_dir = config.get_asc_directory()
         bin_dir = config.get_bin_directory()
@@ -52,29 +79,37 @@ class FileBasedCircuit(Circuit):
         copyfile(other._hardware_filepath, self._hardware_filepath)
 
     def mutate(self):
-        def mutate_bit(bit, row, col, *rest):
-            if self._config.get_mutation_probability() >= self._rand.uniform(0,1):
-                # Set this bit to either a 0 or 1 randomly
-                # Keep in mind that these are BYTES that we are modifying, not characters
-                # Therefore, we have to set it to either ASCII 0 (48) or ASCII 1 (49), not actual 0 or 1, which represent different characters
-                # and will corrupt the file if we mutate in this way
-                # 48 = 0, 49 = 1. To flip, just need to do (48+49) - the current value (48+49=97)
-                # This now always flips the bit instead of randomly assigning it every time
-                # Note: If prev != 48 or 49, then we changed the wrong value because it was not a 0 or 1 previously
+        layout = self.get_modifiable_layout()
+        # Draw for every modifiable bit at once
+        flips = self._config.get_snapshot().mutation_probability >= self._rand.uniform(0, 1, layout.offsets.size)
+        # Keep in mind that these are BYTES that we are modifying, not characters
+        # Therefore, we have to flip between ASCII 0 (48) and ASCII 1 (49), not actual 0 or 1, which represent different characters
+        # and will corrupt the file if we mutate in any other way
+        # 48 = 0, 49 = 1. To flip, just need to do (48+49) - the current value (48+49=97)
+        # Note: If prev != 48 or 49, then we changed the wrong value because it was not a 0 or 1 previously
+        bits = np.frombuffer(self._hardware_file, dtype=np.uint8)
+        positions = self._body_start(self._hardware_file) + layout.offsets[flips]
+        previous = bits[positions]
+        bits[positions] = 97 - previous
+        # Checked once, since building the message for every flipped bit is expensive
+        if self._logger.is_enabled(4):
+            for row, col, bit in zip(layout.rows[flips].tolist(), layout.cols[flips].tolist(), previous.tolist()):
                 self._log_event(4, "Mutating:", self, "@(", row, ",", col, ") previous was", bit)
-                return 97 - bit
-        self._run_at_each_modifiable(mutate_bit)
 
     def randomize_bitstream(self):
-        def randomize_bit(*rest):
-            return self._rand.integers(48, 50)
-        self._run_at_each_modifiable(randomize_bit)
+        # Set every modifiable bit to ASCII 0 (48) or ASCII 1 (49)
+        offsets = self.get_modifiable_layout().offsets
+        bits = np.frombuffer(self._hardware_file, dtype=np.uint8)
+        bits[self._body_start(self._hardware_file) + offsets] = self._rand.integers(48, 50, offsets.size)
 
     def crossover(self, parent, crossover_point: int):
         """
         Copy part of the hardware file from parent into this circuit's hardware file.
         Additionally, need to copy the parent's info line
 
+        In each modifiable tile, this copies the modifiable bits that lie in the line-sized window
+        starting crossover_point - 1 lines after the tile's ".logic_tile" header.
+
         Parameters
         ----------
         parent : Circuit
@@ -86,32 +121,137 @@ class FileBasedCircuit(Circuit):
         # further down; fix manually to avoid confusion
         crossover_point = int(crossover_point)
 
-        parent_hw_file = parent.get_hardware_file()
-        # Need to keep track separately since we can have different-length comments
-        parent_tile = parent_hw_file.find(b".logic_tile")
-        my_tile = self._hardware_file.find(b".logic_tile")
-        while my_tile > 0:
-            my_pos = my_tile + len(".logic_tile")
-            parent_pos = parent_tile + len(".logic_tile")
-            if self.__tile_is_included(self._hardware_file, my_pos):
-                line_start = parent_hw_file.find(b"\n", parent_tile) + 1
-                line_end = parent_hw_file.find(b"\n", line_start + 1)
-                line_size = line_end - line_start + 1
-
-                my_pos = my_tile + line_size * (crossover_point - 1)
-                parent_pos = parent_tile + line_size * (crossover_point - 1)
+        layout = self.get_modifiable_layout()
+        window_start = layout.line_sizes * (crossover_point - 1)
+        mask = (layout.tile_offsets >= window_start) & (layout.tile_offsets < window_start + layout.line_sizes)
+        self.crossover_mask(parent, mask)
 
-                data = parent_hw_file[parent_pos:parent_pos + line_size]
-                self.update_hardware_file(my_pos, line_size, data)
+    def crossover_mask(self, parent, mask):
+        """
+        Copy the modifiable bits selected by mask from parent into this circuit's hardware file,
+        along with the parent's source population
 
-            parent_tile = parent_hw_file.find(b".logic_tile", parent_tile + 1)
-            my_tile = self._hardware_file.find(b".logic_tile", my_tile + 1)
+        Parameters
+        ----------
+        parent : FileBasedCircuit
+            The circuit being crossed with
+        mask : np.ndarray
+            Boolean array with one entry per modifiable bit (in get_bitstream order). True bits are copied from the parent
+        """
+        offsets = self.get_modifiable_layout().offsets[mask]
+        mine = np.frombuffer(self._hardware_file, dtype=np.uint8)
+        theirs = np.frombuffer(parent.get_hardware_file(), dtype=np.uint8)
+        mine[self._body_start(self._hardware_file) + offsets] = theirs[parent._body_start(parent.get_hardware_file()) + offsets]
         
         # Need to set our source population to our parent's
         src_pop = parent.get_file_attribute("src_population")
         if src_pop != None:
             self.set_file_attribute("src_population", src_pop)
 
+    def set_bitstream(self, bits):
+        offsets = self.get_modifiable_layout().offsets
+        mine = np.frombuffer(self._hardware_file, dtype=np.uint8)
+        # ASCII 0 (48) or ASCII 1 (49)
+        mine[self._body_start(self._hardware_file) + offsets] = 48 + np.asarray(bits, dtype=np.uint8)
+
+    def get_modifiable_layout(self):
+        """
+        Returns
+        -------
+        ModifiableLayout
+            Where the modifiable bits of this circuit's hardware file are
+        """
+        return FileBasedCircuit.get_modifiable_layout_st(
+            self._hardware_file,
+            self._accessed_columns,
+            self._routing_type
+        )
+
+    @staticmethod
+    def get_modifiable_layout_st(hardware_file, accessible_columns, routing_type):
+        """
+        Finds the modifiable bits of a hardware file. Results are cached, so this only scans the
+        file the first time a layout is requested.
+
+        Parameters
+        ----------
+        hardware_file : mmap | bytes
+            The contents of the hardware file
+        accessible_columns : list[str]
+            The accessible columns
+        routing_type: str
+            The routing type (MOORE or NEWSE)
+
+        Returns
+        -------
+        ModifiableLayout
+            Where the modifiable bits are
+        """
+        body_start = FileBasedCircuit._body_start(hardware_file)
+        key = (len(hardware_file) - body_start, tuple(accessible_columns), routing_type)
+        layout = _LAYOUT_CACHE.get(key)
+        if layout is None:
+            layout = FileBasedCircuit.__scan_layout(hardware_file, body_start, accessible_columns, routing_type)
+            _LAYOUT_CACHE[key] = layout
+        return layout
+
+    @staticmethod
+    def __scan_layout(hardware_file, body_start, accessible_columns, routing_type):
+        """
+        Walks the logic tiles of a hardware file and records every modifiable bit
+        """
+        # Determine which rows we can modify
+        # TODO ALIFE2021 The routing protocol here is dated and needs to mimic that of the Tone Discriminator
+        if routing_type == "MOORE":
+            rows = [1, 2, 13]
+        elif routing_type == "NEWSE":
+            rows = [1, 2]
+        columns = [int(col) for col in accessible_columns]
+
+        fields = {field: [] for field in ModifiableLayout._fields}
+        # Set tile to the first location of the substring ".logic_tile"
+        # The b prefix makes the string an instance of the "bytes" type
+        # The .logic_tile header indicates that there is a tile, so the "tile" variable stores the starting point of the current tile
+        tile = hardware_file.find(b".logic_tile")
+        while tile > 0:
+            # Check if the position is legal to modify
+            x, y = FileBasedCircuit.__tile_coords(hardware_file, tile + len(".logic_tile"))
+            if x in VALID_TILE_X and y in VALID_TILE_Y:
+                # Find the start and end of the line; the positions of the \n newline just before and at the end of this line
+                # The start is the newline position + 1, so the first valid bit character
+                # This finds the length of a standard line of bits (so the width of each data-containing line in this tile)
+                line_start = hardware_file.find(b"\n", tile) + 1
+                line_end = hardware_file.find(b"\n", line_start + 1)
+                line_size = line_end - line_start + 1
+                for row in rows:
+                    for col in columns:
+                        # Our position is the start of the first line, plus the line size multiplied to get to our desired row,
+                        # and finally added to the column
+                        pos = line_start + line_size * (row - 1) + col
+                        fields["offsets"].append(pos - body_start)
+                        fields["rows"].append(row)
+                        fields["cols"].append(col)
+                        fields["tile_x"].append(x)
+                        fields["tile_y"].append(y)
+                        fields["tile_offsets"].append(pos - tile)
+                        fields["line_sizes"].append(line_size)
+
+            # Find the next logic tile, and start again
+            # Will return -1 if .logic_tile isn't found, and the while loop will exit
+            tile = hardware_file.find(b".logic_tile", tile + 1)
+
+        return ModifiableLayout(**{field: np.array(values, dtype=np.int64) for field, values in fields.items()})
+
+    @staticmethod
+    def _body_start(hardware_file):
+        """
+        Returns the position just after the FILE_ATTRIBUTES comment line, if the file starts with one.
+        Everything after this point has the same layout for every circuit built from the same template.
+        """
+        if hardware_file[:len(b".comment FILE_ATTRIBUTES")] == b".comment FILE_ATTRIBUTES":
+            return hardware_file.find(b"\n") + 1
+        return 0
+
     def _run_at_each_modifiable(self, lambda_func, hardware_file = None, accessible_columns = None,
         routing_type=None):
         """
@@ -142,52 +282,20 @@ class FileBasedCircuit(Circuit):
             hardware_file = self._hardware_file
 
         if accessible_columns is None:
-            accessible_columns = self._config.get_accessed_columns()
+            accessible_columns = self._accessed_columns
 
         if routing_type is None:
-            routing_type = self._config.get_routing_type()
-
-        # Set tile to the first location of the substring ".logic_tile"
-        # The b prefix makes the string an instance of the "bytes" type
-        # The .logic_tile header indicates that there is a tile, so the "tile" variable stores the starting point of the current tile
-        tile = hardware_file.find(b".logic_tile")
-        
-        while tile > 0:
-            # Set pos to the position of this tile, but with the length of ".logic_tile" added so it is in front of where we have the x/y coords
-            pos = tile + len(".logic_tile")
-            
-            # Check if the position is legal to modify
-            if self.__tile_is_included(hardware_file, pos):
-                # Find the start and end of the line; the positions of the \n newline just before and at the end of this line
-                # The start is the newline position + 1, so the first valid bit character
-                # line_size is self-explanatory
-                # This finds the length of a standard line of bits (so the width of each data-containing line in this tile)
-                line_start = hardware_file.find(b"\n", tile) + 1
-                line_end = hardware_file.find(b"\n", line_start + 1)
-                line_size = line_end - line_start + 1
-
-                # Determine which rows we can modify
-                # TODO ALIFE2021 The routing protocol here is dated and needs to mimic that of the Tone Discriminator
-                if routing_type == "MOORE":
-                    rows = [1, 2, 13]
-                elif routing_type == "NEWSE":
-                    rows = [1, 2]
-                # Iterate over each row and the columns that we can access within each row
-                for row in rows:
-                    for col in accessible_columns:
-                        # This will get us to individual bits. If the mutation probability passes
-                        # Our position is now going to be the start of the first line, plus the line size multiplied to get to our desired row,
-                        # and finally added to the column (with the int cast to sanitize user input)
-                        pos = line_start + line_size * (row - 1) + int(col)
-                        bit_value = hardware_file[pos]
-                        lambda_return = lambda_func(bit_value, row, col)
-                        if lambda_return is not None:
-                            # need to re-assign the bit
-                            hardware_file[pos] = lambda_return
-
-            # Find the next logic tile, and start again
-            # Will return -1 if .logic_tile isn't found, and the while loop will exit
-            tile = hardware_file.find(b".logic_tile", tile + 1)
+            routing_type = self._routing_type
+
+        layout = FileBasedCircuit.get_modifiable_layout_st(hardware_file, accessible_columns, routing_type)
+        body_start = FileBasedCircuit._body_start(hardware_file)
+        for offset, row, col in zip(layout.offsets.tolist(), layout.rows.tolist(), layout.cols.tolist()):
+            pos = body_start + offset
+            bit_value = hardware_file[pos]
+            lambda_return = lambda_func(bit_value, row, col)
+            if lambda_return is not None:
+                # need to re-assign the bit
+                hardware_file[pos] = lambda_return
 
     def _compile(self):
         """
@@ -204,46 +312,36 @@ class FileBasedCircuit(Circuit):
             self._hardware_filepath,
             self._bitstream_filepath
         ]
-        run(compile_command)
+        with TIMER.stage("compile"):
+            run(compile_command)
 
         self._log_event(2, "Finished compiling", self)
 
-    def __tile_is_included(self, hardware_file, pos):
+    @staticmethod
+    def __tile_coords(hardware_file, pos):
         """
-        Determines whether a given tile is available for modificiation.
+        Reads the coordinates of a tile from its header.
         NOTE: Tile = the .logic_tile in the asc file.
 
-        .. todo::
-            Preexisting todo: Replace magic values with a more generalized solution. 
-            These magic values are indicative of the underlying hardware (ice40kh1k)
-
         Parameters
         ----------
         hardware_file : mmap
             Memory Mapped hardware file
         pos : int
-            Index of the first byte in the .asc file for the hardware
+            Index of the byte just after ".logic_tile" in the tile's header
 
         Returns
         -------
-        bool
-            True if the tile at that position is valid (The Tiles we can modigy)
+        tuple[int, int]
+            The x and y coordinates of the tile
         """
-        # Replace these magic values with a more generalized solution
-        # Magic values are indicative of the underlying hardware (ice40hx1k)
-        # A different model will require different magic values (i.e. ice40hx8k)
-        VALID_TILE_X = range(4, 10)
-        VALID_TILE_Y = range(1, 17)
-
         # NOTE x and y are stored as ints to aid the loops that search and identify
         # tiles while scraping the asc files
         # This is in the actual asc file; this is why we can simply pull from "pos"
         # i.e. you'll see the header ".logic_file 1 1" - x=1, y=1
         
-        # This is where we had a fundamental issue before: The value in the hardware at this position is going to be an ASCII char value, not the actual
-        # number. Here, we parse the byte as an integer, then to a char, then back to an integer
-        
-        # However, we have a great problem now: what about multi-digit numbers?
+        # The values in the hardware at this position are ASCII char values, not the actual numbers,
+        # and may have multiple digits.
         # Find the space that separates the x and y, and find the end of the line
         # Then, grab the bytes for x, grab the bytes for y, convert to strings, and parse those strings
         space_pos = hardware_file.find(b" ", pos + 1)
@@ -252,22 +350,32 @@ class FileBasedCircuit(Circuit):
         y_bytes = hardware_file[space_pos:eol_pos]
         x_str = x_bytes.decode("utf-8").strip()
         y_str = y_bytes.decode("utf-8").strip()
-        x = int(x_str)
-        y = int(y_str)
-        is_x_valid = x in VALID_TILE_X
-        is_y_valid = y in VALID_TILE_Y
-
-        return is_x_valid and is_y_valid
+        return int(x_str), int(y_str)
 
     def get_hardware_file(self):
         return self._hardware_file
 
+    def get_genome_digest(self):
+        """
+        Returns
+        -------
+        str
+            A hash of the hardware file without its FILE_ATTRIBUTES line, so circuits that
+            compile to the same bitstream have the same digest (the hash PopulationIndex stores)
+        """
+        body = self._hardware_file[FileBasedCircuit._body_start(self._hardware_file):]
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
     def get_bitstream(self):
-        bitstream = []
-        def add_bit(bit, *rest):
-            bitstream.append(bit)
-        self._run_at_each_modifiable(add_bit)
-        return bitstream
+        """
+        Returns
+        -------
+        np.ndarray
+            The modifiable bits of the hardware file, as the ASCII bytes 48 ('0') or 49 ('1')
+        """
+        offsets = self.get_modifiable_layout().offsets
+        bits = np.frombuffer(self._hardware_file, dtype=np.uint8)
+        return bits[self._body_start(self._hardware_file) + offsets]
 
     def get_hardware_file_path(self):
         return self._hardware_filepath
@@ -1,5 +1,6 @@
 from Circuit.Circuit import Circuit
 import Config
+from Telemetry import TELEMETRY
 
 class FullySimCircuit(Circuit):
     """
@@ -18,10 +19,10 @@ class FullySimCircuit(Circuit):
         """
         Mutate the simulation mode circuit
         """
-        for i in range(0, len(self.__simulation_bitstream)):
-            if self._config.get_mutation_probability() >= self._rand.uniform(0,1):
-                # Mutate this bit
-                self.__simulation_bitstream[i] = 1 - self.__simulation_bitstream[i]
+        # Draw for every bit at once
+        flips = self._config.get_snapshot().mutation_probability >= self._rand.uniform(0, 1, len(self.__simulation_bitstream))
+        self.__simulation_bitstream = [1 - bit if flip else bit
+            for bit, flip in zip(self.__simulation_bitstream, flips.tolist())]
 
     def randomize_bitstream(self):
         """
@@ -45,6 +46,23 @@ class FullySimCircuit(Circuit):
             self.__simulation_bitstream[i] = parent.__simulation_bitstream[i]
         # Remaining bits left unchanged
 
+    def crossover_mask(self, parent, mask):
+        """
+        Simulated crossover, pulls the bits selected by mask from parent and the remaining from self
+
+        Parameters
+        ----------
+        parent : Circuit
+            The other circuit the crossover is performed with
+        mask : np.ndarray
+            Boolean array with one entry per bit. True bits are copied from the parent
+        """
+        for i in mask.nonzero()[0].tolist():
+            self.__simulation_bitstream[i] = parent.__simulation_bitstream[i]
+
+    def set_bitstream(self, bits):
+        self.__simulation_bitstream = [int(bit) for bit in bits]
+
     def copy_from(self, other):
         for i in range(0, len(other.__simulation_bitstream)):
             self.__simulation_bitstream[i] = other.__simulation_bitstream[i]
@@ -84,6 +102,9 @@ class FullySimCircuit(Circuit):
             for points in waveform:
                 waveLive.write(str(i) + ", " + str(points) + "\n")
                 i += 1
+        if TELEMETRY.is_enabled():
+            TELEMETRY.replace("waveformlivedata.log", "".join(str(i) + ", " + str(points) + "\n"
+                for i, points in enumerate(waveform, 1)))
         
         fitness = Circuit._calculate_variance_fitness(waveform)
         return [fitness]
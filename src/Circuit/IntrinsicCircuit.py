@@ -1,13 +1,15 @@
 from pathlib import Path
+import os
 from Circuit.FileBasedCircuit import FileBasedCircuit
 from Circuit.FitnessFunction import FitnessFunction
 from time import sleep
 from subprocess import run
+from StageTimer import TIMER
+from Metrics import METRICS
 import Config
 import Microcontroller
 import Logger
 
-RUN_CMD = "iceprog"
 COMPILE_CMD = "icepack"
 
 class IntrinsicCircuit(FileBasedCircuit):
@@ -18,7 +20,10 @@ class IntrinsicCircuit(FileBasedCircuit):
     def __init__(self, index: int, filename: str, config: Config, template: Path, rand, logger: Logger, microcontroller: Microcontroller, fitness_func: FitnessFunction):
         FileBasedCircuit.__init__(self, index, filename, config, template, rand, logger)
         self._fitness_func = fitness_func
+        self._microcontroller = microcontroller
         self._extra_data = dict()
+        # The genome digest the bitstream file was last compiled from
+        self.__compiled_digest = None
         self._fitness_func.attach(self._data_filepath, microcontroller, self._config, self._extra_data)
 
     def evaluate_once(self):
@@ -32,6 +37,16 @@ class IntrinsicCircuit(FileBasedCircuit):
     def _calculate_fitness(self) -> float:
         return self._fitness_func.calculate_fitness(self._data)
 
+    def estimate_fitness(self, data) -> float:
+        # The fitness functions also write extra data (e.g. the pulse count) when calculating fitness
+        extra_data = dict(self._extra_data)
+        try:
+            return FileBasedCircuit.estimate_fitness(self, data)
+        finally:
+            # Restored in place, since the fitness function holds a reference to the dict
+            self._extra_data.clear()
+            self._extra_data.update(extra_data)
+
     def upload(self):
         self.__run()
 
@@ -43,28 +58,43 @@ class IntrinsicCircuit(FileBasedCircuit):
 
     def __run(self):
         """
-        Compiles and uploads the compiled circuit and runs it on the FPGA
+        Compiles and uploads the compiled circuit and runs it on the FPGA.
+        FPGAs that already hold an identical circuit are skipped, and the circuit is only
+        compiled again if its genome changed since it was last compiled.
         """
-        self._compile()
-        
-        cmd_str = [
-            RUN_CMD,
-            self._bitstream_filepath,
-            "-d",
-            self._config.get_fpga()
-        ]
-        print(cmd_str)
-        run(cmd_str)
-        sleep(1)
+        snapshot = self._config.get_snapshot()
+        fpgas = snapshot.upload_fpgas
+
+        digest = None
+        if snapshot.skip_redundant_uploads:
+            with TIMER.stage("digest"):
+                digest = self.get_genome_digest()
+            fpgas = [fpga for fpga in fpgas if not self._microcontroller.is_configured(fpga, digest)]
+            if len(fpgas) == 0:
+                self._log_event(2, "Skipping upload of", self, "(already configured)")
+                METRICS.inc("uploads_skipped_total")
+                return
+
+        if digest is None or digest != self.__compiled_digest or not os.path.exists(self._bitstream_filepath):
+            self._compile()
+            self.__compiled_digest = digest
 
-        # if switching fpgas every sample, need to upload to the second fpga also
-        if self._config.get_transfer_sample():
-            cmd_str = [
-                RUN_CMD,
+        for fpga in fpgas:
+            cmd_str = list(snapshot.iceprog_command) + [
                 self._bitstream_filepath,
                 "-d",
-                self._config.get_fpga2()
+                fpga
             ]
             print(cmd_str)
-            run(cmd_str)
-            sleep(1)
+            # Until iceprog succeeds, the FPGA's contents are unknown
+            self._microcontroller.set_configured(fpga, None)
+            with TIMER.stage("iceprog"):
+                result = run(cmd_str)
+            if result.returncode == 0:
+                METRICS.inc("uploads_total")
+                if digest is not None:
+                    self._microcontroller.set_configured(fpga, digest)
+            else:
+                METRICS.inc("uploads_failed_total")
+            with TIMER.stage("settle"):
+                sleep(snapshot.settle_time)
@@ -1,4 +1,5 @@
 from Circuit.FitnessFunction import FitnessFunction
+from StageTimer import TIMER
 import math
 
 class PulseCountFitnessFunction(FitnessFunction):
@@ -6,8 +7,10 @@ class PulseCountFitnessFunction(FitnessFunction):
         FitnessFunction.__init__(self)
 
     def get_measurements(self) -> list[float]:
-        self._microcontroller.simple_measure_pulses(self._data_filepath)
-        pulses = self.__count_pulses()
+        with TIMER.stage("serial_capture"):
+            self._microcontroller.simple_measure_pulses(self._data_filepath)
+        with TIMER.stage("parse"):
+            pulses = self.__count_pulses()
         return pulses
 
     def calculate_fitness(self, data: list[float]) -> float:
@@ -45,25 +48,44 @@ class PulseCountFitnessFunction(FitnessFunction):
         return self._config.get_fitness_func() == 'TOLERANT_PULSE_COUNT'
 
     def __calculate_pulse_fitness(self, pulses: int) -> float:
-        desired_freq = self._config.get_desired_frequency()
-        fitness = 0
-        if self.__is_tolerant_pulse_count():
-            # Build a normal-ish distribution function where the "mean" is desired_freq,
-            # and the "standard deviation" is of our choosing (here we select 0.025*freq)
-            deviation = 0.025 * desired_freq # 25 for 1,000 Hz, 250 for 10,000 Hz
-            # No need to check for this because it's included in the function
-            # Note: Fitness is still from 0-1
-            fitness = math.exp(-0.5 * math.pow((pulses - desired_freq) / deviation, 2))
+        return pulse_fitness(pulses, self._config.get_desired_frequency(), self.__is_tolerant_pulse_count())
+
+def pulse_fitness(pulses: float, desired_freq: float, tolerant: bool) -> float:
+    """
+    The fitness of a pulse count (pulses per second) for the target frequency
+
+    Parameters
+    ----------
+    pulses : float
+        The pulse count
+    desired_freq : float
+        The target frequency
+    tolerant : bool
+        True for the TOLERANT_PULSE_COUNT fitness, False for SENSITIVE_PULSE_COUNT
+
+    Returns
+    -------
+    float
+        The fitness, from 0 to 1
+    """
+    fitness = 0
+    if tolerant:
+        # Build a normal-ish distribution function where the "mean" is desired_freq,
+        # and the "standard deviation" is of our choosing (here we select 0.025*freq)
+        deviation = 0.025 * desired_freq # 25 for 1,000 Hz, 250 for 10,000 Hz
+        # No need to check for this because it's included in the function
+        # Note: Fitness is still from 0-1
+        fitness = math.exp(-0.5 * math.pow((pulses - desired_freq) / deviation, 2))
+    else:
+        if pulses == desired_freq:
+            # self.__log_event(1, "Unity achieved: {}".format(self))
+            fitness = 1
+        elif pulses == 0:
+            fitness = 0
         else:
-            if pulses == desired_freq:
-                # self.__log_event(1, "Unity achieved: {}".format(self))
-                fitness = 1
-            elif pulses == 0:
-                fitness = 0
-            else:
-                fitness = 1.0 / abs(desired_freq - pulses)
+            fitness = 1.0 / abs(desired_freq - pulses)
 
-        # if pulses > 0:
-            # Give fitness bonus for getting above 0 pulses
-            # fitness = fitness + 1
-        return fitness
+    # if pulses > 0:
+        # Give fitness bonus for getting above 0 pulses
+        # fitness = fitness + 1
+    return fitness
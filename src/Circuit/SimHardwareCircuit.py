@@ -2,16 +2,30 @@ from pathlib import Path
 from Circuit.FileBasedCircuit import FileBasedCircuit
 import Config
 import Logger
+from FitnessCache import FitnessCache
 
 class SimHardwareCircuit(FileBasedCircuit):
     """
     A concrete class, the simulated circuit that bases its fitness off of the hardware file
     """
 
-    def __init__(self, index: int, filename: str, config: Config, template: Path, logger: Logger, rand):
+    def __init__(self, index: int, filename: str, config: Config, template: Path, logger: Logger, rand,
+            fitness_cache: FitnessCache = None):
         FileBasedCircuit.__init__(self, index, filename, config, template, rand, logger)
+        self.__fitness_cache = fitness_cache
+        # The fitness of the uploaded genome, if it has already been evaluated
+        self.__cached_fitness = None
+        self.__digest = None
 
     def upload(self):
+        self.__cached_fitness = None
+        if self.__fitness_cache is not None:
+            self.__digest = self.get_genome_digest()
+            self.__cached_fitness = self.__fitness_cache.get(self.__digest)
+            if self.__cached_fitness is not None:
+                # Evaluated before, so there is nothing to compile or measure
+                self._log_event(3, "Fitness cache hit for", self)
+                return
         # Need to compile, but not actually upload to the FPGA
         FileBasedCircuit._compile(self)
 
@@ -25,6 +39,8 @@ class SimHardwareCircuit(FileBasedCircuit):
         float
             The fitness of the sim hardware. (sum of all modifiable bits in compiled binary file)
         """
+        if self.__cached_fitness is not None:
+            return [self.__cached_fitness]
         fitness = 0
         def evaluate_bit(bit, *rest):
             nonlocal fitness
@@ -33,6 +49,10 @@ class SimHardwareCircuit(FileBasedCircuit):
         self._run_at_each_modifiable(evaluate_bit)
         
         self._log_event(3, f"Fitness {self._index}: ", fitness)
+        if self.__fitness_cache is not None:
+            # The fitness is deterministic, so later samples of this upload reuse it
+            self.__fitness_cache.put(self.__digest, fitness)
+            self.__cached_fitness = fitness
 
         # self.__update_all_live_data()
 
@@ -0,0 +1,107 @@
+from Circuit.VarMaxFitnessFunction import VarMaxFitnessFunction
+from Circuit.PulseCountFitnessFunction import pulse_fitness
+from StageTimer import TIMER
+import numpy as np
+
+# Time between the points of an ADC capture, in seconds, when the microcontroller does not report
+# it. ReadSignal.ino prints every point as it is sampled, so at 115200 baud the roughly 9 byte
+# lines, not its 10us delay, set the pace (see Config.get_adc_sample_interval)
+ADC_SAMPLE_INTERVAL = 0.8e-3
+
+# The line ReadSignal.ino ends a capture with: the microseconds the capture took
+ELAPSED_PREFIX = b"ELAPSED: "
+
+# Captures that swing less than this many ADC steps are treated as a flat line (0 Hz)
+MIN_SWING = 4
+
+class SpectralFitnessFunction(VarMaxFitnessFunction):
+    """
+    Scores pulse and COMBINED fitness from a single ADC capture. The pulse count is estimated as
+    the dominant frequency of the waveform, so there is no separate one second pulse count
+    measurement. The variance fitness and voltages come from the same capture, as for VARIANCE.
+
+    Each measurement is the pair [frequency, variance fitness]. The time between points is taken
+    from the duration the microcontroller reports for the capture, or the configured
+    sample_interval if it does not report one.
+    """
+    def __init__(self, total_samples: int, sample_interval: float = ADC_SAMPLE_INTERVAL):
+        VarMaxFitnessFunction.__init__(self, total_samples)
+        self.__sample_interval = sample_interval
+
+    def get_measurements(self) -> list[float]:
+        with TIMER.stage("serial_capture"):
+            self._microcontroller.measure_signal(self._data_filepath)
+        with TIMER.stage("parse"):
+            waveform = self._read_waveform()
+            variance = self._measure_variance_fitness(waveform)
+            frequency = estimate_frequency(waveform, self._read_sample_interval())
+        return [frequency, variance]
+
+    def _read_sample_interval(self) -> float:
+        """
+        Returns
+        -------
+        float
+            The time between the points of the last capture, from the duration the
+            microcontroller reported for it, or the configured interval if none was reported
+        """
+        with open(self._data_filepath, "rb") as data_file:
+            lines = data_file.readlines()
+        for points, line in enumerate(lines):
+            if line.startswith(ELAPSED_PREFIX):
+                try:
+                    elapsed = int(line[len(ELAPSED_PREFIX):])
+                except ValueError:
+                    break
+                if points > 0 and elapsed > 0:
+                    return elapsed * 1e-6 / points
+                break
+        return self.__sample_interval
+
+    def calculate_fitness(self, data: list[float]) -> float:
+        frequencies = data[0::2]
+        variances = data[1::2]
+        desired_freq = self._config.get_desired_frequency()
+        # As for pulse counts, the frequency furthest away from the target is used
+        frequency = max(frequencies, key=lambda freq: abs(freq - desired_freq))
+        self._extra_data['pulses'] = frequency
+
+        fitness_func = self._config.get_fitness_func()
+        if fitness_func != "COMBINED":
+            return pulse_fitness(frequency, desired_freq, fitness_func == 'TOLERANT_PULSE_COUNT')
+
+        pulse_fit = pulse_fitness(frequency, desired_freq, True)
+        var_fit = sum(variances) / len(variances)
+        if self._config.get_combined_mode() == "ADD":
+            return self._config.get_pulse_weight() * pulse_fit + self._config.get_var_weight() * var_fit
+        return pow(pulse_fit, self._config.get_pulse_weight()) * pow(var_fit, self._config.get_var_weight())
+
+def estimate_frequency(waveform, sample_interval: float = ADC_SAMPLE_INTERVAL) -> int:
+    """
+    Estimates the dominant frequency of a waveform from the peak of its (Hann windowed)
+    spectrum, refined by fitting a parabola through the log magnitudes around the peak
+
+    Parameters
+    ----------
+    waveform : list[int]
+        The ADC readings
+    sample_interval : float
+        The time between readings, in seconds
+
+    Returns
+    -------
+    int
+        The frequency in Hz, rounded to match a pulse count. 0 for a flat waveform
+    """
+    samples = np.asarray(waveform, dtype=float)
+    if samples.size < 4 or np.ptp(samples) < MIN_SWING:
+        return 0
+    spectrum = np.abs(np.fft.rfft((samples - samples.mean()) * np.hanning(samples.size)))
+    peak = int(np.argmax(spectrum[1:])) + 1
+    offset = 0.0
+    if peak < spectrum.size - 1:
+        left, center, right = np.log(spectrum[peak - 1:peak + 2] + 1e-12)
+        curvature = left - 2 * center + right
+        if curvature < 0:
+            offset = 0.5 * (left - right) / curvature
+    return int(round((peak + offset) / (samples.size * sample_interval)))
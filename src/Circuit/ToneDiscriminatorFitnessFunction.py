@@ -1,4 +1,6 @@
 from Circuit.FitnessFunction import FitnessFunction
+from StageTimer import TIMER
+from Telemetry import TELEMETRY
 import math
 
 class ToneDiscriminatorFitnessFunction(FitnessFunction):
@@ -6,9 +8,11 @@ class ToneDiscriminatorFitnessFunction(FitnessFunction):
         FitnessFunction.__init__(self)
 
     def get_measurements(self) -> list[float]:
-        self._microcontroller.measure_signal_td(self._data_filepath)
-        (waveform, state) = self.__read_variance_data_td()
-        fitness = self.__measure_tonedisc_fitness(waveform, state)
+        with TIMER.stage("serial_capture"):
+            self._microcontroller.measure_signal_td(self._data_filepath)
+        with TIMER.stage("parse"):
+            (waveform, state) = self.__read_variance_data_td()
+            fitness = self.__measure_tonedisc_fitness(waveform, state)
         return fitness
 
     def calculate_fitness(self, measurements: list[float]) -> float:
@@ -156,6 +160,9 @@ class ToneDiscriminatorFitnessFunction(FitnessFunction):
             for points in waveform:
                 waveLive.write(str(i) + ", " + str(points) + "\n")
                 i += 1
+        if TELEMETRY.is_enabled():
+            TELEMETRY.replace("waveformlivedata.log", "".join(str(i) + ", " + str(points) + "\n"
+                for i, points in enumerate(waveform, 1)))
 
         # Write state data to file
         with open("workspace/statelivedata.log", "w+") as stateLive:
@@ -163,6 +170,9 @@ class ToneDiscriminatorFitnessFunction(FitnessFunction):
             for points in state:
                 stateLive.write(str(i) + ", " + str(points) + "\n")
                 i += 1
+        if TELEMETRY.is_enabled():
+            TELEMETRY.replace("statelivedata.log", "".join(str(i) + ", " + str(points) + "\n"
+                for i, points in enumerate(state, 1)))
 
         # Edge case checks for fitness
         if sum(waveform) == 0:
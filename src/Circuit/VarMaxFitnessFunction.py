@@ -1,4 +1,6 @@
 from Circuit.FitnessFunction import FitnessFunction
+from StageTimer import TIMER
+from Telemetry import TELEMETRY
 
 class VarMaxFitnessFunction(FitnessFunction):
     def __init__(self, total_samples: int):
@@ -6,9 +8,11 @@ class VarMaxFitnessFunction(FitnessFunction):
         self.__total_samples = total_samples
 
     def get_measurements(self) -> list[float]:
-        self._microcontroller.measure_signal(self._data_filepath)
-        waveform = self.__read_waveform()
-        fitness = self.__measure_variance_fitness(waveform)
+        with TIMER.stage("serial_capture"):
+            self._microcontroller.measure_signal(self._data_filepath)
+        with TIMER.stage("parse"):
+            waveform = self._read_waveform()
+            fitness = self._measure_variance_fitness(waveform)
         return [fitness]
 
     def calculate_fitness(self, data: list[float]) -> float:
@@ -17,11 +21,11 @@ class VarMaxFitnessFunction(FitnessFunction):
 
     def get_waveform(self) -> list[float]:
         wf = []
-        for pt in self.__read_waveform():
+        for pt in self._read_waveform():
             wf.append(str(pt))
         return wf
 
-    def __read_waveform(self):
+    def _read_waveform(self):
         """
         Reads variance data from the Circuit data file, which contains readings from the Microcontroller
 
@@ -47,7 +51,7 @@ class VarMaxFitnessFunction(FitnessFunction):
         # self.__log_event(5, "Waveform: ", waveform) 
         return waveform
 
-    def __measure_variance_fitness(self, waveform):
+    def _measure_variance_fitness(self, waveform):
         """
         Measure the fitness of this circuit using the variance-maximization fitness
         function
@@ -101,6 +105,9 @@ class VarMaxFitnessFunction(FitnessFunction):
             for points in waveform:
                 waveLive.write(str(i) + ", " + str(points) + "\n")
                 i += 1
+        if TELEMETRY.is_enabled():
+            TELEMETRY.replace("waveformlivedata.log", "".join(str(i) + ", " + str(points) + "\n"
+                for i, points in enumerate(waveform, 1)))
 
         var_max_fitness = variance_sum / len(waveform)
         mean_voltage = sum(waveform) / len(waveform) #used by combined fitness func
@@ -9,27 +9,39 @@ import os
 import numpy as np
 from typing import NamedTuple
 from shutil import copyfile
-from sortedcontainers import SortedKeyList
 from math import ceil
 from numpy.random import default_rng
 from pathlib import Path
-from itertools import zip_longest
-from collections import namedtuple
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 from subprocess import run
 import random
 import math
-from mmap import mmap
 from Circuit.FileBasedCircuit import FileBasedCircuit
 from Circuit.FullySimCircuit import FullySimCircuit
 from Circuit.IntrinsicCircuit import IntrinsicCircuit
 from Circuit.PulseCountFitnessFunction import PulseCountFitnessFunction
 from Circuit.SimHardwareCircuit import SimHardwareCircuit
+from Circuit.SpectralFitnessFunction import SpectralFitnessFunction
 from Circuit.ToneDiscriminatorFitnessFunction import ToneDiscriminatorFitnessFunction
 from Circuit.VarMaxFitnessFunction import VarMaxFitnessFunction
 from Config import Config
 from ascTemplateBuilder import ascTemplateBuilder
 from utilities import wipe_folder
+from StageTimer import TIMER
+from Telemetry import TELEMETRY
+from Metrics import METRICS
+from PopulationArrays import PopulationArrays
+from BitMatrix import BitMatrix
+from PopulationIndex import PopulationIndex
+from GenerationArchive import GenerationArchive
+from Surrogate import RidgeSurrogate
+from Racing import Race
+from FitnessCache import FitnessCache
+from MapElitesArchive import MapElitesArchive, DESCRIPTOR_KEYS
+import Selection
+import Crossover
 from datetime import datetime
 
 RANDOMIZE_UNTIL_NOT_SET_ERR_MSG = '''\
@@ -48,8 +60,6 @@ SEED_HARDWARE_FILEPATH = Path("data/seed-hardware.asc")
 # hardware, bitstream, and data files.
 CIRCUIT_FILE_BASENAME = "hardware"
 
-ELITE_MAP_SCALE_FACTOR = 50
-
 # Create a named tuple for easy and clear storage of information about
 # a Circuit (currently its name and fitness)
 CircuitInfo = namedtuple("CircuitInfo", ["name", "fitness"])
@@ -57,9 +67,13 @@ CircuitInfo = namedtuple("CircuitInfo", ["name", "fitness"])
 # Named tuple for circuit's path and fitness; currently only used for combining populations
 CircuitPathInfo = namedtuple("CircuitPathInfo", ["path", "fitness"])
 
-# Bin sizes for elite maps
-ELITE_MAP_SCALE_FACTOR = 50
-PULSE_ELITE_MAP_SCALE_FACTOR = 5000
+# Named tuple for the snapshot of a generation its logs and live data are written from
+GenerationRecord = namedtuple("GenerationRecord", ["epoch", "epoch_time", "best_name", "best_fitness",
+    "worst_fitness", "overall_best", "best_epoch", "fitness", "pulses", "src_populations", "bits",
+    "saving_bitstream", "saving_generation", "waveform"])
+
+# The MAP-Elites grid, appended to as cells change
+MAP_LIVE_DATA_PATH = "workspace/maplivedata.log"
 
 def is_pulse_func(config):
     """
@@ -100,46 +114,85 @@ class CircuitPopulation:
             Object containing an instance of Logger class
         """
         self.__config = config
+        # Values read on every generation, resolved once from the config
+        self.__snapshot = config.get_snapshot()
         self.__microcontroller = mcu
 
-        # A list of Circuits that's sorted by fitness decreasing order
-        # (to get it to sort in decreasing order I had to multiply the
-        # sort key by negative one to reverse the natural sorting order
-        # since sortedcontainers don't have a way to be in reverse order).
-        self.__circuits = SortedKeyList(key=lambda ckt: -1 * ckt.get_fitness())
+        # The Circuits along with their fitness and measurements, held as
+        # parallel arrays sorted by fitness in decreasing order. Filled in
+        # by populate().
+        self.__circuits = PopulationArrays([])
         self.__logger = logger
         self.__overall_best_circuit_info = CircuitInfo("", 0)
         self.__rand = default_rng()
         self.__current_epoch = 0
         self.__best_epoch = 0
-        num_rows = 3
-        if(config.get_routing_type == "NEWSE"):
-            num_rows = 2
-        num_cols = len(config.get_accessed_columns())
-        self.__population_bistream_sum = np.zeros(16*6*num_rows*num_cols)
+        # The modifiable bits of every circuit, for the diversity measures
+        self.__bit_matrix = BitMatrix()
+        # Offspring pre-screening. __screened holds the ids of the circuits that are not measured
+        # next generation, __measured_bits the bits each ranked circuit was last measured with
+        self.__surrogate = None
+        self.__screened = set()
+        self.__measured_bits = None
+        if config.get_surrogate_screening():
+            self.__surrogate = RidgeSurrogate()
+            self.__surrogate_eval_fraction = config.get_surrogate_eval_fraction()
+            self.__surrogate_warmup = config.get_surrogate_warmup()
+        # Steady state evolution replaces circuits one at a time instead of a generation at once
+        self.__steady_state = config.get_evolution_mode() == "STEADY_STATE"
+        self.__steady_state_replacement = config.get_steady_state_replacement()
+        # Writes each generation's logs and live data while the next one is evaluated. None
+        # writes them before the next generation starts
+        self.__bookkeeper = None
+        self.__bookkeeping = None
+        if config.get_background_bookkeeping():
+            self.__bookkeeper = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bookkeeping")
+        # The confidence of the racing evaluation, None to measure every circuit fully
+        self.__racing_confidence = config.get_racing_confidence() if config.get_racing() else None
+        # Fitness of SIM_HARDWARE genomes already evaluated, by this or an earlier run
+        self.__fitness_cache = None
+        if config.get_fitness_cache() is not None:
+            context = FitnessCache.make_context(self.__snapshot.simulation_mode, self.__snapshot.routing_type,
+                self.__snapshot.accessed_columns)
+            self.__fitness_cache = FitnessCache(config.get_fitness_cache(), context, config.get_fitness_cache_size())
+        # Whether each pass measures identical genomes back to back, so they share one upload
+        self.__group_uploads = config.get_upload_order() == "GROUPED"
+        # Set up by populate() when generations are saved
+        self.__generation_archive = None
+        self.__circuits_by_index = []
 
         # Set the selection type here since the selection type should
         # not change during a run. This way we don't have to branch each
         # time we run selection.
-        if config.get_selection_type() == "SINGLE_ELITE":
+        if self.__snapshot.selection_type == "SINGLE_ELITE":
             self.__run_selection = self.__run_single_elite_tournament
-        elif config.get_selection_type() == "FRAC_ELITE":
+        elif self.__snapshot.selection_type == "FRAC_ELITE":
             self.__run_selection = self.__run_fractional_elite_tournament
-        elif config.get_selection_type() == "CLASSIC_TOURN":
+        elif self.__snapshot.selection_type == "CLASSIC_TOURN":
             self.__run_selection = self.__run_classic_tournament
-        elif config.get_selection_type() == "FIT_PROP_SEL":
+        elif self.__snapshot.selection_type == "FIT_PROP_SEL":
             self.__run_selection = self.__run_fitness_proportional_selection
-        elif config.get_selection_type() == "RANK_PROP_SEL":
+        elif self.__snapshot.selection_type == "RANK_PROP_SEL":
             self.__run_selection = self.__run_rank_proportional_selection
-        elif config.get_selection_type() == "MAP_ELITES":
+        elif self.__snapshot.selection_type == "MAP_ELITES":
             self.__run_selection = self.__run_map_elites_selection
+            # The archive persists across generations
+            self.__map_archive = MapElitesArchive(self.__snapshot.map_elites_bin_sizes, self.__snapshot.map_elites_bins)
+            self.__map_descriptor_keys = [DESCRIPTOR_KEYS[descriptor] for descriptor in self.__snapshot.map_elites_descriptors]
         else:
             self.__log_error(
                 1, "Invalid Selection method in config.ini. Exiting...")
             exit()
 
-        elitism_fraction = config.get_elitism_fraction()
-        population_size = config.get_population_size()
+        # Mask-based crossover operators need the bit layout of the circuits,
+        # which is looked up the first time one is used
+        self.__crossover_type = self.__snapshot.crossover_type
+        self.__crossover_layout = None
+        if self.__crossover_type == "K_POINT":
+            self.__crossover_points = self.__snapshot.crossover_points
+
+        elitism_fraction = self.__snapshot.elitism_fraction
+        population_size = self.__snapshot.population_size
         self.__n_elites = int(ceil(elitism_fraction * population_size))
 
     def run_fitness_sensitity(self):
@@ -167,11 +220,13 @@ class CircuitPopulation:
         #loop through trials and log fitness
         should_continue = True
         while should_continue:
+            trial_start = time()
             self.__eval_circuit_once(ckt)
+            trial_end = time()
             fitness = ckt.get_fitness()
 
             with open("workspace/fitnesssensitivity.log", "a") as live_file:
-                if self.__config.is_pulse_func():
+                if self.__snapshot.is_pulse_func:
                     data2 = ckt.get_extra_data('pulses')
                 else:
                     data2 = ckt.get_extra_data('mean_voltage')
@@ -180,15 +235,17 @@ class CircuitPopulation:
                 t = 0
                 h = 0
                 if(self.__config.reading_temp_humidity()):
-                    t = self.__microcontroller.measure_temp()
-                    h = self.__microcontroller.measure_humidity()
+                    # Use the background reading closest to the middle of the trial
+                    _, t, h = self.__microcontroller.get_environment((trial_start + trial_end) / 2)
                     self.__log_event(4, "Recorded temperature: " + str(t) + ". Recorded humidity: " + str(h))
 
                 
                 now = datetime.now()
                 timestamp = now.strftime("%H.%M.%S")
 
-                live_file.write(("{}:{},{},{},{},{}\n").format(str(cur_trial), fitness, data2, t, h, timestamp))
+                line = ("{}:{},{},{},{},{}\n").format(str(cur_trial), fitness, data2, t, h, timestamp)
+                live_file.write(line)
+                TELEMETRY.append("fitnesssensitivity.log", line)
             self.__log_event(2, "Trial " + str(cur_trial) + " done. Fitness recorded and logged to file: " + str(fitness))
 
             cur_trial += 1
@@ -226,17 +283,21 @@ class CircuitPopulation:
         return sine_funcs
 
     def __construct_circuit(self, index, file_name, seed_arg, sine_funcs):
-        if self.__config.get_simulation_mode() == 'FULLY_SIM':
+        if self.__snapshot.simulation_mode == 'FULLY_SIM':
             return FullySimCircuit(index, file_name, self.__config, sine_funcs, self.__rand)
-        elif self.__config.get_simulation_mode() == 'SIM_HARDWARE':
-            return SimHardwareCircuit(index, file_name, self.__config, seed_arg, self.__logger, self.__rand)
+        elif self.__snapshot.simulation_mode == 'SIM_HARDWARE':
+            return SimHardwareCircuit(index, file_name, self.__config, seed_arg, self.__logger, self.__rand,
+                self.__fitness_cache)
         else:
             fit_func = None
-            if self.__config.get_fitness_func() == 'VARIANCE':
+            if self.__snapshot.fitness_func == 'VARIANCE':
                 fit_func = VarMaxFitnessFunction(500)
-            elif self.__config.get_fitness_func() in ['PULSE_COUNT', 'SENSITIVE_PULSE_COUNT', 'TOLERANT_PULSE_COUNT']:
+            elif self.__snapshot.fitness_func in ['COMBINED', 'PULSE_COUNT', 'SENSITIVE_PULSE_COUNT', 'TOLERANT_PULSE_COUNT'] \
+                    and self.__config.get_single_capture():
+                fit_func = SpectralFitnessFunction(500, self.__config.get_adc_sample_interval())
+            elif self.__snapshot.fitness_func in ['PULSE_COUNT', 'SENSITIVE_PULSE_COUNT', 'TOLERANT_PULSE_COUNT']:
                 fit_func = PulseCountFitnessFunction()
-            elif self.__config.get_fitness_func() == 'TONE_DISCRIMINATOR':
+            elif self.__snapshot.fitness_func == 'TONE_DISCRIMINATOR':
                 fit_func = ToneDiscriminatorFitnessFunction()
 
             return IntrinsicCircuit(index, file_name, self.__config, seed_arg, self.__rand, self.__logger, self.__microcontroller, fit_func)
@@ -260,33 +321,27 @@ class CircuitPopulation:
         wipe_folder(self.__config.get_generations_directory())
 
         self.__multiple_populations = False
-        if self.__config.get_init_mode() == "EXISTING_POPULATION":
+        if self.__snapshot.init_mode == "EXISTING_POPULATION":
             # Need to assign where each circuit gets its source from
             # Get number of subpopulations, then grab random circuits from each
-            subdirectories = next(os.walk(self.__config.get_src_pops_dir()))[1]
-            subdirectory_files = list(map(lambda dir: next(os.walk(self.__config.get_src_pops_dir().joinpath(dir)))[2], subdirectories))
+            subdirectories = sorted(next(os.walk(self.__config.get_src_pops_dir()))[1])
             self.__num_subpops = len(subdirectories)
             self.__multiple_populations = True
-            # Existing population setting, load in all circuits from each population and get the ones with the highest fitness
-            # If any are missing the fitness measure, then we will randomly select them.
+            # Existing population setting, rank the circuits of each population by the fitness
+            # recorded in its index. The index is only refreshed for files that changed since it was written.
+            # If any are missing the fitness measure, then they are ranked as if their fitness was 0.
             # We could manually measure their fitnesses, but as of now we've decided that is too slow
-            all_subdir_circuits = []
-            for i in range(len(subdirectories)):
-                # Load every circuit
-                subdir_circuits = SortedKeyList(
-                    key=lambda ckt: -ckt.fitness
-                )
-                for file in subdirectory_files[i]:
-                    path = self.__config.get_src_pops_dir().joinpath(subdirectories[i]).joinpath(file)
-                    hw_file = open(path, "r+")
-                    mmapped_file = mmap(hw_file.fileno(), 0)
-                    hw_file.close()
-                    fitness = float(FileBasedCircuit.get_file_attribute_st(mmapped_file, "fitness"))
-                    if fitness == None:
-                        fitness = 0
-                    subdir_circuits.add(CircuitPathInfo(path, fitness))
-
-                all_subdir_circuits.append(subdir_circuits)
+            with TIMER.stage("index_src_populations"):
+                all_subdir_circuits = [
+                    deque(CircuitPathInfo(path, fitness) for path, fitness in
+                        PopulationIndex(self.__config.get_src_pops_dir().joinpath(subdirectory)).get_ranked())
+                    for subdirectory in subdirectories
+                ]
+            num_src_circuits = sum(map(len, all_subdir_circuits))
+            if num_src_circuits < self.__snapshot.population_size:
+                self.__log_error(1, "Only " + str(num_src_circuits) + " circuits found in " + str(self.__config.get_src_pops_dir())
+                    + ", need at least the population size (" + str(self.__snapshot.population_size) + ")")
+                exit()
         subdirectory_index = 0
 
         # if we're using custom i/o pin configurations
@@ -297,32 +352,61 @@ class CircuitPopulation:
             template_builder = ascTemplateBuilder(self.__config, self.__logger)
             template_builder.configure_seed_io(SEED_HARDWARE_FILEPATH, template)
 
-        for index in range(1, self.__config.get_population_size() + 1):
-            file_name = "hardware" + str(index)
-            if self.__config.get_init_mode() == "EXISTING_POPULATION":
+        # Decide where every circuit is seeded from before creating any of them
+        seed_args = []
+        src_populations = []
+        for index in range(1, self.__snapshot.population_size + 1):
+            if self.__snapshot.init_mode == "EXISTING_POPULATION":
                 # Grab the top circuit from the current population, unless it is empty, then we'll jump to the next one
                 while len(all_subdir_circuits[subdirectory_index]) <= 0:
                     subdirectory_index = (subdirectory_index + 1) % len(all_subdir_circuits)
-                seedArg = all_subdir_circuits[subdirectory_index].pop(0).path
+                seed_args.append(all_subdir_circuits[subdirectory_index].popleft().path)
+                src_populations.append(subdirectory_index)
                 subdirectory_index = (subdirectory_index + 1) % len(all_subdir_circuits)
             else:
-                seedArg = template
+                seed_args.append(template)
+
+        def construct(index):
+            return self.__construct_circuit(index, "hardware" + str(index), seed_args[index - 1], sine_funcs)
+
+        indices = range(1, self.__snapshot.population_size + 1)
+        if self.__snapshot.init_mode == "EXISTING_POPULATION":
+            # Only the selected genomes are read, and copying them into the workspace is I/O bound,
+            # so they are loaded on a thread pool
+            with TIMER.stage("load_src_populations"), ThreadPoolExecutor() as executor:
+                circuits = list(executor.map(construct, indices))
+        else:
+            circuits = [construct(index) for index in indices]
 
-            ckt = self.__construct_circuit(index, file_name, seedArg, sine_funcs)
-            if self.__config.get_init_mode() == "RANDOM":
+        for i, ckt in enumerate(circuits):
+            if self.__snapshot.init_mode == "RANDOM":
                 ckt.randomize_bitstream()
-            elif self.__config.get_init_mode() == "CLONE_SEED_MUTATE":
+            elif self.__snapshot.init_mode == "CLONE_SEED_MUTATE":
                 # Call mutate once on this circuit
                 ckt.mutate()
-            elif self.__config.get_init_mode() == "EXISTING_POPULATION":
+            elif self.__snapshot.init_mode == "EXISTING_POPULATION":
                 # Make sure the circuit puts a line at the top of its .asc file denoting the source population
-                ckt.set_file_attribute('src_population', str(subdirectory_index))
+                ckt.set_file_attribute('src_population', str(src_populations[i]))
 
-            self.__circuits.add(ckt)
             self.__log_event(3, "Created circuit: {0}".format(ckt))
 
+        # Generations are saved in circuit index order, since the ranked order changes every generation
+        self.__circuits_by_index = circuits
+        if self.__config.get_save_generations():
+            self.__generation_archive = GenerationArchive(self.__config.get_generations_directory())
+            template = circuits[0].get_hardware_file() if isinstance(circuits[0], FileBasedCircuit) else None
+            self.__generation_archive.start([str(ckt) for ckt in circuits], len(circuits[0].get_bitstream()),
+                self.__snapshot.routing_type, self.__config.get_accessed_columns(), template)
+
+        self.__circuits = PopulationArrays(
+            circuits,
+            track_pulses=self.__snapshot.is_pulse_func,
+            track_voltages=self.__snapshot.fitness_func in ['VARIANCE', 'COMBINED'],
+            track_src_population=self.__multiple_populations
+        )
+
         # If map-elites selection method selected, then randomly generate until we fill up 25% of the map
-        '''if self.__config.get_selection_type() == 'MAP_ELITES':
+        '''if self.__snapshot.selection_type == 'MAP_ELITES':
             self.__log_event(1, 'Randomizing until map is 25% full...')
             elites = list(filter(lambda x: x != 0, [j for sub in self.__generate_map() for j in sub]))
             elite_count = len(elites)
@@ -343,26 +427,26 @@ class CircuitPopulation:
 
         # Randomize initial circuits until waveform variance or
         # pulses are found
-        if self.__config.get_simulation_mode() != "FULLY_INTRINSIC":
+        if self.__snapshot.simulation_mode != "FULLY_INTRINSIC":
             pass # No randomization implemented for simulation mode
-        elif self.__config.get_randomization_type() == "PULSE":
+        elif self.__snapshot.randomization_type == "PULSE":
             self.__log_info(1, "PULSE randomization mode selected.")
             self.__randomize_until_pulses()
-        elif self.__config.get_randomization_type() == "VARIANCE":
+        elif self.__snapshot.randomization_type == "VARIANCE":
             self.__log_info(1, "VARIANCE randomization mode selected.")
             if self.__config.get_randomize_threshold() <= 0:
                 self.__log_error(INVALID_VARIANCE_ERR_MSG)
             else:
                 self.__randomize_until_variance()
-        elif self.__config.get_randomization_type() == "VOLTAGE":
+        elif self.__snapshot.randomization_type == "VOLTAGE":
             self.__randomize_until_voltage()
-        elif self.__config.get_randomization_type() == "NO":
+        elif self.__snapshot.randomization_type == "NO":
             self.__log_info(1, "NO randomization mode selected.")
         else:
             self.__log_error(1, RANDOMIZE_UNTIL_NOT_SET_ERR_MSG)
 
         # Output the first data point to live data files
-        self.__write_to_livedata()
+        self.__write_generation(self.__capture_generation(0, self.__capture_bits()))
 
     def __randomize_until_pulses(self):
         """
@@ -459,7 +543,7 @@ class CircuitPopulation:
         """
         should_continue = True
         if self.__config.using_n_generations():
-            if self.get_current_epoch() >= self.__config.get_n_generations():
+            if self.get_current_epoch() >= self.__snapshot.n_generations:
                 should_continue = False
         if self.__config.using_target_fitness():
             if self.__overall_best_circuit_info.fitness >= self.__config.get_target_fitness():
@@ -470,7 +554,7 @@ class CircuitPopulation:
         circuit.clear_data()
         if isinstance(circuit, FileBasedCircuit):
             circuit.upload()
-        for i in range(self.__config.get_num_samples()):
+        for i in range(self.__snapshot.num_samples):
             circuit.collect_data_once()
 
         circuit.calculate_fitness()
@@ -493,64 +577,21 @@ class CircuitPopulation:
         self.__best_epoch = 0
         self.__next_epoch()
 
-        while(self.__should_continue_evo()): #self.get_current_epoch() < self.__config.get_n_generations()):
+        while(self.__should_continue_evo()): #self.get_current_epoch() < self.__snapshot.n_generations):
 
             #self.__log_event(3, "Starting evo cycle", self.get_current_epoch(
-            #), "<", self.__config.get_n_generations(), "?")
-
-            # Since sortedcontainers don't update when the value by
-            # which an item is sorted gets updated, we have to add the
-            # Circuits to a new list after we evaluate them and then
-            # make the new list the working Circuit list.
-            reevaulated_circuits = SortedKeyList(
-                key=lambda ckt: -ckt.get_fitness()
-            )
+            #), "<", self.__snapshot.n_generations, "?")
 
             # Evaluate all the Circuits in this CircuitPopulation.
             start = time()
+            TIMER.begin_generation()
 
-            for circuit in self.__circuits:
-                circuit.clear_data()
-                
-            for i in range(self.__config.get_num_passes()):
-                # Shuffle the circuits each time
-                circuits = np.random.permutation(self.__circuits)
-                for circuit in circuits:
-                    if isinstance(circuit, FileBasedCircuit):
-                        circuit.upload()
-                    for i in range(self.__config.get_num_samples()):
-                        circuit.collect_data_once()
-
-            for circuit in self.__circuits:
-                circuit.calculate_fitness()
-
-            self.__population_bistream_sum = np.zeros(self.__population_bistream_sum.size)
-            for circuit in self.__circuits:
-                # If evaluate returns true, then a circuit has surpassed
-                # the threshold and we are done.
-
-                # fitness = circuit.get_fitness()
-                fitness = circuit.get_fitness()
-
-                # Save off various circuit metrics
-                if self.__config.get_simulation_mode() != 'FULLY_SIM':
-                    circuit.set_file_attribute("fitness", str(fitness))
-                    if self.__config.is_pulse_count():
-                        circuit.set_file_attribute("pulse_count", str(circuit.get_extra_data('pulses')))
-
-                # Commented out for now while we test
-                # Pretty sure this was originally for pulse count only, leaving it commented out since things are working right now
-                '''if fitness > self.__config.get_randomize_threshold():
-                    self.__log_event(1, "{} fitness: {}".format(circuit, fitness))
-                    return'''
-                reevaulated_circuits.add(circuit)
-
-                #add the circuit's bistream to our population sum - for diversity calculation and visualization
-                if self.__config.get_simulation_mode() != 'FULLY_SIM':
-                    self.__population_bistream_sum += circuit.get_bitstream()
+            if self.__steady_state and self.get_current_epoch() > 1:
+                self.__run_steady_state()
+            else:
+                self.__evaluate_generation()
 
             epoch_time = time() - start
-            self.__circuits = reevaulated_circuits
 
             # If one of the new Circuits has a higher fitness than our
             # recorded best, make it the recorded best.
@@ -570,7 +611,7 @@ class CircuitPopulation:
 
                 # For tone discriminator experiments, update the best waveform and best state data
                 # Each file will contain all sampled data points from the new best circuit
-                if (self.__config.get_fitness_func() == "TONE_DISCRIMINATOR"):
+                if (self.__snapshot.fitness_func == "TONE_DISCRIMINATOR"):
                     with open("workspace/bestwaveformlivedata.log", "w+") as waveLive:
                         waveLive.write("NEW BEST BELOW: " + str(self.__circuits[0]) + " in gen " + str(self.get_current_epoch()) + "\n")
                         i = 1
@@ -585,178 +626,561 @@ class CircuitPopulation:
                             i += 1
                 self.__log_event(2, "New best found")
 
-            self.__logger.log_generation(self, epoch_time)
-            # The circuits that are protected from randomization
-            self.__protected_elites = []
-            self.__run_selection()
+            # The genomes are copied before selection overwrites them, so the logs describe the
+            # circuits that were measured
+            with TIMER.stage("capture"):
+                bits = self.__capture_bits()
+
+            if not self.__steady_state:
+                # The circuits that are protected from randomization
+                self.__circuits.clear_protected()
+                with TIMER.stage("selection"):
+                    self.__run_selection()
 
             # Remove bottom X% of population to replace with random circuits
             # (just randomize bitstream of the bottom X%)
-            if self.__config.get_random_injection() > 0:
-                amt = int(self.__config.get_random_injection() * self.__config.get_population_size())
-                circuits_to_randomize = self.__circuits[-amt:]
-                for ckt in circuits_to_randomize:
-                    if ckt not in self.__protected_elites:
+            if self.__snapshot.random_injection > 0 and not self.__steady_state:
+                with TIMER.stage("random_injection"):
+                    amt = int(self.__snapshot.random_injection * self.__snapshot.population_size)
+                    first = len(self.__circuits) - amt
+                    unprotected = ~self.__circuits.get_protected()[first:]
+                    for ckt in self.__circuits[first:][unprotected]:
                         ckt.randomize_bitstream()
 
-            self.__write_to_livedata()
+            if self.__surrogate is not None:
+                with TIMER.stage("surrogate"):
+                    self.__screen_offspring()
+
+            # Only selection has to finish before the next evaluation; the logs and live data
+            # are written from a snapshot while it runs
+            with TIMER.stage("capture"):
+                record = self.__capture_generation(epoch_time, bits)
+            self.__submit_bookkeeping(record)
+            if TIMER.is_enabled():
+                self.__logger.log_stage_times(self.get_current_epoch(), TIMER.end_generation(self.get_current_epoch()))
             self.__next_epoch()
 
             if self.__config.using_transfer_interval():
                 if self.__current_epoch % self.__config.get_transfer_interval() == 0:
                     self.__microcontroller.switch_fpga()
 
+        self.__finish_bookkeeping()
+        if self.__bookkeeper is not None:
+            self.__bookkeeper.shutdown()
+            self.__bookkeeper = None
+
         # We have finished evolution! Lets quickly re-evaluate the top circuit, since it
         # will then output its waveform
-        if not is_pulse_func(self.__config):
+        if not self.__snapshot.is_pulse_func:
             self.__eval_circuit_once(self.__circuits[0])
         # Also, log the name of the top circuit
         self.__log_event(1, "Top Circuit in Final Generation:", self.__circuits[0])
+        if self.__fitness_cache is not None:
+            self.__fitness_cache.close()
 
-    def __write_to_livedata(self):
-        """
-        Runs each generation to write data to files used to store data needed for Live plots (PlotEvolutionLive.py)
-        """
-        fitness_sum = 0
-        for c in self.__circuits:
-            fitness_sum = fitness_sum + c.get_fitness()
-        # Calculate the diversity measure
-        diversity = 0
-        if self.__config.get_diversity_measure() == "HAMMING_DIST":
-            diversity = self.avg_hamming_dist()
-        elif self.__config.get_diversity_measure() == "UNIQUE":
-            diversity = self.count_unique()
-        elif self.__config.get_diversity_measure() == "DIFFERING_BITS":
-            diversity = self.count_differing_bits()
-        elif self.__config.get_diversity_measure() == "NONE":
-            diversity = 0
-        # Providing any invalid measure of diversity will make it constantly 0
-        # Write the generation data (avg/best/worst fitness, etc) to file
-        if self.get_current_epoch() > 0:
-            with open("workspace/bestlivedata.log", "a") as liveFile:
-                avg = fitness_sum / self.__config.get_population_size()
-                # Format: Epoch, Best Fitness, Worst Fitness, Average Fitness, Ovr Best Fitness, Diversity Measure
-                liveFile.write("{}, {}, {}, {}, {}, {}\n".format(
-                    str(self.get_current_epoch()),
-                    str(self.__circuits[0].get_fitness()),
-                    str(self.__circuits[-1].get_fitness()),
-                    str(avg),
-                    str(self.get_overall_best_circuit_info().fitness),
-                    diversity
-                ))
-        
-        if self.__multiple_populations:
-            # Write the population counts to file (i.e. count of circuits from each source population)
-            with open("workspace/poplivedata.log", "a") as live_file:
-                counts = [0] * self.__num_subpops
-                for ckt in self.__circuits:
-                    population = int(ckt.get_file_attribute('src_population'))
-                    counts[population] = counts[population] + 1
-                live_file.write(("{} " * self.__num_subpops + "\n").format(*counts))
+    def __evaluate_generation(self):
+        """
+        Measures every circuit (except those screened out by the surrogate), then calculates
+        their fitness and re-ranks the population
+        """
+        for circuit in self.__circuits:
+            circuit.clear_data()
 
-        if (self.__current_epoch > 0):
-            with open("workspace/violinlivedata.log", "a") as live_file:
-                fits = []
-                for ckt in self.__circuits:
-                    fits.append(str(ckt.get_fitness()))
-                live_file.write(("{}:{}\n").format(self.__current_epoch, ",".join(fits)))
-            
-            if self.__config.get_simulation_mode() == "FULLY_INTRINSIC":
-                if not self.__config.is_pulse_func():
-                    with open("workspace/heatmaplivedata.log", "a") as live_file2:
-                        best = self.__circuits[0]
-                        if (self.__config.get_fitness_func() == "TONE_DISCRIMINATOR"):
-                            # Need a slightly different function for tone discriminator waveform
-                            data  = best.get_waveform_td()
-                        else:
-                            data = best.get_waveform()
-                        live_file2.write(("{}:{}\n").format(self.__current_epoch, ",".join(data)))
-                else:
-                    with open("workspace/pulselivedata.log", "a") as live_file3:
-                        data = []    
-                        for ckt in self.__circuits:
-                            data.append(str(ckt.get_extra_data('pulses')))
-                        live_file3.write(("{}:{}\n").format(self.__current_epoch, ",".join(data)))
-
-            if self.__config.saving_population_bistream():
-                if(self.__current_epoch %
-                    self.__config.get_population_bistream_save_interval() == 0):
-                    with open("workspace/bitstream_avg.log", "a") as live_file4:
-                        data = self.get_differing_bits_str()
-                        live_file4.write(("{}:{}\n").format(self.__current_epoch, data))
+        eliminated = set()
+        if self.__racing_confidence is not None:
+            eliminated = self.__race()
+        else:
+            circuits = self.__circuits.get_circuits()
+            for i in range(self.__snapshot.num_passes):
+                # Shuffle the circuits each time
+                for index in self.__pass_order(range(len(circuits))):
+                    circuit = circuits[index]
+                    if id(circuit) in self.__screened:
+                        continue
+                    if isinstance(circuit, FileBasedCircuit):
+                        with TIMER.stage("upload"):
+                            circuit.upload()
+                    for i in range(self.__snapshot.num_samples):
+                        with TIMER.stage("measure"):
+                            circuit.collect_data_once()
+
+        with TIMER.stage("fitness"):
+            for circuit in self.__circuits:
+                if id(circuit) not in self.__screened:
+                    circuit.calculate_fitness()
+            METRICS.inc("evaluations_total", len(self.__circuits) - len(self.__screened))
+            if len(eliminated) > 0:
+                # Eliminated circuits were not fully sampled, which can flatter a worst-sample
+                # fitness, so they are kept below every circuit that finished the race
+                lowest = min(ckt.get_fitness() for ckt in self.__circuits
+                    if id(ckt) not in self.__screened and id(ckt) not in eliminated)
+                for circuit in self.__circuits:
+                    if id(circuit) in eliminated and circuit.get_fitness() > lowest:
+                        circuit.set_fitness(lowest)
+            if len(self.__screened) > 0:
+                # Screened out offspring were predicted to be the worst, so they rank last
+                lowest = min(ckt.get_fitness() for ckt in self.__circuits if id(ckt) not in self.__screened)
+                for circuit in self.__circuits:
+                    if id(circuit) in self.__screened:
+                        circuit.set_fitness(lowest)
+
+        # Pull the new fitnesses and measurements into the population
+        # arrays, then re-rank the population with a single sort.
+        with TIMER.stage("rank"):
+            self.__circuits.gather()
+            self.__circuits.rank()
+        if self.__surrogate is not None:
+            with TIMER.stage("surrogate"):
+                self.__train_surrogate()
+
+        # Save off various circuit metrics
+        if self.__snapshot.simulation_mode != 'FULLY_SIM':
+            fitnesses = self.__circuits.get_fitness()
+            pulses = self.__circuits.get_pulses()
+            with TIMER.stage("file_attributes"):
+                for i, circuit in enumerate(self.__circuits):
+                    if id(circuit) in self.__screened:
+                        continue
+                    circuit.set_file_attribute("fitness", str(fitnesses[i]))
+                    if self.__snapshot.is_pulse_count:
+                        circuit.set_file_attribute("pulse_count", str(pulses[i]))
+
+    def __run_steady_state(self):
+        """
+        Runs one generation's worth (population_size) of steady state replacements. Each one
+        breeds an offspring from tournament winners into the slot of the worst circuit (or the
+        loser of a tournament), measures it straight away and moves it to its rank, so there is
+        no generational barrier between measurements.
+        The protected elites are then measured again, as they would be in a generational run, so
+        that a circuit that was measured too high once (e.g. from noise on the FPGAs) does not
+        keep its place for the rest of the run.
+        """
+        n_protected = min(max(1, self.__n_elites), len(self.__circuits) - 1)
+        replace_worst = self.__steady_state_replacement == "REPLACE_WORST"
+        for i in range(self.__snapshot.population_size):
+            with TIMER.stage("selection"):
+                fitness = self.__circuits.get_fitness()
+                victim_index = Selection.steady_state_victim(self.__rand, fitness, n_protected, replace_worst)
+                parent = self.__circuits[Selection.tournament_winner(self.__rand, fitness, 2, victim_index)]
+                victim = self.__circuits[victim_index]
+                victim.copy_from(parent)
+                if Selection.crossover_decisions(self.__rand, 1, self.__snapshot.crossover_probability)[0]:
+                    other = self.__circuits[Selection.tournament_winner(self.__rand, fitness, 2, victim_index)]
+                    self.__crossover(other, victim)
+                victim.mutate()
+
+            self.__measure_one(victim)
+            with TIMER.stage("rank"):
+                rank = self.__circuits.update(victim_index)
+            self.__write_fitness_attributes(rank)
+            self.__log_event(3, "Replaced", victim, "with an offspring of", parent, "ranked", rank)
+
+        elites = set(map(id, self.__circuits[:n_protected]))
+        for ckt in self.__circuits[:n_protected]:
+            self.__measure_one(ckt)
+        with TIMER.stage("rank"):
+            self.__circuits.gather()
+            self.__circuits.rank()
+        for rank, ckt in enumerate(self.__circuits):
+            if id(ckt) in elites:
+                self.__write_fitness_attributes(rank)
+                self.__log_event(3, "Measured elite", ckt, "again, ranked", rank)
+
+    def __measure_one(self, circuit):
+        """
+        Measures a single circuit (num_passes passes of num_samples samples) and calculates its fitness
+
+        Parameters
+        ----------
+        circuit : Circuit
+            The circuit to measure
+        """
+        circuit.clear_data()
+        for j in range(self.__snapshot.num_passes):
+            if isinstance(circuit, FileBasedCircuit):
+                with TIMER.stage("upload"):
+                    circuit.upload()
+            for k in range(self.__snapshot.num_samples):
+                with TIMER.stage("measure"):
+                    circuit.collect_data_once()
+        with TIMER.stage("fitness"):
+            circuit.calculate_fitness()
+        METRICS.inc("evaluations_total")
+
+    def __write_fitness_attributes(self, rank):
+        """
+        Writes the fitness (and pulse count) of the circuit at a rank to its hardware file
+
+        Parameters
+        ----------
+        rank : int
+            The rank of the circuit
+        """
+        if self.__snapshot.simulation_mode != 'FULLY_SIM':
+            with TIMER.stage("file_attributes"):
+                circuit = self.__circuits[rank]
+                circuit.set_file_attribute("fitness", str(self.__circuits.get_fitness()[rank]))
+                if self.__snapshot.is_pulse_count:
+                    circuit.set_file_attribute("pulse_count", str(self.__circuits.get_pulses()[rank]))
 
-            # TODO: Re-enable this. Temporarily disabled in case files get too large
-            #self.__save_generation()
+    def __pass_order(self, indices):
+        """
+        The order one pass measures circuits in: shuffled, and with upload_order GROUPED, with
+        circuits of identical genomes moved next to each other so that only the first of them is
+        uploaded (see IntrinsicCircuit). Groups keep the shuffled order of their first circuit,
+        except that a group already configured on the FPGA goes first.
+
+        Parameters
+        ----------
+        indices : list[int]
+            The indices of the circuits to measure
+
+        Returns
+        -------
+        list[int]
+            The indices in measuring order
+        """
+        order = np.random.permutation(np.asarray(indices, dtype=np.int64)).tolist()
+        if not self.__group_uploads:
+            return order
+        circuits = self.__circuits.get_circuits()
+        groups = {}
+        for index in order:
+            circuit = circuits[index]
+            key = circuit.get_genome_digest() if isinstance(circuit, FileBasedCircuit) else ("circuit", index)
+            groups.setdefault(key, []).append(index)
+        configured = []
+        if isinstance(circuits[0], IntrinsicCircuit):
+            # IntrinsicCircuit uploads to the configured FPGA
+            fpga = self.__config.get_fpga()
+            configured = [key for key in groups if isinstance(key, str) and self.__microcontroller.is_configured(fpga, key)]
+        keys = configured + [key for key in groups if key not in configured]
+        return [index for key in keys for index in groups[key]]
+
+    def __race(self):
+        """
+        Measures the circuits in num_passes shuffled passes of num_samples samples, like an
+        ordinary generation, but stops sampling a circuit as soon as the race eliminates it (see
+        Racing.py). The samples saved are spent on up to num_passes extra passes over the
+        contenders, closest to the elite threshold first.
 
-    def __save_generation(self):
+        Returns
+        -------
+        set[int]
+            The ids of the eliminated circuits
+        """
+        circuits = self.__circuits.get_circuits()
+        num_samples = self.__snapshot.num_samples
+        measured = [i for i, ckt in enumerate(circuits) if id(ckt) not in self.__screened]
+        race = Race(len(circuits), self.__n_elites, self.__racing_confidence)
+
+        # The samples left of the usual num_passes x num_samples per circuit
+        budget = len(measured) * self.__snapshot.num_passes * num_samples
+        for i in range(self.__snapshot.num_passes):
+            for index in self.__pass_order(measured):
+                if not race.is_eliminated(index):
+                    budget -= self.__race_circuit(race, circuits[index], index, num_samples)
+        saved = budget
+
+        for i in range(self.__snapshot.num_passes):
+            contenders = race.contenders()
+            if budget <= 0 or contenders.size == 0:
+                break
+            for index in contenders:
+                if budget <= 0:
+                    break
+                if not race.is_eliminated(index):
+                    budget -= self.__race_circuit(race, circuits[index], index, min(num_samples, budget))
+
+        eliminated = race.get_eliminated()
+        METRICS.inc("racing_eliminated_total", np.count_nonzero(eliminated))
+        self.__log_event(2, "Racing eliminated", np.count_nonzero(eliminated), "circuits, saving", saved,
+            "samples, of which", saved - budget, "were spent on contenders")
+        return set(map(id, circuits[eliminated]))
+
+    def __race_circuit(self, race, circuit, index, samples):
         """
-        Saves the current generation to the generations directory
-        Each generation gets its own file
+        Uploads a circuit and takes up to the given number of samples, stopping early if the
+        race eliminates it
+
+        Returns
+        -------
+        int
+            The number of samples taken
+        """
+        if isinstance(circuit, FileBasedCircuit):
+            with TIMER.stage("upload"):
+                circuit.upload()
+        for taken in range(1, samples + 1):
+            with TIMER.stage("measure"):
+                measurement = circuit.collect_data_once()
+            with TIMER.stage("racing"):
+                race.add(index, circuit.estimate_fitness(measurement))
+                if race.eliminate(index):
+                    return taken
+        return samples
+
+    def __train_surrogate(self):
+        """
+        Adds the genomes measured this generation, with their fitness, to the surrogate's samples
+        """
+        circuits = self.__circuits.get_circuits()
+        bits = self.__genome_bits(circuits)
+        measured = np.fromiter((id(ckt) not in self.__screened for ckt in circuits), dtype=bool, count=circuits.size)
+        self.__surrogate.add(bits[measured], self.__circuits.get_fitness()[measured])
+        self.__measured_bits = bits
+        self.__screened = set()
+
+    def __screen_offspring(self):
+        """
+        Predicts the fitness of every circuit whose genome selection changed, and marks all but
+        the most promising surrogate_eval_fraction of them to be skipped next generation.
+        Does nothing until the surrogate has surrogate_warmup samples.
+        """
+        if len(self.__surrogate) < self.__surrogate_warmup:
+            return
+        circuits = self.__circuits.get_circuits()
+        bits = self.__genome_bits(circuits)
+        offspring = np.flatnonzero((bits != self.__measured_bits).any(axis=1))
+        if offspring.size == 0:
+            return
+        self.__surrogate.fit()
+        predicted = self.__surrogate.predict(bits[offspring])
+        keep = ceil(self.__surrogate_eval_fraction * offspring.size)
+        screened = offspring[np.argsort(-predicted, kind="stable")[keep:]]
+        self.__screened = set(map(id, circuits[screened]))
+        METRICS.inc("surrogate_screened_total", screened.size)
+        self.__log_event(2, "Surrogate screened out", screened.size, "of", offspring.size, "offspring")
+
+    @staticmethod
+    def __genome_bits(circuits):
+        """
+        Returns
+        -------
+        np.ndarray
+            (circuits x bits) array of the 0/1 modifiable bits of the circuits
+        """
+        return np.stack([np.asarray(ckt.get_bitstream(), dtype=np.uint8) for ckt in circuits]) & 1
+
+    def __saving_bitstream(self):
+        return (self.__current_epoch > 0 and self.__config.saving_population_bistream() and
+            self.__current_epoch % self.__config.get_population_bistream_save_interval() == 0)
 
-        Saves all modifiable parts of a generation so it can be reconstructed.
+    def __saving_generation(self):
+        return self.__generation_archive is not None and self.__current_epoch > 0
 
-        called by __write_to_livedata(self)
+    def __capture_bits(self):
         """
-        gen_lines = []
-        # At the top, add the necessary config params such as routing and accessed columns
-        gen_lines.append(self.__config.get_routing_type())
-        gen_lines.append(','.join(self.__config.get_accessed_columns()))
-        # Now, add the bitstream for each circuit on its own line
-        # We want the circuits in number order though
-        sorted_by_index = SortedKeyList(
-            key=lambda ckt: ckt.get_index()
+        Copies the genomes of the population, if this generation's live data or logs need them.
+        Called before selection, so that the genomes are the ones that were measured.
+
+        Returns
+        -------
+        np.ndarray | None
+            (circuits x bits) array of the 0/1 modifiable bits of the circuits, or None if they
+            are not needed
+        """
+        if self.__saving_bitstream() or self.__saving_generation() or \
+                self.__snapshot.diversity_measure in ["HAMMING_DIST", "UNIQUE", "DIFFERING_BITS"]:
+            # In index order, which the generation archive needs and the diversity measures do not mind
+            circuits = self.__circuits_by_index if len(self.__circuits_by_index) > 0 else self.__circuits
+            with TIMER.stage("capture_bits"):
+                return self.__genome_bits(circuits)
+
+    def __capture_generation(self, epoch_time, bits):
+        """
+        Copies everything the live data and logs of this generation need out of the population,
+        so they can be written while the next generation is being evaluated.
+
+        Parameters
+        ----------
+        epoch_time : float
+            Seconds the generation took to evaluate
+        bits : np.ndarray | None
+            The genomes captured by __capture_bits before selection
+
+        Returns
+        -------
+        GenerationRecord
+            The snapshot of the generation
+        """
+        waveform = None
+        if self.__current_epoch > 0 and self.__snapshot.simulation_mode == "FULLY_INTRINSIC" \
+                and not self.__snapshot.is_pulse_func:
+            # The best circuit's data file is overwritten when it is measured again
+            if self.__snapshot.fitness_func == "TONE_DISCRIMINATOR":
+                # Need a slightly different function for tone discriminator waveform
+                waveform = list(self.__circuits[0].get_waveform_td())
+            else:
+                waveform = list(self.__circuits[0].get_waveform())
+
+        return GenerationRecord(
+            epoch=self.__current_epoch,
+            epoch_time=epoch_time,
+            best_name=str(self.__circuits[0]),
+            best_fitness=self.__circuits[0].get_fitness(),
+            worst_fitness=self.__circuits[-1].get_fitness(),
+            overall_best=self.__overall_best_circuit_info,
+            best_epoch=self.__best_epoch,
+            fitness=self.__circuits.get_fitness().copy(),
+            pulses=self.__circuits.get_pulses().copy(),
+            src_populations=self.__circuits.get_src_populations().copy(),
+            bits=bits,
+            saving_bitstream=self.__saving_bitstream(),
+            saving_generation=self.__saving_generation(),
+            waveform=waveform
         )
-        for ckt in self.__circuits:
-            sorted_by_index.add(ckt)
-        # Now add each circuit
-        for ckt in sorted_by_index:
-            bitstream = ckt.get_intrinsic_modifiable_bitstream()
-            bitstring = ''.join(bitstream)
-            gen_lines.add(bitstring)
-        # Now actually write the file
-        path = self.__config.get_generations_directory().joinpath('gen' + str(self.__current_epoch) + '.log')
-        with open(path, 'w') as f:
-            f.writelines(gen_lines)
-
-        if (self.__current_epoch > 0):
-            with open("workspace/heatmaplivedata.log", "a") as live_file:
-                best = self.__circuits[0]
-                if (self.__config.get_fitness_func() == "TONE_DISCRIMINATOR"):
-                    # Need a slightly different function for tone discriminator waveform
-                    live_file.write(("{}:{}\n").format(self.__current_epoch, ",".join(best.get_waveform_td())))
-                else:
-                    live_file.write(("{}:{}\n").format(self.__current_epoch, ",".join(best.get_waveform())))
+
+    def __submit_bookkeeping(self, record):
+        """
+        Writes a generation's logs and live data on the bookkeeping thread, after the previous
+        generation's have been written (so at most one generation is waiting), or straight away
+        if background bookkeeping is off
+        """
+        self.__finish_bookkeeping()
+        if self.__bookkeeper is None:
+            self.__write_generation(record)
+        else:
+            self.__bookkeeping = self.__bookkeeper.submit(self.__write_generation, record)
+
+    def __finish_bookkeeping(self):
+        """
+        Waits for the bookkeeping of the last generation, re-raising anything it raised
+        """
+        if self.__bookkeeping is not None:
+            bookkeeping = self.__bookkeeping
+            self.__bookkeeping = None
+            with TIMER.stage("bookkeeping_wait"):
+                bookkeeping.result()
+
+    def __write_generation(self, record):
+        """
+        Writes the generation log and the files used for the live plots (PlotEvolutionLive.py),
+        and saves the generation. Only reads the record, so it can run alongside the next
+        generation's evaluation
+
+        Parameters
+        ----------
+        record : GenerationRecord
+            The snapshot of the generation
+        """
+        with TIMER.stage("livedata"):
+            matrix = None
+            if record.bits is not None:
+                # Every diversity measure comes from the same bit matrix, so it is only loaded once
+                matrix = BitMatrix()
+                with TIMER.stage("bit_matrix"):
+                    matrix.update(record.bits)
+            # Calculate the diversity measure
+            diversity = 0
+            if self.__snapshot.diversity_measure == "HAMMING_DIST":
+                diversity = self.__avg_hamming_dist(matrix)
+            elif self.__snapshot.diversity_measure == "UNIQUE":
+                diversity = self.__count_unique(matrix)
+            elif self.__snapshot.diversity_measure == "DIFFERING_BITS":
+                diversity = self.__count_differing_bits(matrix)
+            elif self.__snapshot.diversity_measure == "NONE":
+                diversity = 0
+            # Providing any invalid measure of diversity will make it constantly 0
+            # Write the generation data (avg/best/worst fitness, etc) to file
+            if record.epoch > 0:
+                with TIMER.stage("log_generation"):
+                    self.__logger.log_generation(record)
+                with open("workspace/bestlivedata.log", "a") as liveFile:
+                    avg = record.fitness.sum() / self.__snapshot.population_size
+                    # Format: Epoch, Best Fitness, Worst Fitness, Average Fitness, Ovr Best Fitness, Diversity Measure
+                    line = "{}, {}, {}, {}, {}, {}\n".format(
+                        str(record.epoch),
+                        str(record.best_fitness),
+                        str(record.worst_fitness),
+                        str(avg),
+                        str(record.overall_best.fitness),
+                        diversity
+                    )
+                    liveFile.write(line)
+                TELEMETRY.append("bestlivedata.log", line)
+                METRICS.inc("generations_total")
+                METRICS.set("generation", record.epoch)
+                METRICS.set("best_fitness", record.best_fitness)
+                METRICS.set("worst_fitness", record.worst_fitness)
+                METRICS.set("average_fitness", avg)
+                METRICS.set("overall_best_fitness", record.overall_best.fitness)
+
+            if self.__multiple_populations:
+                # Write the population counts to file (i.e. count of circuits from each source population)
+                with open("workspace/poplivedata.log", "a") as live_file:
+                    counts = np.bincount(record.src_populations, minlength=self.__num_subpops)
+                    line = ("{} " * self.__num_subpops + "\n").format(*counts)
+                    live_file.write(line)
+                TELEMETRY.append("poplivedata.log", line)
+
+            if record.epoch > 0:
+                with open("workspace/violinlivedata.log", "a") as live_file:
+                    fits = map(str, record.fitness)
+                    line = ("{}:{}\n").format(record.epoch, ",".join(fits))
+                    live_file.write(line)
+                TELEMETRY.append("violinlivedata.log", line)
+
+                if self.__snapshot.simulation_mode == "FULLY_INTRINSIC":
+                    if not self.__snapshot.is_pulse_func:
+                        with open("workspace/heatmaplivedata.log", "a") as live_file2:
+                            line = ("{}:{}\n").format(record.epoch, ",".join(record.waveform))
+                            live_file2.write(line)
+                        TELEMETRY.append("heatmaplivedata.log", line)
+                    else:
+                        with open("workspace/pulselivedata.log", "a") as live_file3:
+                            data = map(str, record.pulses)
+                            line = ("{}:{}\n").format(record.epoch, ",".join(data))
+                            live_file3.write(line)
+                        TELEMETRY.append("pulselivedata.log", line)
+
+                if record.saving_bitstream:
+                    with open("workspace/bitstream_avg.log", "a") as live_file4:
+                        data = matrix.differing_bits_str()
+                        live_file4.write(("{}:{}\n").format(record.epoch, data))
+
+        if record.saving_generation:
+            self.__save_generation(record)
+
+    def __save_generation(self, record):
+        """
+        Saves the modifiable bits of a generation to the generations directory, so it can be
+        reconstructed (see tools/reconstruct.py)
+
+        called by __write_generation(self, record)
+        """
+        with TIMER.stage("save_generation"):
+            size = self.__generation_archive.save(record.epoch, record.bits)
+        self.__log_event(4, "Saved generation", record.epoch, "in", size, "bytes")
 
     # SECTION Selection algorithms.
     def __run_classic_tournament(self):
         """
         Selection Algorithm that randomly pairs together circuits, compares their fitness, and preforms crossover on and mutates the "loser"
         """
-        population = self.__rand.permutation(self.__circuits)
-
         self.__log_event(3, "Tournament Number:", self.get_current_epoch())
 
         # For all Circuits in the CircuitPopulation, take two random
         # circuits at a time from the population and compare them. Copy
         # some genes from the fittest of the two to the least fittest of
         # the two and mutate the latter.
-        for ckt1, ckt2 in CircuitPopulation.__group(population, 2):
-            winner = ckt1
-            loser = ckt2
-            if ckt2.get_fitness() > ckt1.get_fitness():
-                winner = ckt2
-                loser = ckt1
-
+        circuits = self.__circuits.get_circuits()
+        fitness = self.__circuits.get_fitness()
+        winners, losers = Selection.tournament_pairs(self.__rand, fitness)
+        crossovers = Selection.crossover_decisions(self.__rand, winners.size, self.__snapshot.crossover_probability)
+        for winner_index, loser_index, crossover in zip(winners, losers, crossovers):
+            winner = circuits[winner_index]
+            loser = circuits[loser_index]
             self.__log_event(3,
                             "Fitness {}: {} < Fitness {}: {}".format(
                                 loser,
-                                loser.get_fitness(),
+                                fitness[loser_index],
                                 winner,
-                                winner.get_fitness()
+                                fitness[winner_index]
                             ))
 
-            if self.__rand.uniform(0, 1) <= self.__config.get_crossover_probability():
-                self.__single_point_crossover(winner, loser)
+            if crossover:
+                self.__crossover(winner, loser)
             else:
                 self.__log_event(3, "Cloning:", winner, " ---> ", loser)
                 loser.copy_from(winner)
@@ -771,7 +1195,7 @@ class CircuitPopulation:
             str(self.get_current_epoch())))
 
         best = self.__circuits[0]
-        self.__protected_elites.append(best)
+        self.__circuits.protect(0)
         for ckt in self.__circuits:
             # Mutate the hardware of every circuit that is not the best
             if ckt != best:
@@ -789,63 +1213,22 @@ class CircuitPopulation:
         self.__log_event(2, "Ranked Fitness:", self.__circuits)
 
         # Generate a group of elites from the best n = <self.__n_elites>
-        # Circuits. Based on their fitness values, map each Circuit with
-        # a probabilty value (used later for crossover/copying/mutation).
-        elites = {}
-        elite_sum = 0
-
-        for i in range(self.__n_elites):
-            elites[self.__circuits[i]] = 0
-            elite_sum += self.__circuits[i].get_fitness()
-        if elite_sum > 0:
-            for elite in elites.keys():
-                elites[elite] = elite.get_fitness() / elite_sum
-        elif elite_sum == 0:
-            for elite in elites.keys():
-                elites[elite] = 1 / self.__n_elites
-        else:
+        # Circuits. Based on their fitness values, give each elite a
+        # probabilty value (used later for crossover/copying/mutation).
+        circuits = self.__circuits.get_circuits()
+        fitness = self.__circuits.get_fitness()
+        elite_fitness = fitness[:self.__n_elites]
+        if elite_fitness.sum() < 0:
             # elite_sum is negative. This should not be possible.
             self.__log_error(1, "Elite_sum is negative. Exiting...")
             exit()
+        probabilities = Selection.fitness_proportions(elite_fitness) if self.__n_elites != 0 else None
 
-        self.__log_event(2, "Elite Group:", elites.keys())
-        self.__log_event(2, "Elite Probabilites:", elites.values())
-        self.__protected_elites = elites.keys()
-
-        # For all Circuits in this CircuitPopulation, choose a random
-        # elite (based on the associated probabilities calculated above)
-        # and compare it to the Circuit. If the Circuit has lower
-        # fitness than the elite, perform crossover (with the elite) and
-        # mutation on it (or copy the elite's hardware if crossover is
-        # disabled).
-        elite_prob_sum = sum(elites.values())
-        for ckt in self.__circuits:
-            if self.__n_elites != 0:
-                if elite_prob_sum > 0:
-                    rand_elite = self.__rand.choice(
-                        list(elites.keys()),
-                        self.__n_elites,
-                        p=list(elites.values())
-                    )[0]
-                else:  # If fitness isn't negative, this should never happen
-                    rand_elite = self.__rand.choice(list(elites.keys()))[0]
-            else:
-                rand_elite = self.__rand.choice(self.__circuits)
-
-            self.__log_event(4, "Elite", rand_elite)
+        self.__log_event(2, "Elite Group:", circuits[:self.__n_elites])
+        self.__log_event(2, "Elite Probabilites:", probabilities)
+        self.__circuits.protect(slice(0, self.__n_elites))
 
-            if ckt.get_fitness() <= rand_elite.get_fitness() and ckt != rand_elite and ckt not in elites:
-                # if self.__config.get_crossover_probability() == 0:
-                # 	self.__log_event(3, "Cloning:", rand_elite, " ---> ", ckt)
-                # 	ckt.copy_from(rand_elite)
-                # else:
-                # 	self.__single_point_crossover(rand_elite, ckt)
-                if self.__rand.uniform(0, 1) <= self.__config.get_crossover_probability():
-                    self.__single_point_crossover(rand_elite, ckt)
-                else:
-                    self.__log_event(4, "Cloning:", rand_elite, " ---> ", ckt)
-                    ckt.copy_from(rand_elite)
-                ckt.mutate()
+        self.__replace_with_elites(circuits, fitness, probabilities, 4)
 
     def __run_rank_proportional_selection(self):
         '''
@@ -856,58 +1239,21 @@ class CircuitPopulation:
         self.__log_event(2, "Ranked Fitness:", self.__circuits)
 
         # Generate a group of elites from the best n = <self.__n_elites>
-        # Circuits. Based on their fitness values, map each Circuit with
-        # a probabilty value (used later for crossover/copying/mutation).
-        elites = {}
-        # can use summation formula since sum of ranks is the sum of natural numbers
-        elite_sum = (self.__n_elites) * (self.__n_elites + 1) / 2
-        if (elite_sum > 0):
-            for i in range(self.__n_elites):
-                # Using (self.__n_elites - i) since highest ranked indiviual is at self.__circuits[0]
-                elites[self.__circuits[i]] = (self.__n_elites - i) / elite_sum
-        else:
-            # elite_sum is negative. This should not be possible.
+        # Circuits. Based on their rank, give each elite a probabilty
+        # value (used later for crossover/copying/mutation).
+        if self.__n_elites <= 0:
+            # elite_sum is zero or negative. This should not be possible.
             self.__log_error(1, "Elite_sum is zero or negative. Exiting...")
             exit()
+        circuits = self.__circuits.get_circuits()
+        fitness = self.__circuits.get_fitness()
+        probabilities = Selection.rank_proportions(self.__n_elites)
 
-        self.__log_event(3, "Elite Group:", elites.keys())
-        self.__log_event(3, "Elite Probabilites:", elites.values())
-        self.__protected_elites = elites.keys()
-        #self.__log_event(3, "Elite", rand_elite)
-
-        # For all Circuits in this CircuitPopulation, choose a random
-        # elite (based on the associated probabilities calculated above)
-        # and compare it to the Circuit. If the Circuit has lower
-        # fitness than the elite, perform crossover (with the elite) and
-        # mutation on it (or copy the elite's hardware if crossover is
-        # disabled).
-        elite_prob_sum = sum(elites.values())
-        for ckt in self.__circuits:
-            if self.__n_elites != 0:
-                if elite_prob_sum > 0:
-                    rand_elite = self.__rand.choice(
-                        list(elites.keys()),
-                        self.__n_elites,
-                        p=list(elites.values())
-                    )[0]
-                else:  # If fitness isn't negative, this should never happen
-                    rand_elite = self.__rand.choice(list(elites.keys()))[0]
-            else:
-                rand_elite = self.__rand.choice(self.__circuits)
+        self.__log_event(3, "Elite Group:", circuits[:self.__n_elites])
+        self.__log_event(3, "Elite Probabilites:", probabilities)
+        self.__circuits.protect(slice(0, self.__n_elites))
 
-            if ckt.get_fitness() <= rand_elite.get_fitness() and ckt != rand_elite and ckt not in elites:
-                # if self.__config.get_crossover_probability() == 0:
-                #     self.__log_event(3, "Cloning:", rand_elite, " ---> ", ckt)
-                #     ckt.copy_from(rand_elite)
-                # else:
-                #     self.__single_point_crossover(rand_elite, ckt)
-
-                if self.__rand.uniform(0, 1) <= self.__config.get_crossover_probability():
-                    self.__single_point_crossover(rand_elite, ckt)
-                else:
-                    self.__log_event(3, "Cloning:", rand_elite, " ---> ", ckt)
-                    ckt.copy_from(rand_elite)
-                ckt.mutate()
+        self.__replace_with_elites(circuits, fitness, probabilities, 3)
 
     def __run_fractional_elite_tournament(self):
         """
@@ -918,130 +1264,71 @@ class CircuitPopulation:
 
         # Generate a group of elite Circuits from the
         # n = <self.__n_elites> best performing Circuits.
-        elite_group = []
-        for i in range(0, self.__n_elites):
-            elite_group.append(self.__circuits[i])
+        circuits = self.__circuits.get_circuits()
+        fitness = self.__circuits.get_fitness()
+        elite_group = circuits[:self.__n_elites]
         self.__log_info(3, "Elite Group:", elite_group)
 
-        # For all the Circuits in the CircuitPopulation compare the
-        # Circuit against a random elite Circuit from the group
-        # generated above. If the Circuit's fitness is less than than
-        # the elite's perform crossover (or clone if crossover is
-        # disabled) and then mutate the Circuit.
-        self.__protected_elites = elite_group
-        for ckt in self.__circuits:
-            rand_elite = self.__rand.choice(elite_group)
-            if ckt.get_fitness() <= rand_elite.get_fitness() and ckt != rand_elite and ckt not in elite_group:
-                # if self.__config.crossover_probability  == 0:
-                #     self.__log_event(3, "Cloning:", rand_elite, " ---> ", ckt)
-                #     ckt.replace_hardware_file(rand_elite.get_hardware_filepath)
-                # else:
-                #     self.__single_point_crossover(rand_elite, ckt)
-
-                if self.__rand.uniform(0, 1) <= self.__config.get_crossover_probability():
-                    self.__single_point_crossover(rand_elite, ckt)
-                else:
-                    self.__log_event(3, "Cloning:", rand_elite, " ---> ", ckt)
-                    ckt.copy_from(rand_elite)
-                ckt.mutate()
-
-    def __run_map_elites_selection(self):
-        """
-        Selection Algorithm that is an alternate version of the map elites algorithm from another paper.
-        This version of map elites will protect the highest-fitness individual in each "square"
-        We're going to have slightly granular squares to make sure that circuits have room to spread out early
-        to hopefully promote diversity
-        Group size length of 50 means we'll have 21x21 groups
-        """
-
-        if self.__config.get_map_elites_dimension() == 1:
-            elite_map = self.__generate_pulse_map()
-            elites = list(filter(lambda x: x != 0, [j for j in elite_map]))
-        else:
-            elite_map = self.__generate_map()
-            elites = list(filter(lambda x: x != 0, [j for sub in elite_map for j in sub]))
-
-        self.__protected_elites = elites
+        self.__circuits.protect(slice(0, self.__n_elites))
+        probabilities = np.full(self.__n_elites, 1 / self.__n_elites)
+        self.__replace_with_elites(circuits, fitness, probabilities, 3)
 
-        for ckt in self.__circuits:
-            # If not an elite, then we will clone and mutate
-            if ckt not in elites:
-                rand_elite = self.__rand.choice(elites)
-                ckt.copy_from(rand_elite)
-                ckt.mutate()
-        
-        self.__output_map_file(elite_map)
-
-    def __output_map_file(self, elite_map):
+    def __replace_with_elites(self, circuits, fitness, probabilities, clone_log_level):
         """
-        Writes the map to a file (workspace/maplivedata.log)
+        Shared step of the elite-based selection algorithms. For all the Circuits in the
+        CircuitPopulation, draw a random elite (according to the given probabilities) and compare
+        it to the Circuit. If the Circuit has lower fitness than the elite, perform crossover
+        (with the elite) or copy the elite's hardware, then mutate the Circuit.
+        The elites themselves are never replaced.
 
         Parameters
         ----------
-        elite_map : Circuit[][]
-            2D array of circuits that fell into these groupings depending on their characteristics.
-        """
-        with open("workspace/maplivedata.log", "w+") as liveFile:
-            # First line describes granularity/scale factor
-            liveFile.write("{}\n".format(str(ELITE_MAP_SCALE_FACTOR)))
-            # If square is empty, write a "blank" to that line
-            if self.__config.get_map_elites_dimension() == 1:
-                for c in range(len(elite_map)):
-                    ckt = elite_map[c]
-                    if ckt != 0:
-                        liveFile.write("{} {}\n".format(c, ckt.get_fitness()))
+        circuits : list[Circuit]
+            The population in ranked order
+        fitness : np.ndarray
+            The fitness of each circuit
+        probabilities : np.ndarray | None
+            The probability of drawing each of the best len(probabilities) circuits as a parent.
+            None draws parents uniformly from the whole population
+        clone_log_level : int
+            The log level of the "Cloning" messages
+        """
+        parents = Selection.draw_parents(self.__rand, len(circuits), probabilities)
+        to_replace = Selection.replaceable(fitness, parents, self.__n_elites)
+        crossovers = Selection.crossover_decisions(self.__rand, len(circuits), self.__snapshot.crossover_probability)
+        for i in np.flatnonzero(to_replace):
+            ckt = circuits[i]
+            rand_elite = circuits[parents[i]]
+            self.__log_event(4, "Elite", rand_elite)
+            if crossovers[i]:
+                self.__crossover(rand_elite, ckt)
             else:
-                for r in range(len(elite_map)):
-                    sl = elite_map[r]
-                    for c in range(len(sl)):
-                        ckt = sl[c]
-                        to_write = ""
-                        if ckt != 0:
-                            to_write = str(ckt.get_fitness())
-                        liveFile.write("{} {} {}\n".format(r, c, to_write))
-
-    def __generate_map(self):
-        """
-        Generates the elite map for this generation based on variance.
-        
-        Returns
-        -------
-        list(list(Circuit))
-            A 2D array of circuits catagorized based off of shared characteristics
-        """
-        # If the value is not a circuit (i.e. it is 0) then we know the spot is open to be filled in
-        # Go up to 21 since upper bound is 1024
-        # Can't do [[0]*21]*21 because this will make all the sub-arrays point to same memory location
-        elite_map = []
-        for i in range(22):
-            elite_map.append([0]*21)
-        # Evaluate each circuit's fitness and where it falls on the elite map
-        # Populate elite map first
-        for ckt in self.__circuits:
-            row = math.floor(ckt.get_low_value() / ELITE_MAP_SCALE_FACTOR)
-            col = math.floor(ckt.get_high_value() / ELITE_MAP_SCALE_FACTOR)
-            if elite_map[row][col] == 0 or ckt.get_fitness() > elite_map[row][col].get_fitness():
-                elite_map[row][col] = ckt
-        return elite_map
-   
-    def __generate_pulse_map(self):
-        """
-        Generates the elite map for this generation based on pulse count.
+                self.__log_event(clone_log_level, "Cloning:", rand_elite, " ---> ", ckt)
+                ckt.copy_from(rand_elite)
+            ckt.mutate()
 
-        Returns
-        -------
-        Circuit[][]
-            A 2D array of circuits catagorized based off of shared characteristics
+    def __run_map_elites_selection(self):
         """
-
-        elite_map = []
-        for i in range((150_000 - 1_000) / PULSE_ELITE_MAP_SCALE_FACTOR):
-            elite_map.append(0)
-        for ckt in self.__circuits:
-            col = math.floor(ckt.get_mean_frequency() / PULSE_ELITE_MAP_SCALE_FACTOR)
-            if elite_map[col] == 0 or ckt.get_fitness() > elite_map[col].get_fitness():
-                elite_map[col] = ckt
-        return elite_map
+        Selection Algorithm that is an alternate version of the map elites algorithm from another paper.
+        Circuits are placed in a persistent grid over the configured descriptors (by default the
+        lowest and highest voltage, or the pulse count for PULSE_CONSISTENCY), which keeps a copy
+        of the highest-fitness genome found in each cell. The best circuit of the generation is
+        kept, and every other circuit becomes a mutated copy of a random elite of the grid.
+        """
+        circuits = self.__circuits.get_circuits()
+        descriptors = np.column_stack([
+            self.__circuits.get_pulses() if key == "pulses" else self.__circuits.get_voltage(key)
+            for key in self.__map_descriptor_keys
+        ])
+        added = self.__map_archive.update(self.__genome_bits(circuits), self.__circuits.get_fitness(), descriptors)
+        self.__log_event(3, "MAP-Elites cells filled:", len(self.__map_archive), "new elites:", added)
+
+        self.__circuits.protect(0)
+        for ckt, genome in zip(circuits[1:], self.__map_archive.sample(self.__rand, circuits.size - 1)):
+            ckt.set_bitstream(genome)
+            ckt.mutate()
+
+        self.__map_archive.write_changes(MAP_LIVE_DATA_PATH)
 
     # SECTION Getters.
     def get_current_best_circuit(self):
@@ -1089,6 +1376,38 @@ class CircuitPopulation:
         return self.__best_epoch
 
     # SECTION Miscellaneous helper functions.
+    def __crossover(self, source, dest):
+        """
+        Crosses source into dest using the configured crossover type
+
+        Parameters
+        ----------
+        source : Circuit
+            The circuit you are copying data from.
+        dest : Circuit
+            The circuit you are overwriting data from source to.
+        """
+        if self.__crossover_type == "SINGLE_POINT":
+            self.__single_point_crossover(source, dest)
+            return
+
+        layout = self.__crossover_layout
+        if layout is None:
+            if isinstance(dest, FileBasedCircuit):
+                layout = dest.get_modifiable_layout()
+            else:
+                layout = len(dest.get_bitstream())
+            self.__crossover_layout = layout
+        num_bits = layout if isinstance(layout, int) else layout.offsets.size
+
+        if self.__crossover_type == "UNIFORM":
+            mask = Crossover.uniform_mask(self.__rand, num_bits)
+        elif self.__crossover_type == "K_POINT":
+            mask = Crossover.k_point_mask(self.__rand, num_bits, self.__crossover_points)
+        else:
+            mask = Crossover.tile_block_mask(self.__rand, layout.tile_x, layout.tile_y)
+        dest.crossover_mask(source, mask)
+
     def __single_point_crossover(self, source, dest):
         """
         Copy some series of chiasmas (points of genetic exchange) from fitter circuit into children
@@ -1103,12 +1422,12 @@ class CircuitPopulation:
         crossover_point = 0
 
         # Replace magic values with more generalized solutions
-        if self.__config.get_simulation_mode() == "FULLY_SIM":
+        if self.__snapshot.simulation_mode == "FULLY_SIM":
             crossover_point = self.__rand.integers(
                 1, len(self.__circuits[0].get_bitstream()) - 1)
-        elif self.__config.get_routing_type() == "MOORE":
+        elif self.__snapshot.routing_type == "MOORE":
             crossover_point = self.__rand.integers(1, 3)
-        elif self.__config.get_routing_type() == "NWSE":
+        elif self.__snapshot.routing_type == "NWSE":
             crossover_point = self.__rand.integers(13, 15)
         else:
             self.__log_error(
@@ -1125,37 +1444,17 @@ class CircuitPopulation:
         float
             Returns Hamming distance in the population.
         """
-        running_total = 0
-        n = len(self.__circuits)
-        num_pairs = n * (n-1) / 2
-
-        self.__log_event(4, "Starting Hamming Distance Calculation")
-        bitstreams = list(map(lambda c: c.get_bitstream(), self.__circuits))
-
-        # We now have all the bitstreams, we can do the faster hamming calculation by comparing each bit of them
-        # Then we multiply the count of 1s for that bit by the count of 0s for that bit and add it to the running_total
-        # Divide that by # of pairs at the end (calculation shown below)
-        running_total = 0
-        n = len(self.__circuits)
-        num_pairs = n * (n-1) / 2
-        self.__log_event(4, "HDIST - Entering loop")
-        for i in range(len(bitstreams[0])):
-            ones_count = 0
-            zero_count = 0
-            for j in range(n):
-                if bitstreams[j][i] == 0:
-                    zero_count = zero_count + 1
-                else:
-                    ones_count = ones_count + 1
-            running_total = running_total + ones_count * zero_count
+        self.__refresh_bit_matrix()
+        return self.__avg_hamming_dist(self.__bit_matrix)
 
-        running_total = running_total / num_pairs
-        self.__log_event(4, "HDIST - Final value", running_total)
-        return running_total
+    def __avg_hamming_dist(self, matrix):
+        dist = matrix.avg_hamming_dist()
+        self.__log_event(4, "HDIST - Final value", dist)
+        return dist
 
     def count_unique(self):
         """
-        Returns the number of unique files in the population
+        Returns the number of unique bitstreams in the population
 
         Returns
         -------
@@ -1163,61 +1462,14 @@ class CircuitPopulation:
             Number of unique circuits in the population
         
         """
-        if self.__config.get_simulation_mode() == "FULLY_SIM":
-            bitstreams = []
-            for ckt in self.__circuits:
-                bitstreams.append(ckt.get_sim_bitstream())
-            bitstreams = self.__unique(bitstreams)
-            self.__log_event(
-                2, "Number of Unique Individuals:", len(bitstreams))
-            return len(bitstreams)
-
-        # If not FULLY_SIM, then run this
-        # TODO: Optimize
-        bin_dir = self.__config.get_bin_directory()
-        dir_list = os.listdir(bin_dir)
-        files = [f for f in dir_list if os.path.isfile(
-            str(bin_dir)+'/'+f)]  # Filter out non-files
-        unique_file_paths = []
-        for file in files:
-            full_path = str(bin_dir) + '/' + file
-            not_unique = False
-            for u in unique_file_paths:
-                if self.__files_eq(full_path, u):
-                    not_unique = True
-                    break
-            if not not_unique:
-                unique_file_paths.append(full_path)
-        self.__log_event(2, "Number of Unique Individuals:",
-                         len(unique_file_paths))
-        return len(unique_file_paths)
-
-    def __unique(self, arrays):
-        """
-        Returns an array of unique arrays from the input
+        self.__refresh_bit_matrix()
+        return self.__count_unique(self.__bit_matrix)
 
-        Parameters
-        ----------
-        arrays : list[list[T]]
-            An array containing arrays
+    def __count_unique(self, matrix):
+        count = matrix.count_unique()
+        self.__log_event(2, "Number of Unique Individuals:", count)
+        return count
 
-        Returns
-        -------
-        list[T]
-            Returns a list of all of the unique lists contained in the arrays variable
-        """
-        soln = []
-        for a in arrays:
-            # Check if its in soln; if not, then add it
-            shouldAdd = True
-            for b in soln:
-                if self.__arr_eq(a, b):
-                    shouldAdd = False
-                    break
-            if shouldAdd:
-                soln.append(a)
-        return soln
-    
     def count_differing_bits(self):
         """
         Returns the number of bits in the bistream where 2 circuits have different values
@@ -1228,19 +1480,12 @@ class CircuitPopulation:
             Number of bits in the bistream where 2 circuits have different values
         
         """
-        if self.__config.get_simulation_mode() == "FULLY_SIM":
-            bitstream_sums = np.zeros[len(self.__circuits[0].get_sim_bitstream())]
-            for ckt in self.__circuits:
-                bitstream_sums += np.array(ckt.get_sim_bitstream())
-        else:
-            bitstream_sums = self.__population_bistream_sum
-
-        count = 0
-        for bit_sum in bitstream_sums:
-            if bit_sum != 0 and bit_sum != len(self.__circuits):
-                count += 1
-        self.__log_event(
-                2, "Number of differing bits:", count)
+        self.__refresh_bit_matrix()
+        return self.__count_differing_bits(self.__bit_matrix)
+
+    def __count_differing_bits(self, matrix):
+        count = matrix.count_differing_bits()
+        self.__log_event(2, "Number of differing bits:", count)
         return count
 
     def get_differing_bits_str(self):
@@ -1252,74 +1497,27 @@ class CircuitPopulation:
             The number of circuits with a 1 at each bit in the bitstream
         
         """
-        s = ""
-        for bit in self.__population_bistream_sum:
-            s += chr(int(bit)+32)
-        return s 
-
-    def __arr_eq(self, ar1, ar2):
-        """
-        Returns True if the arrays or equal or False otherwise
-        Compares each element of ar1 and ar2
-
-        Parameters
-        ----------
-        ar1 : list
-            an array
-        ar2 : list
-            an array
-
-        Returns
-        -------
-        bool
-            True if the arrays are equivalent in content and order, False otherwise.
-        """
-        if len(ar1) != len(ar2):
-            return False
-        for i in range(0, len(ar1)):
-            if ar1[i] != ar2[i]:
-                return False
-        return True
+        self.__refresh_bit_matrix()
+        return self.__bit_matrix.differing_bits_str()
 
-    def __files_eq(self, fp1, fp2):
+    def pairwise_hamming_dists(self):
         """
-        Returns true if the files are equal (have the same content)
-
-        Parameters
-        ----------
-        fp1 : str
-            Path to file 1
-        fp2 : str
-            Path to file 2
+        Returns the Hamming distance between every pair of circuits in the population
 
         Returns
         -------
-        bool
-            True if both files contain the same content, False otherwise.
+        np.ndarray
+            Matrix where entry i, j is the distance between the circuits ranked i and j
         """
-        content1 = []
-        content2 = []
-        with open(fp1, 'rb') as content:
-            content1 = content.read()
-        with open(fp2, 'rb') as content:
-            content2 = content.read()
-        return list(content1) == list(content2)
+        self.__refresh_bit_matrix()
+        return self.__bit_matrix.pairwise_hamming()
 
-    # TODO Take a closer look at this function
-    @staticmethod
-    def __group(iterable, n, fillvalue=None):
+    def __refresh_bit_matrix(self):
         """
-        .. todo::
-            Take a closer look at this function. Not sure why, but a comment here told me to.
-            Also, further document what this function is I couldn't tell.
-        
-        Collect data into fixed-length chunks or blocks
-        #grouper('ABCDEFG', 3, 'x') --> ABC DEF Gxx
-        Taken from python recipes.
+        Reloads the population bit matrix from the circuits' current bitstreams
         """
-
-        args = [iter(iterable)] * n
-        return zip_longest(fillvalue=fillvalue, *args)
+        with TIMER.stage("bit_matrix"):
+            self.__bit_matrix.update(ckt.get_bitstream() for ckt in self.__circuits)
 
     def __log_event(self, level, *event):
         """
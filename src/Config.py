@@ -9,12 +9,59 @@ from configparser import ConfigParser
 from configparser import NoOptionError
 from xml.dom import NotFoundErr
 from datetime import datetime
+from typing import NamedTuple, Optional, Union
+from Telemetry import parse_address
 
 # TODO Add handling for missing values
 # NOTE Fails ungracefully at missing values currently
 
 FAIL = '\033[91m'
 ENDC = '\033[0m'
+
+# The MAP-Elites descriptors, with the default cell width and number of cells along each
+MAP_ELITES_DESCRIPTOR_DEFAULTS = {
+	"LOW_VOLTAGE": (50, 22),
+	"HIGH_VOLTAGE": (50, 21),
+	"MEAN_VOLTAGE": (50, 21),
+	"PULSES": (5000, 30),
+}
+
+class ConfigSnapshot(NamedTuple):
+	"""
+	Immutable, validated copy of the settings that are read inside the evolution loop,
+	returned by :meth:`Config.get_snapshot`. Reading an attribute is a plain tuple lookup,
+	where the Config getters parse and validate the value from the config file on every call.
+	"""
+	simulation_mode: str
+	fitness_func: str
+	is_pulse_func: bool
+	is_pulse_count: bool
+	map_elites_dimension: Optional[int]
+	map_elites_descriptors: Optional[tuple]
+	map_elites_bin_sizes: Optional[tuple]
+	map_elites_bins: Optional[tuple]
+	num_samples: int
+	num_passes: int
+	population_size: int
+	selection_type: str
+	mutation_probability: float
+	crossover_probability: float
+	crossover_type: str
+	crossover_points: int
+	elitism_fraction: float
+	random_injection: float
+	diversity_measure: str
+	init_mode: str
+	randomization_type: str
+	n_generations: Union[int, str]
+	routing_type: str
+	accessed_columns: tuple
+	log_level: int
+	upload_fpgas: Optional[tuple]
+	iceprog_command: Optional[tuple]
+	settle_time: Optional[float]
+	skip_redundant_uploads: Optional[bool]
+
 class Config:
 	"""
 	This class is instantiated to aquire values from the config file for the evolutionary run. 
@@ -36,6 +83,7 @@ class Config:
 		self.__config_parser = ConfigParser()
 		self.__config_parser.read(filename)
 		self.__filename = filename
+		self.__snapshot = None
 
 	def add_logger(self, logger):
 		"""
@@ -386,6 +434,59 @@ class Config:
 			exit()
 		return value
 
+	def get_single_capture(self):
+		try:
+			input = self.get_fitness_parameters("single_capture")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return False
+
+	def get_adc_sample_interval(self):
+		try:
+			interval = float(self.get_fitness_parameters("adc_sample_interval"))
+		except NoOptionError:
+			return 0.8e-3
+		if interval <= 0.0:
+			self.__log_error(1, "Invalid ADC sample interval " + str(interval) + "'. Must be greater than zero.")
+			exit()
+		return interval
+
+	def get_racing(self):
+		try:
+			input = self.get_fitness_parameters("racing")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return False
+
+	def get_racing_confidence(self):
+		try:
+			confidence = float(self.get_fitness_parameters("racing_confidence"))
+		except NoOptionError:
+			return 2.0
+		if confidence <= 0.0:
+			self.__log_error(1, "Invalid racing confidence " + str(confidence) + "'. Must be greater than zero.")
+			exit()
+		return confidence
+
+	def get_fitness_cache(self):
+		try:
+			input = self.get_fitness_parameters("fitness_cache")
+		except NoOptionError:
+			return None
+		if input == "":
+			return None
+		return Path(input)
+
+	def get_fitness_cache_size(self):
+		try:
+			size = int(self.get_fitness_parameters("fitness_cache_size"))
+		except NoOptionError:
+			return 1000000
+		if size < 1:
+			self.__log_error(1, "Invalid fitness cache size " + str(size) + "'. Must be at least 1.")
+			exit()
+		return size
+
 	# SECTION Getters for GA Parameters.
 	def get_population_size(self):
 		popSize = int(self.get_ga_parameters("POPULATION_SIZE"))
@@ -414,6 +515,52 @@ class Config:
 			exit()
 		return prob
 
+	def get_crossover_type(self):
+		try:
+			input = self.get_ga_parameters("crossover_type")
+		except NoOptionError:
+			return "SINGLE_POINT"
+		valid_vals = ["SINGLE_POINT", "UNIFORM", "K_POINT", "TILE_BLOCK"]
+		self.check_valid_value("crossover type", input, valid_vals)
+		return input
+
+	def get_crossover_points(self):
+		try:
+			points = int(self.get_ga_parameters("crossover_points"))
+		except NoOptionError:
+			return 2
+		if points < 1:
+			self.__log_error(1, "Invalid number of crossover points " + str(points) + "'. Must be at least one.")
+			exit()
+		return points
+
+	def get_surrogate_screening(self):
+		try:
+			input = self.get_ga_parameters("surrogate_screening")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return False
+
+	def get_surrogate_eval_fraction(self):
+		try:
+			frac = float(self.get_ga_parameters("surrogate_eval_fraction"))
+		except NoOptionError:
+			return 0.5
+		if frac <= 0.0 or frac > 1.0:
+			self.__log_error(1, "Invalid surrogate evaluation fraction " + str(frac) + "'. Must be greater than zero and at most one.")
+			exit()
+		return frac
+
+	def get_surrogate_warmup(self):
+		try:
+			warmup = int(self.get_ga_parameters("surrogate_warmup"))
+		except NoOptionError:
+			return 2 * self.get_population_size()
+		if warmup < 1:
+			self.__log_error(1, "Invalid surrogate warmup " + str(warmup) + "'. Must be at least one.")
+			exit()
+		return warmup
+
 	def get_elitism_fraction(self):
 		frac = float(self.get_ga_parameters("ELITISM_FRACTION"))
 		if frac < 0.0:
@@ -430,6 +577,24 @@ class Config:
 		self.check_valid_value("selection type", input, valid_vals)
 		return input
 
+	def get_evolution_mode(self):
+		try:
+			input = self.get_ga_parameters("evolution_mode")
+		except NoOptionError:
+			return "GENERATIONAL"
+		valid_vals = ["GENERATIONAL", "STEADY_STATE"]
+		self.check_valid_value("evolution mode", input, valid_vals)
+		return input
+
+	def get_steady_state_replacement(self):
+		try:
+			input = self.get_ga_parameters("steady_state_replacement")
+		except NoOptionError:
+			return "REPLACE_WORST"
+		valid_vals = ["REPLACE_WORST", "TOURNAMENT"]
+		self.check_valid_value("steady state replacement", input, valid_vals)
+		return input
+
 	def get_random_injection(self):
 		frac = float(self.get_ga_parameters("RANDOM_INJECTION"))
 		if frac < 0.0:
@@ -551,6 +716,26 @@ class Config:
 		
 	def get_env_usb_path(self):
 		return self.get_sensitivity_parameters("ENVIRONMENT_USB_PATH")
+
+	def get_env_sample_interval(self):
+		try:
+			interval = float(self.get_sensitivity_parameters("env_sample_interval"))
+		except NoOptionError:
+			return 2.0
+		if interval <= 0:
+			self.__log_error(1, "Invalid environment sample interval " + str(interval) + "'. Must be greater than zero.")
+			exit()
+		return interval
+
+	def get_env_buffer_size(self):
+		try:
+			size = int(self.get_sensitivity_parameters("env_buffer_size"))
+		except NoOptionError:
+			return 1024
+		if size < 1:
+			self.__log_error(1, "Invalid environment buffer size " + str(size) + "'. Must be at least one.")
+			exit()
+		return size
 	
 	#SECTION getts for transferability experiment parameters
 	def using_transfer_interval(self):
@@ -587,6 +772,20 @@ class Config:
 		except NoOptionError:
 			return True	
 
+	def get_save_generations(self):
+		try:
+			input = self.get_logging_parameters("save_generations")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return True
+
+	def get_background_bookkeeping(self):
+		try:
+			input = self.get_logging_parameters("background_bookkeeping")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return True
+
 	def saving_population_bistream(self):
 		return isinstance(self.get_population_bistream_save_interval(), int)	
 	
@@ -620,6 +819,28 @@ class Config:
 			return input == "true" or input == "True"
 		except NoOptionError:
 				return True	
+
+	def get_metrics(self):
+		try:
+			input = self.get_logging_parameters("metrics")
+		except NoOptionError:
+			return None
+		if input == "":
+			return None
+		host, _, port = input.rpartition(":")
+		if host == "" or not port.isdigit():
+			self.__log_error(1, "Invalid metrics address '" + input + "'. Must be HOST:PORT")
+			exit()
+		return input
+
+	def get_workspace_archive_format(self):
+		try:
+			input = self.get_logging_parameters("workspace_archive_format")
+		except NoOptionError:
+			return "DIRECTORY"
+		valid_vals = ["DIRECTORY", "TAR_GZ", "TAR_XZ"]
+		self.check_valid_value("workspace archive format", input, valid_vals)
+		return input
 	
 	def get_asc_directory(self):
 		try:
@@ -699,6 +920,20 @@ class Config:
 		except NoOptionError:
 			return True	
 
+	def get_log_timing(self):
+		try:
+			input = self.get_logging_parameters("log_timing")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return True
+
+	def get_timing_trace(self):
+		try:
+			input = self.get_logging_parameters("timing_trace")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return False
+
 	# SECTION Getters for system parameters.
 	def get_fpga(self):
 		return self.get_system_parameters("FPGA")
@@ -709,6 +944,12 @@ class Config:
 	def get_upload_to_arduino(self):
 		value = self.get_system_parameters("auto_upload_to_arduino")
 		return value== "true" or value == "True"
+
+	def get_iceprog_command(self):
+		try:
+			return self.get_system_parameters("iceprog_command").split()
+		except NoOptionError:
+			return ["iceprog"]
 		
 	# SECTION Getters for hardware parameters
 	def get_routing_type(self):
@@ -744,6 +985,77 @@ class Config:
 	def get_mcu_read_timeout(self):
 		return float(self.get_hardware_parameters("MCU_READ_TIMEOUT"))
 
+	def get_settle_time(self):
+		try:
+			seconds = float(self.get_hardware_parameters("settle_time"))
+		except NoOptionError:
+			return 1.0
+		if seconds < 0.0:
+			self.__log_error(1, "Invalid settle time " + str(seconds) + "'. Must be at least zero.")
+			exit()
+		return seconds
+
+	def get_skip_redundant_uploads(self):
+		try:
+			input = self.get_hardware_parameters("skip_redundant_uploads")
+			return input == "true" or input == "True"
+		except NoOptionError:
+			return True
+
+	def get_upload_order(self):
+		try:
+			input = self.get_hardware_parameters("upload_order")
+		except NoOptionError:
+			return "RANDOM"
+		valid_vals = ["RANDOM", "GROUPED"]
+		self.check_valid_value("upload order", input, valid_vals)
+		return input
+
+	def get_serial_transport(self):
+		try:
+			input = self.get_hardware_parameters("serial_transport")
+		except NoOptionError:
+			return "SERIAL"
+		valid_vals = ["SERIAL", "SIMULATED"]
+		self.check_valid_value("serial transport", input, valid_vals)
+		return input
+
+	def get_simulated_baud(self):
+		try:
+			baud = int(self.get_hardware_parameters("simulated_baud"))
+		except NoOptionError:
+			return self.get_serial_baud()
+		if baud < 0:
+			self.__log_error(1, "Invalid simulated baud " + str(baud) + "'. Must be at least zero.")
+			exit()
+		return baud
+
+	def get_simulated_time_scale(self):
+		try:
+			scale = float(self.get_hardware_parameters("simulated_time_scale"))
+		except NoOptionError:
+			return 1.0
+		if scale < 0.0:
+			self.__log_error(1, "Invalid simulated time scale " + str(scale) + "'. Must be at least zero.")
+			exit()
+		return scale
+
+	def get_simulated_dropout_rate(self):
+		return self.__get_simulated_rate("simulated_dropout_rate")
+
+	def get_simulated_malformed_rate(self):
+		return self.__get_simulated_rate("simulated_malformed_rate")
+
+	def __get_simulated_rate(self, param):
+		try:
+			rate = float(self.get_hardware_parameters(param))
+		except NoOptionError:
+			return 0.0
+		if rate < 0.0 or rate > 1.0:
+			self.__log_error(1, "Invalid " + param + " " + str(rate) + "'. Must be between zero and one.")
+			exit()
+		return rate
+
 	def get_launch_plots(self):
 		value = self.get_plotting_parameters("launch_plots")
 		return value == "true" or value == "True"
@@ -751,6 +1063,20 @@ class Config:
 	def get_frame_interval(self):
 		return int(self.get_plotting_parameters("frame_interval"))
 
+	def get_telemetry(self):
+		try:
+			input = self.get_plotting_parameters("telemetry")
+		except NoOptionError:
+			return None
+		if input == "":
+			return None
+		try:
+			parse_address(input)
+		except ValueError:
+			self.__log_error(1, "Invalid telemetry address '" + input + "'. Must be unix:PATH or HOST:PORT")
+			exit()
+		return input
+
 	def check_valid_value(self, param_name, user_input, allowed_values):
 		if not user_input in allowed_values:
 			self.__log_error(1, "Invalid " + param_name + " '" + str(user_input) + "'. Valid parameters are: " + 
@@ -769,6 +1095,7 @@ class Config:
 			self.validate_stopping_params()
 
 		self.validate_logging_params()
+		self.validate_environment_params()
 		
 		if self.get_simulation_mode != 'FULLY_SIM' and self.get_simulation_mode != 'SIM_HARDWARE':
 			self.validate_system_params()
@@ -781,13 +1108,122 @@ class Config:
 		if self.get_fitness_func() == "PULSE_CONSISTENCY" and (self.get_num_passes() * self.get_num_samples()) <= 1:
 			self.__log_error(1, "PULSE_CONSISTENCY function can only be used with multiple samples/passes")
 			exit()
-		# MAP elites can only be used with VARIANCE, COMBINED, and PULSE CONSISTENCY
+		# COMBINED is only scored from a single ADC capture, so it needs the same opt in
+		if self.get_fitness_func() == "COMBINED" and self.get_simulation_mode() == "FULLY_INTRINSIC" and not self.get_single_capture():
+			self.__log_error(1, "The COMBINED fitness function estimates the pulse count from one ADC capture. Set single_capture = true to use it")
+			exit()
+		# The dominant frequency of an ADC capture can only be found below half its sample rate
+		if (self.get_fitness_func() == "COMBINED" or self.is_pulse_func()) and self.get_single_capture() \
+				and self.get_desired_frequency() * 2 * self.get_adc_sample_interval() >= 1:
+			self.__log_warning(1, "desired_freq " + str(self.get_desired_frequency()) + " Hz is above the highest frequency an ADC capture can resolve (" +
+				str(int(0.5 / self.get_adc_sample_interval())) + " Hz at adc_sample_interval " + str(self.get_adc_sample_interval()) + " s)")
+		# Tile block crossover needs the tiles of a hardware file
+		if self.get_crossover_type() == "TILE_BLOCK" and self.get_simulation_mode() == "FULLY_SIM":
+			self.__log_error(1, "TILE_BLOCK crossover can not be used in FULLY_SIM mode")
+			exit()
+		# MAP elites needs descriptors that the fitness function measures: voltages are recorded
+		# by VARIANCE and COMBINED, pulse counts by the pulse fitness functions
 		if self.get_selection_type() == "MAP_ELITES":
-			if self.get_fitness_func() not in ["VARIANCE", "COMBINED", "PULSE_CONSISTENCY"]:
-				self.__log_error(1, "MAP_ELITES selection can only be used with the following fitness functions: " +
-				"VARIANCE, COMBINED, PULSE_CONSISTENCY")
+			descriptors = self.get_map_elites_descriptors()
+			if descriptors is None:
+				self.__log_error(1, "MAP_ELITES selection needs map_elites_descriptors with fitness function " +
+				self.get_fitness_func() + ". By default it can only be used with VARIANCE, COMBINED and PULSE_CONSISTENCY")
+				exit()
+			for descriptor in descriptors:
+				if descriptor == "PULSES" and not self.is_pulse_func():
+					self.__log_error(1, "The PULSES MAP-Elites descriptor can only be used with a pulse fitness function")
+					exit()
+				if descriptor != "PULSES" and self.get_fitness_func() not in ["VARIANCE", "COMBINED"]:
+					self.__log_error(1, "The " + descriptor + " MAP-Elites descriptor can only be used with VARIANCE or COMBINED")
+					exit()
+
+		# Screened out circuits are not measured, so they have no descriptors to place them by
+		if self.get_surrogate_screening() and self.get_selection_type() == "MAP_ELITES":
+			self.__log_error(1, "surrogate_screening can not be used with MAP_ELITES selection")
+			exit()
+
+		# Racing is for a set of elites, and needs the fitness of a single sample to mean something
+		if self.get_racing() and self.get_selection_type() == "MAP_ELITES":
+			self.__log_error(1, "racing can not be used with MAP_ELITES selection")
+			exit()
+		if self.get_racing() and self.get_fitness_func() == "PULSE_CONSISTENCY":
+			self.__log_error(1, "racing can not be used with the PULSE_CONSISTENCY fitness function")
+			exit()
+
+		# Steady state evolution measures one circuit at a time, and has its own selection
+		if self.get_evolution_mode() == "STEADY_STATE":
+			if self.get_selection_type() == "MAP_ELITES":
+				self.__log_error(1, "STEADY_STATE evolution can not be used with MAP_ELITES selection")
+				exit()
+			if self.get_surrogate_screening() or self.get_racing():
+				self.__log_error(1, "STEADY_STATE evolution can not be used with surrogate_screening or racing")
 				exit()
 
+		# Only simulated hardware has a fitness that is a function of the genome alone
+		if self.get_fitness_cache() is not None and self.get_simulation_mode() != "SIM_HARDWARE":
+			self.__log_error(1, "fitness_cache can only be used in SIM_HARDWARE mode")
+			exit()
+
+		self.get_snapshot()
+
+	def get_snapshot(self):
+		"""
+		Reads and validates the settings used inside the evolution loop once, so that hot paths
+		can use plain attribute lookups instead of the getters.
+
+		Returns
+		-------
+		ConfigSnapshot
+			The settings. Built on the first call and shared afterwards
+		"""
+		if self.__snapshot is None:
+			# The upload settings only exist in the config of runs that use the FPGAs
+			upload_fpgas = iceprog_command = settle_time = skip_redundant_uploads = None
+			if self.get_simulation_mode() not in ("FULLY_SIM", "SIM_HARDWARE"):
+				upload_fpgas = (self.get_fpga(),)
+				# if switching fpgas every sample, need to upload to the second fpga also
+				if self.get_transfer_sample():
+					upload_fpgas += (self.get_fpga2(),)
+				iceprog_command = tuple(self.get_iceprog_command())
+				settle_time = self.get_settle_time()
+				skip_redundant_uploads = self.get_skip_redundant_uploads()
+			self.__snapshot = ConfigSnapshot(
+				simulation_mode=self.get_simulation_mode(),
+				fitness_func=self.get_fitness_func(),
+				is_pulse_func=self.is_pulse_func(),
+				is_pulse_count=self.is_pulse_count(),
+				map_elites_dimension=self.get_map_elites_dimension(),
+				map_elites_descriptors=self.__as_tuple(self.get_map_elites_descriptors()),
+				map_elites_bin_sizes=self.__as_tuple(self.get_map_elites_bin_sizes()),
+				map_elites_bins=self.__as_tuple(self.get_map_elites_bins()),
+				num_samples=self.get_num_samples(),
+				num_passes=self.get_num_passes(),
+				population_size=self.get_population_size(),
+				selection_type=self.get_selection_type(),
+				mutation_probability=self.get_mutation_probability(),
+				crossover_probability=self.get_crossover_probability(),
+				crossover_type=self.get_crossover_type(),
+				crossover_points=self.get_crossover_points(),
+				elitism_fraction=self.get_elitism_fraction(),
+				random_injection=self.get_random_injection(),
+				diversity_measure=self.get_diversity_measure(),
+				init_mode=self.get_init_mode(),
+				randomization_type=self.get_randomization_type(),
+				n_generations=self.get_n_generations(),
+				routing_type=self.get_routing_type(),
+				accessed_columns=tuple(int(col) for col in self.get_accessed_columns()),
+				log_level=self.get_log_level(),
+				upload_fpgas=upload_fpgas,
+				iceprog_command=iceprog_command,
+				settle_time=settle_time,
+				skip_redundant_uploads=skip_redundant_uploads
+			)
+		return self.__snapshot
+
+	@staticmethod
+	def __as_tuple(values):
+		return None if values is None else tuple(values)
+
 	# True if the fitness function counts pulses
 	def is_pulse_func(self):
 		return (self.get_fitness_func() == 'PULSE_COUNT' or self.get_fitness_func() == 'TOLERANT_PULSE_COUNT' 
@@ -799,16 +1235,74 @@ class Config:
 				or self.get_fitness_func() == 'SENSITIVE_PULSE_COUNT')
 	
 	def get_map_elites_dimension(self):
-		if self.get_fitness_func() in ['PULSE_CONSISTENCY']:
-			return 1
-		elif self.get_fitness_func() in ['VARIANCE', 'COMBINED']:
-			return 2
+		descriptors = self.get_map_elites_descriptors()
+		if descriptors is not None:
+			return len(descriptors)
+
+	def get_map_elites_descriptors(self):
+		"""
+		Returns
+		-------
+		list[str] | None
+			The behaviour descriptors that place circuits in the MAP-Elites grid. Defaults to the
+			pulse count for PULSE_CONSISTENCY and the lowest and highest voltage for VARIANCE and
+			COMBINED, and None for other fitness functions
+		"""
+		try:
+			descriptors = self.get_ga_parameters("map_elites_descriptors").split(",")
+		except NoOptionError:
+			if self.get_fitness_func() in ['PULSE_CONSISTENCY']:
+				return ["PULSES"]
+			elif self.get_fitness_func() in ['VARIANCE', 'COMBINED']:
+				return ["LOW_VOLTAGE", "HIGH_VOLTAGE"]
+			return None
+		descriptors = [descriptor.strip() for descriptor in descriptors]
+		for descriptor in descriptors:
+			self.check_valid_value("MAP-Elites descriptor", descriptor, list(MAP_ELITES_DESCRIPTOR_DEFAULTS))
+		return descriptors
+
+	def get_map_elites_bin_sizes(self):
+		"""
+		Returns
+		-------
+		list[float] | None
+			The width of a MAP-Elites cell along each descriptor
+		"""
+		return self.__get_map_elites_axes("map_elites_bin_sizes", float, 0)
+
+	def get_map_elites_bins(self):
+		"""
+		Returns
+		-------
+		list[int] | None
+			The number of MAP-Elites cells along each descriptor
+		"""
+		return self.__get_map_elites_axes("map_elites_bins", int, 1)
+
+	def __get_map_elites_axes(self, param, convert, default_index):
+		descriptors = self.get_map_elites_descriptors()
+		if descriptors is None:
+			return None
+		try:
+			values = [convert(value) for value in self.get_ga_parameters(param).split(",")]
+		except NoOptionError:
+			return [MAP_ELITES_DESCRIPTOR_DEFAULTS[descriptor][default_index] for descriptor in descriptors]
+		if len(values) != len(descriptors):
+			self.__log_error(1, "Invalid " + param + " '" + str(values) + "'. Must have one value for each of the "
+				+ str(len(descriptors)) + " MAP-Elites descriptors.")
+			exit()
+		for value in values:
+			if value <= 0:
+				self.__log_error(1, "Invalid " + param + " value '" + str(value) + "'. Must be greater than zero.")
+				exit()
+		return values
 
 	def validate_fitness_params(self):
 		self.get_fitness_func()
 
 		if self.get_fitness_func() == "COMBINED":
 			self.get_combined_mode()
+			self.get_desired_frequency()
 			self.get_pulse_weight()
 			self.get_var_weight()
 
@@ -816,15 +1310,36 @@ class Config:
 			self.get_desired_frequency()
 			self.get_num_samples()
 			self.get_num_passes()
+			self.get_single_capture()
+
+		if self.get_fitness_func() == "COMBINED" or (self.is_pulse_func() and self.get_single_capture()):
+			self.get_adc_sample_interval()
+
+		if self.get_racing():
+			self.get_racing_confidence()
+
+		if self.get_fitness_cache() is not None:
+			self.get_fitness_cache_size()
 
 	def validate_ga_params(self):
 		self.get_population_size()
 		self.get_mutation_probability()
 		self.get_crossover_probability()
+		self.get_crossover_type()
+		if self.get_crossover_type() == "K_POINT":
+			self.get_crossover_points()
 		self.get_elitism_fraction()
 		self.get_selection_type()
 		self.get_diversity_measure()
 		self.get_random_injection()
+		if self.get_selection_type() == "MAP_ELITES":
+			self.get_map_elites_bin_sizes()
+			self.get_map_elites_bins()
+		if self.get_surrogate_screening():
+			self.get_surrogate_eval_fraction()
+			self.get_surrogate_warmup()
+		if self.get_evolution_mode() == "STEADY_STATE":
+			self.get_steady_state_replacement()
 
 	def validate_init_params(self):
 		self.get_init_mode()
@@ -852,17 +1367,32 @@ class Config:
 		self.get_src_pops_dir()
 		self.get_datetime_format()
 		self.get_generations_directory()
+		self.get_save_generations()
+		self.get_background_bookkeeping()
 		self.get_use_ovr_best()
+		self.get_log_timing()
+		self.get_timing_trace()
+		self.get_workspace_archive_format()
+		self.get_metrics()
 
 	def validate_system_params(self):
 		self.get_fpga()
 		self.get_usb_path()
+		self.get_iceprog_command()
 
 	def validate_hardware_params(self):
 		self.get_routing_type()
 		self.get_serial_baud()
 		self.get_accessed_columns()
 		self.get_mcu_read_timeout()
+		self.get_settle_time()
+		self.get_skip_redundant_uploads()
+		self.get_upload_order()
+		if self.get_serial_transport() == "SIMULATED":
+			self.get_simulated_baud()
+			self.get_simulated_time_scale()
+			self.get_simulated_dropout_rate()
+			self.get_simulated_malformed_rate()
 		if self.get_using_configurable_io():
 			self.get_input_pins()
 			self.get_output_pins()
@@ -870,10 +1400,18 @@ class Config:
 	def validate_plotting_params(self):
 		self.get_launch_plots()
 		self.get_frame_interval()
+		self.get_telemetry()
 
 	def validate_sensitivity_params(self):
 		self.get_test_circuit()
 		self.get_sensitivity_trials()
+
+	def validate_environment_params(self):
+		# The environment sampler runs in every mode that uses the microcontroller, not only sensitivity runs
+		if self.get_simulation_mode() in ("FULLY_INTRINSIC", "INTRINSIC_SENSITIVITY") and self.reading_temp_humidity():
+			self.get_env_usb_path()
+			self.get_env_sample_interval()
+			self.get_env_buffer_size()
 		
 	def __log_event(self, level, *event):
 		"""
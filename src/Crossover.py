@@ -0,0 +1,81 @@
+"""
+Crossover.py
+------------
+
+Builds the masks used by the mask-based crossover operators.
+
+A mask has one boolean entry per modifiable bit of a circuit (in get_bitstream order). The child
+takes the bits where the mask is True from its parent and keeps its own bits elsewhere, so every
+operator costs a single vectorized copy no matter how the bits are chosen.
+"""
+
+import numpy as np
+
+def uniform_mask(rand, num_bits):
+    """
+    Takes each bit from the parent with probability 1/2
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    num_bits : int
+        The number of modifiable bits
+
+    Returns
+    -------
+    np.ndarray
+        The crossover mask
+    """
+    return rand.integers(0, 2, num_bits).astype(bool)
+
+def k_point_mask(rand, num_bits, num_points):
+    """
+    Cuts the bitstream at num_points random places and takes every other segment from the parent,
+    starting with the first
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    num_bits : int
+        The number of modifiable bits
+    num_points : int
+        The number of crossover points. Capped at num_bits - 1
+
+    Returns
+    -------
+    np.ndarray
+        The crossover mask
+    """
+    num_points = min(num_points, num_bits - 1)
+    points = rand.choice(np.arange(1, num_bits), num_points, replace=False)
+    cuts = np.zeros(num_bits, dtype=np.int64)
+    cuts[points] = 1
+    # The segment number of each bit is the number of cuts before (or at) it
+    return np.cumsum(cuts) % 2 == 0
+
+def tile_block_mask(rand, tile_x, tile_y):
+    """
+    Takes every bit of a random rectangular block of logic tiles from the parent,
+    so that groups of neighbouring tiles are inherited together
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    tile_x : np.ndarray
+        The x coordinate of the tile of each bit
+    tile_y : np.ndarray
+        The y coordinate of the tile of each bit
+
+    Returns
+    -------
+    np.ndarray
+        The crossover mask
+    """
+    xs = np.unique(tile_x)
+    ys = np.unique(tile_y)
+    x0, x1 = np.sort(rand.choice(xs, 2))
+    y0, y1 = np.sort(rand.choice(ys, 2))
+    return (tile_x >= x0) & (tile_x <= x1) & (tile_y >= y0) & (tile_y <= y1)
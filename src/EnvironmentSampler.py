@@ -0,0 +1,166 @@
+"""
+EnvironmentSampler.py
+---------------------
+
+Samples the temperature and humidity sensor (a DHT22 on the environment Arduino) on a background
+thread, so that fitness measurements never wait on the sensor.
+
+Readings are kept in a fixed-size, timestamped ring buffer. Callers look up the reading closest
+to the time of their measurement with :meth:`EnvironmentSampler.nearest`, which only takes a lock
+for as long as it takes to copy the buffer. Every reading can also be appended to a log file as
+it is taken.
+"""
+
+from collections import namedtuple
+from threading import Thread, Event, Lock
+from time import time
+import numpy as np
+
+EnvironmentReading = namedtuple("EnvironmentReading", ["time", "temperature", "humidity"])
+
+class EnvironmentSampler:
+    """
+    Repeatedly calls the given measurement functions on a daemon thread and stores the results
+    """
+
+    def __init__(self, measure_temp, measure_humidity, interval, capacity, log_path=None):
+        """
+        Parameters
+        ----------
+        measure_temp : Callable[[], float | None]
+            Takes one (blocking) temperature reading
+        measure_humidity : Callable[[], float | None]
+            Takes one (blocking) humidity reading
+        interval : float
+            Seconds between the start of consecutive samples
+        capacity : int
+            The number of readings kept. The oldest reading is overwritten once the buffer is full
+        log_path : str | Path | None
+            File to append every reading to (as time,temperature,humidity). None disables the log
+        """
+        self.__measure_temp = measure_temp
+        self.__measure_humidity = measure_humidity
+        self.__interval = interval
+        self.__log_path = log_path
+
+        self.__times = np.zeros(capacity)
+        self.__temperatures = np.zeros(capacity)
+        self.__humidities = np.zeros(capacity)
+        # Number of readings ever taken; the next one is written at __count % capacity
+        self.__count = 0
+        self.__lock = Lock()
+
+        self.__stop = Event()
+        self.__thread = None
+
+    def start(self):
+        """
+        Takes the first reading (so that lookups made straight away have something to return)
+        and then starts sampling in the background
+        """
+        if self.is_running():
+            return
+        self.sample()
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__run, name="EnvironmentSampler", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread, waiting for a sample in progress to finish
+        """
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def is_running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def sample(self):
+        """
+        Takes one reading now and stores it
+
+        Returns
+        -------
+        EnvironmentReading
+            The reading. Failed measurements are stored as NaN
+        """
+        start = time()
+        temperature = self.__as_float(self.__measure_temp())
+        humidity = self.__as_float(self.__measure_humidity())
+        # Timestamp the reading halfway through, since the two sensor reads are sequential
+        reading = EnvironmentReading((start + time()) / 2, temperature, humidity)
+
+        with self.__lock:
+            pos = self.__count % self.__times.size
+            self.__times[pos] = reading.time
+            self.__temperatures[pos] = reading.temperature
+            self.__humidities[pos] = reading.humidity
+            self.__count += 1
+
+        if self.__log_path is not None:
+            with open(self.__log_path, "a") as log_file:
+                log_file.write("{},{},{}\n".format(*reading))
+        return reading
+
+    def latest(self):
+        """
+        Returns
+        -------
+        EnvironmentReading | None
+            The most recent reading, or None if none have been taken
+        """
+        with self.__lock:
+            if self.__count == 0:
+                return None
+            pos = (self.__count - 1) % self.__times.size
+            return EnvironmentReading(self.__times[pos], self.__temperatures[pos], self.__humidities[pos])
+
+    def nearest(self, timestamp):
+        """
+        Parameters
+        ----------
+        timestamp : float
+            A time as returned by time.time()
+
+        Returns
+        -------
+        EnvironmentReading | None
+            The stored reading taken closest to timestamp, or None if none have been taken
+        """
+        times, temperatures, humidities = self.get_readings()
+        if times.size == 0:
+            return None
+        i = int(np.searchsorted(times, timestamp))
+        if i == times.size or (i > 0 and timestamp - times[i - 1] <= times[i] - timestamp):
+            i -= 1
+        return EnvironmentReading(times[i], temperatures[i], humidities[i])
+
+    def get_readings(self):
+        """
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray]
+            Copies of the stored times, temperatures and humidities, oldest first
+        """
+        with self.__lock:
+            capacity = self.__times.size
+            if self.__count <= capacity:
+                order = np.arange(self.__count)
+            else:
+                order = np.roll(np.arange(capacity), -(self.__count % capacity))
+            return self.__times[order], self.__temperatures[order], self.__humidities[order]
+
+    def __run(self):
+        next_sample = time() + self.__interval
+        # Waiting on the event rather than sleeping lets stop() interrupt the wait
+        while not self.__stop.wait(max(0.0, next_sample - time())):
+            next_sample += self.__interval
+            self.sample()
+
+    @staticmethod
+    def __as_float(value):
+        if value is None:
+            return np.nan
+        return float(value)
@@ -1,5 +1,3 @@
-from Microcontroller import Microcontroller
-from CircuitPopulation import CircuitPopulation
 from ConfigBuilder import ConfigBuilder
 from Config import Config
 from Logger import Logger
@@ -7,6 +5,7 @@ from subprocess import CalledProcessError, run
 import os
 
 from WorkspaceFormatter import WorkspaceFormatter
+from WorkspaceArchiver import WorkspaceArchiver
 
 class Evolution:
 
@@ -59,6 +58,10 @@ class Evolution:
         config.add_logger(logger)
         config.validate_all()
         self.validate_arguments(output_directory)
+        # Imported here rather than at the top of the file, since they pull in pyserial, NumPy
+        # and every circuit and fitness function, which print-only runs never need
+        from Microcontroller import Microcontroller
+        from CircuitPopulation import CircuitPopulation
         mcu = Microcontroller(config, logger)
         population = CircuitPopulation(mcu, config, logger)
 
@@ -67,11 +70,16 @@ class Evolution:
         self.logger = logger
         self.population = population
 
-        if config.get_simulation_mode() != "INTRINSIC_SENSITIVITY":
-            population.populate()
-            population.evolve()
-        else:
-            population.run_fitness_sensitity()
+        mcu.start_environment_sampler()
+        try:
+            if config.get_simulation_mode() != "INTRINSIC_SENSITIVITY":
+                population.populate()
+                population.evolve()
+            else:
+                population.run_fitness_sensitity()
+        finally:
+            # Stops the environment sampler and the serial reader, even if the run fails
+            mcu.close()
 
 
         logger.log_event(0, "Evolution has completed successfully")
@@ -101,14 +109,17 @@ class Evolution:
 
     def clean_up(self):
         # TODO: make sure config file specified above ends up in output.
+        # The backup is written in the background while the experiment folder is formatted
+        archiver = WorkspaceArchiver()
         if self.output_directory is not None:
             #copy simulation information to this output directory
-            self.logger.save_workspace(self.output_directory)
+            self.logger.save_workspace(self.output_directory, archiver)
         elif self.config.get_backup_workspace():
-            self.logger.save_workspace(self.config.get_output_directory())
+            self.logger.save_workspace(self.config.get_output_directory(), archiver)
 
         self.__WorkspaceFormatter = WorkspaceFormatter(self.config, self.experiment_description)
         self.__WorkspaceFormatter.format_workspace()
+        archiver.wait()
 
     ## Don't know if this is needed, but it might be useful to validate all inputs 
     ## especially if this is going to take a while to run.
@@ -0,0 +1,152 @@
+"""
+FitnessCache.py
+---------------
+
+A fitness database that persists across runs, for simulation modes whose fitness is a pure
+function of the genome (SIM_HARDWARE). Parameter sweeps and repeated configs evaluate many of the
+same genomes again (the seed, its clones and the elites they converge to), and with the cache
+those are neither compiled nor measured a second time.
+
+The cache is an SQLite file. Entries are keyed by a context, a hash of every setting the fitness
+depends on besides the genome, and the genome digest (see FileBasedCircuit.get_genome_digest). The
+digest covers the whole hardware file, so the template a circuit was seeded from is part of it.
+Several runs can share one file at once: SQLite's write-ahead log lets readers and a writer work
+concurrently, and writers wait for each other up to a timeout. The file is bounded to a number of
+entries, evicting the least recently used ones.
+"""
+
+import sqlite3
+import hashlib
+from time import time
+from Metrics import METRICS
+
+# Bump when the meaning of a cached fitness changes, so old entries are no longer matched
+CACHE_VERSION = 1
+
+# The number of entries added between checks of the size bound
+EVICTION_INTERVAL = 256
+
+# Seconds to wait for another run's write to finish before giving up
+BUSY_TIMEOUT = 30.0
+
+class FitnessCache:
+    """
+    Persistent (context, genome digest) -> fitness store shared between runs
+    """
+
+    def __init__(self, path, context, max_entries):
+        """
+        Opens (creating if needed) the cache file
+
+        Parameters
+        ----------
+        path : Path
+            The SQLite file
+        context : str
+            The context the entries are read and written under (see :meth:`make_context`)
+        max_entries : int
+            The most entries the file keeps, over all contexts
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__context = context
+        self.__max_entries = max_entries
+        self.__added = 0
+        # Autocommit, so every statement is its own short transaction
+        self.__db = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("PRAGMA synchronous=NORMAL")
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS fitness ("
+            "context TEXT NOT NULL, genome TEXT NOT NULL, fitness REAL NOT NULL, last_used REAL NOT NULL, "
+            "UNIQUE (context, genome))"
+        )
+        self.__db.execute("CREATE INDEX IF NOT EXISTS fitness_last_used ON fitness (last_used)")
+
+    @staticmethod
+    def make_context(*settings):
+        """
+        Parameters
+        ----------
+        settings
+            Every setting the fitness depends on besides the genome (their str() is hashed)
+
+        Returns
+        -------
+        str
+            A digest of the settings and CACHE_VERSION
+        """
+        text = "\n".join(str(setting) for setting in (CACHE_VERSION,) + settings)
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get(self, genome):
+        """
+        Parameters
+        ----------
+        genome : str
+            The genome digest
+
+        Returns
+        -------
+        float | None
+            The cached fitness, or None if the genome has not been evaluated in this context
+        """
+        row = self.__db.execute(
+            "SELECT fitness FROM fitness WHERE context = ? AND genome = ?", (self.__context, genome)
+        ).fetchone()
+        if row is None:
+            METRICS.inc("fitness_cache_requests_total", result="miss")
+            return None
+        METRICS.inc("fitness_cache_requests_total", result="hit")
+        self.__db.execute(
+            "UPDATE fitness SET last_used = ? WHERE context = ? AND genome = ?", (time(), self.__context, genome)
+        )
+        return row[0]
+
+    def put(self, genome, fitness):
+        """
+        Stores the fitness of a genome, evicting the least recently used entries every
+        EVICTION_INTERVAL additions if the file is over its size bound
+
+        Parameters
+        ----------
+        genome : str
+            The genome digest
+        fitness : float
+            Its fitness
+        """
+        self.__db.execute(
+            "INSERT OR REPLACE INTO fitness (context, genome, fitness, last_used) VALUES (?, ?, ?, ?)",
+            (self.__context, genome, float(fitness), time())
+        )
+        self.__added += 1
+        if self.__added % EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used entries over max_entries
+
+        Returns
+        -------
+        int
+            The number of entries deleted
+        """
+        self.__db.execute("BEGIN IMMEDIATE")
+        try:
+            excess = self.__db.execute("SELECT COUNT(*) FROM fitness").fetchone()[0] - self.__max_entries
+            if excess > 0:
+                self.__db.execute(
+                    "DELETE FROM fitness WHERE rowid IN (SELECT rowid FROM fitness ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+            self.__db.execute("COMMIT")
+        except BaseException:
+            self.__db.execute("ROLLBACK")
+            raise
+        return max(excess, 0)
+
+    def close(self):
+        self.__db.close()
+
+    def __len__(self):
+        return self.__db.execute("SELECT COUNT(*) FROM fitness").fetchone()[0]
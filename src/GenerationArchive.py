@@ -0,0 +1,234 @@
+"""
+GenerationArchive.py
+--------------------
+
+Compact snapshots of every generation's genomes, written to the generations directory so that
+any generation can be rebuilt after a run (see tools/reconstruct.py).
+
+Each generation is stored as one file holding the modifiable bits of every circuit, bit-packed
+(one bit per modifiable bit, in circuit index order). Most generations are stored as the XOR with
+the previous generation, which is mostly zeros since selection only changes a few bits of each
+genome, and every file is zlib-compressed, so a generation takes a few KB. Every
+KEYFRAME_INTERVAL generations (and whenever there is no previous generation to diff against) the
+bits are stored in full, which bounds the number of files a reconstruction has to read.
+
+``generations.json`` records what the bits mean: the circuit names, the number of bits, and the
+routing type and accessed columns the modifiable bits were found with. For hardware-file circuits
+a copy of the first circuit's hardware file is kept as ``template.asc``, so a reconstruction only
+needs the template's offset index and the packed bits.
+"""
+
+import os
+import json
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from Circuit.FileBasedCircuit import FileBasedCircuit
+
+METADATA_FILENAME = "generations.json"
+TEMPLATE_FILENAME = "template.asc"
+
+# Bump when the file layout changes
+ARCHIVE_VERSION = 1
+
+# Generations between full (non-delta) snapshots
+KEYFRAME_INTERVAL = 50
+
+# magic, version, is delta, base generation, circuits, bits per circuit
+HEADER = struct.Struct("<4sBBiII")
+MAGIC = b"BEGS"
+
+class GenerationArchive:
+    """
+    Writes and reads the delta-encoded generation snapshots of one generations directory
+    """
+
+    def __init__(self, directory):
+        """
+        Parameters
+        ----------
+        directory : Path
+            The generations directory
+        """
+        self.__directory = directory
+        self.__metadata = None
+        # Packed bits of the last saved generation, the base of the next delta
+        self.__previous = None
+        self.__previous_generation = None
+
+    # SECTION Writing
+    def start(self, names, num_bits, routing_type, accessed_columns, template=None):
+        """
+        Starts a new archive, recording what the saved bits mean. Removes nothing; the caller
+        is expected to have cleared the directory
+
+        Parameters
+        ----------
+        names : list[str]
+            The name of every circuit, in the order their bits are saved
+        num_bits : int
+            The number of modifiable bits of each circuit
+        routing_type : str
+            The routing type the modifiable bits were found with
+        accessed_columns : list[str]
+            The accessed columns the modifiable bits were found with
+        template : bytes | mmap | None
+            A hardware file with the layout of the circuits. None for circuits without hardware files
+        """
+        os.makedirs(self.__directory, exist_ok=True)
+        self.__metadata = {
+            "version": ARCHIVE_VERSION,
+            "names": list(names),
+            "num_bits": int(num_bits),
+            "routing_type": routing_type,
+            "accessed_columns": [str(col) for col in accessed_columns],
+            "template": None,
+        }
+        if template is not None:
+            with open(self.__directory.joinpath(TEMPLATE_FILENAME), "wb") as template_file:
+                # Attributes such as the fitness belong to one circuit, so only the body is kept
+                template_file.write(template[FileBasedCircuit._body_start(template):])
+            self.__metadata["template"] = TEMPLATE_FILENAME
+        with open(self.__directory.joinpath(METADATA_FILENAME), "w") as metadata_file:
+            json.dump(self.__metadata, metadata_file)
+        self.__previous = None
+        self.__previous_generation = None
+
+    def save(self, generation, bitstreams):
+        """
+        Saves one generation
+
+        Parameters
+        ----------
+        generation : int
+            The generation number
+        bitstreams : iterable[np.ndarray]
+            The modifiable bits of every circuit in the order of the names given to start, as
+            0/1 or as ASCII '0'/'1' byte values
+
+        Returns
+        -------
+        int
+            The size of the written file in bytes
+        """
+        bits = np.stack([np.asarray(bitstream, dtype=np.uint8) for bitstream in bitstreams]) & 1
+        packed = np.packbits(bits, axis=1)
+        is_delta = self.__previous is not None and self.__previous.shape == packed.shape \
+            and generation % KEYFRAME_INTERVAL != 0
+        payload = np.bitwise_xor(packed, self.__previous) if is_delta else packed
+        base = self.__previous_generation if is_delta else -1
+
+        data = HEADER.pack(MAGIC, ARCHIVE_VERSION, is_delta, base, bits.shape[0], bits.shape[1]) \
+            + zlib.compress(payload.tobytes())
+        with open(self.__generation_path(generation), "wb") as gen_file:
+            gen_file.write(data)
+        self.__previous = packed
+        self.__previous_generation = generation
+        return len(data)
+
+    # SECTION Reading
+    def get_metadata(self):
+        """
+        Returns
+        -------
+        dict
+            The names, num_bits, routing_type, accessed_columns and template of the archive
+        """
+        if self.__metadata is None:
+            with open(self.__directory.joinpath(METADATA_FILENAME), "r") as metadata_file:
+                self.__metadata = json.load(metadata_file)
+        return self.__metadata
+
+    def get_generations(self):
+        """
+        Returns
+        -------
+        list[int]
+            The saved generation numbers, in increasing order
+        """
+        generations = []
+        for name in os.listdir(self.__directory):
+            if name.startswith("gen") and name.endswith(".bin") and name[3:-4].isdigit():
+                generations.append(int(name[3:-4]))
+        return sorted(generations)
+
+    def load(self, generation):
+        """
+        Parameters
+        ----------
+        generation : int
+            The generation number
+
+        Returns
+        -------
+        np.ndarray
+            (circuits x bits) array of the 0/1 modifiable bits of every circuit
+        """
+        # Follow the deltas back to a keyframe, then apply them going forward
+        chain = []
+        is_delta, base, rows, num_bits, payload = self.__read(generation)
+        chain.append(payload)
+        while is_delta:
+            is_delta, base, _, _, payload = self.__read(base)
+            chain.append(payload)
+        packed = chain.pop()
+        while len(chain) > 0:
+            packed = np.bitwise_xor(packed, chain.pop())
+        return np.unpackbits(packed, axis=1, count=num_bits)
+
+    def reconstruct(self, generation, output_directory, max_workers=None):
+        """
+        Writes the hardware file of every circuit of a generation
+
+        Parameters
+        ----------
+        generation : int
+            The generation number
+        output_directory : Path
+            Where to write the files, named <circuit name>.asc
+        max_workers : int | None
+            The number of threads writing files. None uses the ThreadPoolExecutor default
+
+        Returns
+        -------
+        list[Path]
+            The written files
+        """
+        metadata = self.get_metadata()
+        if metadata["template"] is None:
+            raise ValueError("This archive was saved from circuits without hardware files")
+        with open(self.__directory.joinpath(metadata["template"]), "rb") as template_file:
+            template = template_file.read()
+        offsets = FileBasedCircuit.get_modifiable_layout_st(
+            template, metadata["accessed_columns"], metadata["routing_type"]).offsets
+        bits = self.load(generation)
+        if offsets.size != bits.shape[1]:
+            raise ValueError("The template has " + str(offsets.size) + " modifiable bits, but the generation has "
+                + str(bits.shape[1]))
+
+        os.makedirs(output_directory, exist_ok=True)
+        template = np.frombuffer(template, dtype=np.uint8)
+        def write(i):
+            contents = template.copy()
+            contents[offsets] = bits[i] + 48
+            path = output_directory.joinpath(metadata["names"][i] + ".asc")
+            with open(path, "wb") as hw_file:
+                hw_file.write(contents.tobytes())
+            return path
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(write, range(bits.shape[0])))
+
+    # SECTION Helpers
+    def __generation_path(self, generation):
+        return self.__directory.joinpath("gen" + str(generation) + ".bin")
+
+    def __read(self, generation):
+        with open(self.__generation_path(generation), "rb") as gen_file:
+            data = gen_file.read()
+        magic, version, is_delta, base, rows, num_bits = HEADER.unpack_from(data)
+        if magic != MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError("gen" + str(generation) + ".bin is not a version " + str(ARCHIVE_VERSION) + " generation snapshot")
+        payload = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype=np.uint8)
+        return bool(is_delta), base, rows, num_bits, payload.reshape(rows, -1)
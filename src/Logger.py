@@ -4,9 +4,16 @@ from subprocess import CalledProcessError, run
 from os.path import exists
 from os.path import join
 from os import mkdir
-from shutil import copytree
 from shutil import rmtree
+from pathlib import Path
 from datetime import datetime
+from queue import SimpleQueue
+from threading import Thread, Event
+import atexit
+from StageTimer import TIMER
+from WorkspaceArchiver import archive_workspace
+from Telemetry import TELEMETRY
+from Metrics import METRICS
 
 # The window dimensions
 LINE_WIDTH = 112
@@ -36,8 +43,20 @@ UNDERLINE = '\033[4m'
 
 README_FILE_HEADER = "FPGA/MCU [1] \n"
 
+# Arguments of these types can't change after they are logged, so they are formatted by the
+# writer thread. Anything else is converted to a string when it is logged.
+DEFERRED_FORMAT_TYPES = (str, int, float, bool, bytes, type(None))
+
 # TODO Utilize Python logging library
 class Logger:
+    """
+    Writes log messages to stdout and to the monitor file.
+
+    Messages are put on a queue and written by a background thread, so logging never waits on
+    terminal or file I/O. The log level and save_log setting are read from the config once, so
+    a message above the log level costs a single comparison; guard anything expensive to build
+    with :meth:`is_enabled`.
+    """
     def __init_analysis(self):
         # Make a directory to store data
         analysis = self.__config.get_analysis_directory()
@@ -83,7 +102,7 @@ class Logger:
         self.log_monitor("", "{}".format(DOUBLE_HLINE))
         self.log_monitor("", self.__config.get_raw_data())
         self.log_monitor("", "{}".format(DOUBLE_HLINE))
-        self.__monitor_file.flush()
+        self.flush()
 
         # args = TERM_CMD + ["python3", "src/Monitor.py"]
         # try:
@@ -108,6 +127,8 @@ class Logger:
                 args = TERM_CMD + ["python3", "src/PlotSensitivityLive.py"]
             else: 
                 args = TERM_CMD + ["python3", "src/PlotEvolutionLive.py", "--frame-interval", str(self.__config.get_frame_interval())]
+            if self.__config.get_telemetry() is not None:
+                args = args + ["--telemetry", self.__config.get_telemetry()]
             
             try:
                 run(args, check=True, capture_output=True)
@@ -119,11 +140,22 @@ class Logger:
 
     def __init__(self, config, explanation):
         self.__config = config
-        self.__config.add_logger(self)
         self.__monitor_file = open(config.get_log_file(), "w")
         self.__log_file = stdout
         self.__experiment_explanation = explanation
 
+        # Start the writer before anything is logged. Until the log level is known, log everything
+        self.__log_level = 5
+        self.__save_log = True
+        self.__queue = SimpleQueue()
+        self.__writer = Thread(target=self.__write_records, name="LoggerWriter", daemon=True)
+        self.__writer.start()
+        atexit.register(self.close)
+
+        self.__config.add_logger(self)
+        self.__save_log = config.get_save_log()
+        self.__log_level = config.get_log_level()
+
         # Ensure the logs exists and have been cleared. Not happy with
         # this method, but couldn't find a better way to do it.
         open("workspace/alllivedata.log", "w").close()
@@ -140,6 +172,23 @@ class Logger:
         if not exists("workspace/template"):
             mkdir("workspace/template")
 
+        # Per-generation stage timing (see StageTimer.py)
+        timing_log = "workspace/timinglivedata.log" if config.get_log_timing() else None
+        timing_trace = "workspace/timing_trace.json" if config.get_timing_trace() else None
+        # The metrics endpoint exports the stage durations too (see Metrics.py)
+        METRICS.stop()
+        if config.get_metrics() is not None:
+            METRICS.start(config.get_metrics())
+        if timing_log is not None or timing_trace is not None or METRICS.is_enabled():
+            TIMER.configure(timing_log, timing_trace)
+
+        # Live data is also pushed to the plots (see Telemetry.py). The built config is published
+        # too, so plots on another machine can lay themselves out
+        TELEMETRY.stop()
+        if config.get_telemetry() is not None:
+            TELEMETRY.start(config.get_telemetry())
+            TELEMETRY.replace("builtconfig.ini", config.get_raw_data())
+
         if exists("workspace/plots"):
             rmtree("workspace/plots")
         if not exists("workspace/plots"):
@@ -156,64 +205,180 @@ class Logger:
         #     self.__init_monitor()
         self.__init_monitor()
 
-    def log_generation(self, population, epoch_time):
+    def log_generation(self, record):
+        """
+        Logs the best circuits of a generation
+
+        Parameters
+        ----------
+        record : GenerationRecord
+            The snapshot of the generation (see CircuitPopulation)
+        """
         self.log_event(2, DOUBLE_HLINE)
         self.log_event(2, DOUBLE_HLINE)
         self.log_event(2, DOUBLE_HLINE)
 
-        current_best_circuit = population.get_current_best_circuit()
-        overall_best_circuit = population.get_overall_best_circuit_info()
-
         self.log_event(2, "CURRENT BEST: {} : EPOCH {} : FITNESS {}".format(
-            str(overall_best_circuit.name),
-            str(population.get_best_epoch()),
-            str(overall_best_circuit.fitness)
+            str(record.overall_best.name),
+            str(record.best_epoch),
+            str(record.overall_best.fitness)
         ))
 
         self.log_event(2, "HIGHEST FITNESS OF EPOCH {} IS: {} = {} over {} seconds".format(
-            str(population.get_current_epoch()),
-            str(current_best_circuit),
-            str(current_best_circuit.get_fitness()),
-            str(epoch_time)
+            str(record.epoch),
+            record.best_name,
+            str(record.best_fitness),
+            str(record.epoch_time)
         ))
 
         self.log_event(2, DOUBLE_HLINE)
         self.log_event(2, DOUBLE_HLINE)
         self.log_event(2, DOUBLE_HLINE)
 
+    def log_stage_times(self, epoch, stage_times):
+        """
+        Logs the time spent in each stage of a generation
+
+        Parameters
+        ----------
+        epoch : int
+            The generation the times belong to
+        stage_times : dict[str, float]
+            Seconds spent in each stage, as returned by StageTimer.end_generation
+        """
+        self.log_event(3, "STAGE TIMES OF EPOCH {}: {}".format(
+            str(epoch),
+            ", ".join("{}={:.3f}s".format(name, seconds) for name, seconds in stage_times.items())
+        ))
+
+    def is_enabled(self, level):
+        """
+        Whether messages of the given level are logged
+
+        Parameters
+        ----------
+        level : int
+            The log level of a message
+
+        Returns
+        -------
+        bool
+            True if the configured log level is at least level
+        """
+        return self.__log_level >= level
+
     def log_monitor(self, prefix,  *msg):
-        if self.__config.get_save_log():
-            now = datetime.now()
-            print(now, prefix, *msg, file=self.__monitor_file)
+        if self.__save_log:
+            self.__queue.put((datetime.now(), None, prefix, None, self.__freeze(msg)))
 
     def log_event(self, level, *msg):
-        if self.__config.get_log_level() >= level:
-            print(*msg, file=self.__log_file)
-            self.log_monitor("", *msg)
+        if self.__log_level >= level:
+            self.__put("", None, msg)
 
     def log_info(self, level, *msg):
-        if self.__config.get_log_level() >= level:
-            print("INFO: ", OKBLUE, *msg, ENDC, file=self.__log_file)
-            self.log_monitor("INFO: ", *msg)
+        if self.__log_level >= level:
+            self.__put("INFO: ", OKBLUE, msg)
 
     def log_warning(self, level, *msg):
-        if self.__config.get_log_level() >= level:
-            print("WARNING: ", WARNING, *msg, ENDC, file=self.__log_file)
-            self.log_monitor("WARNING: ", *msg)
+        METRICS.inc("log_messages_total", kind="warning")
+        if self.__log_level >= level:
+            self.__put("WARNING: ", WARNING, msg)
 
     def log_error(self, level, *msg):
-        if self.__config.get_log_level() >= level:
-            print("ERROR: ", FAIL, *msg, ENDC, file=self.__log_file)
-            self.log_monitor("ERROR: ", *msg)
+        METRICS.inc("log_messages_total", kind="error")
+        if self.__log_level >= level:
+            self.__put("ERROR: ", FAIL, msg)
+            # Errors are often followed by exit(), so make sure they are out
+            self.flush()
 
     def log_critical(self, level, *msg):
-        if self.__config.get_log_level() >= level:
-            print("CRITICAL: ", FAIL, *msg, ENDC, file=self.__log_file)
-            self.log_monitor("CRITICAL: ", *msg)
-
-    def save_workspace(self, directory):
+        METRICS.inc("log_messages_total", kind="critical")
+        if self.__log_level >= level:
+            self.__put("CRITICAL: ", FAIL, msg)
+            self.flush()
+
+    def flush(self):
+        """
+        Waits until every message logged so far has been written
+        """
+        if self.__writer.is_alive():
+            done = Event()
+            self.__queue.put(done)
+            done.wait()
+
+    def close(self):
+        """
+        Writes any remaining messages and stops the writer thread, the telemetry bus and the
+        metrics endpoint
+        """
+        TELEMETRY.stop()
+        METRICS.stop()
+        if self.__writer.is_alive():
+            self.__queue.put(None)
+            self.__writer.join()
+
+    # SECTION Writer thread
+    def __put(self, prefix, color, msg):
+        self.__queue.put((datetime.now(), self.__log_file, prefix, color, self.__freeze(msg)))
+
+    @staticmethod
+    def __freeze(msg):
+        """
+        Converts any argument that could still change (circuits, arrays, lists, ...) to its string
+        now, so the message shows the state at the time it was logged
+        """
+        return tuple(arg if isinstance(arg, DEFERRED_FORMAT_TYPES) else str(arg) for arg in msg)
+
+    def __write_records(self):
+        while True:
+            record = self.__queue.get()
+            if record is None:
+                break
+            if isinstance(record, Event):
+                self.__flush_files()
+                record.set()
+                continue
+            now, log_file, prefix, color, msg = record
+            try:
+                if log_file is not None:
+                    if color is None:
+                        print(*msg, file=log_file)
+                    else:
+                        print(prefix, color, *msg, ENDC, file=log_file)
+                if self.__save_log and not self.__monitor_file.closed:
+                    print(now, prefix, *msg, file=self.__monitor_file)
+            except Exception as e:
+                # A message that can't be written must not stop the ones after it
+                print("Could not write log message:", e, file=stdout)
+        self.__flush_files()
+
+    def __flush_files(self):
+        for log_file in (self.__log_file, self.__monitor_file):
+            try:
+                if not log_file.closed:
+                    log_file.flush()
+            except (OSError, ValueError):
+                pass
+
+    def save_workspace(self, directory, archiver=None):
+        """
+        Saves a copy of the workspace in directory, named by the current time and in the
+        workspace_archive_format
+
+        Parameters
+        ----------
+        directory : str
+            The directory to save it in
+        archiver : WorkspaceArchiver | None
+            If given, the copy is made in the background and the caller waits on the archiver
+        """
+        self.flush()
         self.__monitor_file.close()
         datetime_format = self.__config.get_datetime_format()
         current_time = str(datetime.now().strftime(datetime_format))
         current_time = current_time.replace('/', '-')
-        copytree("./workspace", join(directory, current_time))
+        args = (Path("workspace"), Path(join(directory, current_time)), self.__config.get_workspace_archive_format())
+        if archiver is None:
+            archive_workspace(*args)
+        else:
+            archiver.submit(*args)
@@ -0,0 +1,206 @@
+"""
+MapElitesArchive.py
+-------------------
+
+The archive of a MAP-Elites run. The archive is a grid over a few behaviour descriptors (such as
+the lowest and highest voltage a circuit reaches), and each cell holds the fittest circuit found
+so far with those descriptors.
+
+The archive lives for the whole run and keeps a bit-packed copy of every elite's genome, so it
+can hold far more elites than the population has circuits, and the population is bred from it
+each generation. Occupancy, fitness and genome are kept in flat NumPy arrays indexed by cell, so
+inserting a generation is a handful of vectorized operations no matter how many cells the grid
+has. Only the cells that changed are appended to the live map file, which is rewritten in full
+only once it has grown well past the number of occupied cells.
+"""
+
+import os
+import numpy as np
+from Telemetry import TELEMETRY
+
+# Values each descriptor can be read from, as used in the map_elites_descriptors option.
+# Each maps to the PopulationArrays voltage key, or "pulses" for the pulse counts
+DESCRIPTOR_KEYS = {
+    "LOW_VOLTAGE": "low_voltage",
+    "HIGH_VOLTAGE": "high_voltage",
+    "MEAN_VOLTAGE": "mean_voltage",
+    "PULSES": "pulses",
+}
+
+# The live map file is compacted once it holds this many lines per occupied cell
+MAP_FILE_COMPACT_RATIO = 4
+
+class MapElitesArchive:
+    """
+    A persistent grid of elites with insert-if-better semantics. Each cell keeps its own copy of
+    its elite's genome (the modifiable bits, bit-packed), so the archive can hold more elites
+    than the population has circuits, and the population is free to be overwritten every
+    generation.
+    """
+
+    def __init__(self, bin_sizes, bins):
+        """
+        Parameters
+        ----------
+        bin_sizes : Sequence[float]
+            The width of a cell along each descriptor
+        bins : Sequence[int]
+            The number of cells along each descriptor. Descriptor values past the last cell fall
+            into the last cell, and negative or missing (NaN) values into the first
+        """
+        self.__bin_sizes = np.asarray(bin_sizes, dtype=float)
+        self.__shape = tuple(int(n) for n in bins)
+        size = int(np.prod(self.__shape))
+        self.__occupied = np.zeros(size, dtype=bool)
+        self.__fitness = np.full(size, -np.inf)
+        # The packed genome of each cell's elite, None if empty
+        self.__genomes = np.empty(size, dtype=object)
+        self.__num_bits = None
+        # Cells that changed since the map file was last written
+        self.__changed = np.zeros(size, dtype=bool)
+        self.__map_file_lines = 0
+
+    def update(self, genomes, fitness, descriptors):
+        """
+        Places a newly evaluated generation into the archive. The fittest circuit landing in each
+        cell replaces the cell's elite if it is fitter (or the cell is empty), and its genome is
+        copied into the archive.
+
+        Parameters
+        ----------
+        genomes : np.ndarray
+            Array of shape (number of circuits, number of bits) of the circuits' 0/1 modifiable bits
+        fitness : np.ndarray
+            The fitness of each circuit
+        descriptors : np.ndarray
+            Array of shape (number of circuits, number of descriptors)
+
+        Returns
+        -------
+        int
+            The number of cells that received a new elite
+        """
+        self.__num_bits = genomes.shape[1]
+        cells = self.cells(descriptors)
+
+        # The fittest candidate of each cell, then only where it beats the current elite
+        order = np.lexsort((-fitness, cells))
+        target_cells, first = np.unique(cells[order], return_index=True)
+        best = order[first]
+        better = ~self.__occupied[target_cells] | (fitness[best] > self.__fitness[target_cells])
+        target_cells, best = target_cells[better], best[better]
+
+        packed = np.packbits(genomes[best].astype(np.uint8), axis=1)
+        self.__occupied[target_cells] = True
+        self.__fitness[target_cells] = fitness[best]
+        for cell, genome in zip(target_cells.tolist(), packed):
+            self.__genomes[cell] = genome
+        self.__changed[target_cells] = True
+        return target_cells.size
+
+    def sample(self, rand, count):
+        """
+        Draws elites uniformly from the occupied cells
+
+        Parameters
+        ----------
+        rand : np.random.Generator
+            The random number generator
+        count : int
+            The number of elites to draw
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (count, number of bits) of the drawn elites' 0/1 modifiable bits
+        """
+        occupied = np.flatnonzero(self.__occupied)
+        drawn = occupied[rand.integers(0, occupied.size, count)]
+        packed = np.stack(self.__genomes[drawn]) if count > 0 else np.zeros((0, 0), dtype=np.uint8)
+        return np.unpackbits(packed, axis=1, count=self.__num_bits)
+
+    def cells(self, descriptors):
+        """
+        Parameters
+        ----------
+        descriptors : np.ndarray
+            Array of shape (n, number of descriptors)
+
+        Returns
+        -------
+        np.ndarray
+            The flat index of the cell each row of descriptors falls into
+        """
+        coords = np.floor(np.nan_to_num(descriptors, nan=0.0) / self.__bin_sizes).astype(np.int64)
+        coords = np.clip(coords, 0, np.array(self.__shape) - 1)
+        return np.ravel_multi_index(tuple(coords.T), self.__shape)
+
+    # SECTION Getters
+    def get_elites(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            Array of shape (occupied cells, number of bits) of the 0/1 modifiable bits of each
+            occupied cell's elite, in cell order
+        """
+        occupied = np.flatnonzero(self.__occupied)
+        if occupied.size == 0:
+            return np.zeros((0, self.__num_bits or 0), dtype=np.uint8)
+        return np.unpackbits(np.stack(self.__genomes[occupied]), axis=1, count=self.__num_bits)
+
+    def get_fitness_grid(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            The fitness of each cell's elite in the shape of the grid, NaN for empty cells
+        """
+        return np.where(self.__occupied, self.__fitness, np.nan).reshape(self.__shape)
+
+    def get_shape(self):
+        return self.__shape
+
+    def __len__(self):
+        return int(np.count_nonzero(self.__occupied))
+
+    # SECTION Map file
+    def write_changes(self, path):
+        """
+        Appends the cells that changed since the last call to the map file.
+
+        The file starts with a line of the bin sizes. Every other line is a cell's coordinates
+        followed by the fitness of its elite, or by nothing if the cell was emptied. A later line
+        for a cell replaces earlier ones. The file is rewritten with one line per occupied cell
+        when it has grown past MAP_FILE_COMPACT_RATIO lines per occupied cell.
+
+        Parameters
+        ----------
+        path : str | Path
+            The map file
+        """
+        changed = np.flatnonzero(self.__changed)
+        self.__changed[:] = False
+        if self.__map_file_lines > 0 and \
+                self.__map_file_lines + changed.size <= MAP_FILE_COMPACT_RATIO * max(len(self), 1):
+            text = self.__format_cells(changed)
+            with open(path, "a") as map_file:
+                map_file.write(text)
+            TELEMETRY.append(os.path.basename(path), text)
+            self.__map_file_lines += changed.size
+        else:
+            occupied = np.flatnonzero(self.__occupied)
+            text = " ".join("{:g}".format(size) for size in self.__bin_sizes) + "\n" + self.__format_cells(occupied)
+            with open(path, "w") as map_file:
+                map_file.write(text)
+            TELEMETRY.replace(os.path.basename(path), text)
+            # Count the header too, so an empty archive still appends afterwards
+            self.__map_file_lines = occupied.size + 1
+
+    def __format_cells(self, cells):
+        coords = np.column_stack(np.unravel_index(cells, self.__shape))
+        lines = []
+        for coord, cell in zip(coords.tolist(), cells.tolist()):
+            fitness = str(self.__fitness[cell]) if self.__occupied[cell] else ""
+            lines.append(" ".join(map(str, coord)) + " " + fitness + "\n")
+        return "".join(lines)
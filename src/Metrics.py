@@ -0,0 +1,249 @@
+"""
+Metrics.py
+----------
+
+Counters, gauges and histograms describing a running experiment (generations, evaluations,
+compile/upload/capture durations, serial traffic and timeouts, cache hit rates, fitness), served
+over HTTP so a dashboard can scrape every bench host without reading the workspace:
+
+- ``/metrics`` in the Prometheus text format
+- ``/metrics.json`` as JSON
+
+Rates such as generations or evaluations per second are left to the scraper (e.g. Prometheus'
+``rate()``), since they come from the counters.
+
+A single module-level registry, ``METRICS``, is shared by every module, as ``TIMER`` is (see
+StageTimer.py). It does nothing until :meth:`MetricsRegistry.start` is called (the Logger does
+this at startup). Once started, the duration of every stage timed by ``TIMER`` is also observed
+into the ``stage_duration_seconds`` histogram.
+"""
+
+import json
+from threading import Thread, Lock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from StageTimer import TIMER
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "bitstream_evolution_"
+
+# Upper bounds of the histogram buckets, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Descriptions of the metrics, exported as HELP lines
+METRIC_HELP = {
+    "generations_total": "Generations completed",
+    "evaluations_total": "Circuits whose fitness was calculated",
+    "stage_duration_seconds": "Duration of each timed stage (compile, iceprog, serial_capture, ...)",
+    "uploads_total": "Bitstreams uploaded to an FPGA",
+    "uploads_failed_total": "Uploads iceprog failed (and that are not counted in uploads_total)",
+    "uploads_skipped_total": "Uploads skipped because the FPGA already held the circuit",
+    "fitness_cache_requests_total": "Fitness cache lookups, by result",
+    "surrogate_screened_total": "Offspring the surrogate screened out instead of measuring",
+    "racing_eliminated_total": "Circuits eliminated from a race before being fully sampled",
+    "serial_bytes_received_total": "Bytes read from the signal microcontroller",
+    "serial_bytes_sent_total": "Bytes written to the signal microcontroller",
+    "serial_timeouts_total": "Microcontroller requests that timed out",
+    "serial_resends_total": "Microcontroller commands sent again after getting no reply",
+    "log_messages_total": "Warnings and errors logged, by kind",
+    "generation": "The current generation",
+    "best_fitness": "Best fitness of the current generation",
+    "average_fitness": "Average fitness of the current generation",
+    "worst_fitness": "Worst fitness of the current generation",
+    "overall_best_fitness": "Best fitness of the run so far",
+}
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms, each identified by a name and a set of labels
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__enabled = False
+        self.__server = None
+        self.__counters = {}
+        self.__gauges = {}
+        # (name, labels) -> [bucket counts..., sum, count]
+        self.__histograms = {}
+
+    def start(self, address):
+        """
+        Starts serving the metrics and records the stage durations timed by TIMER
+
+        Parameters
+        ----------
+        address : str
+            HOST:PORT to listen on
+        """
+        host, _, port = address.rpartition(":")
+        self.__server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        self.__server.daemon_threads = True
+        self.__server.registry = self
+        Thread(target=self.__server.serve_forever, name="metrics", daemon=True).start()
+        self.__enabled = True
+        TIMER.add_listener(self.__observe_stage)
+
+    def stop(self):
+        """
+        Stops serving. The values are kept
+        """
+        if self.__server is None:
+            return
+        TIMER.remove_listener(self.__observe_stage)
+        self.__enabled = False
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__server = None
+
+    def is_enabled(self):
+        return self.__enabled
+
+    def get_address(self):
+        """
+        Returns
+        -------
+        str
+            HOST:PORT being served (the port chosen by the system if it was started with port 0)
+        """
+        host, port = self.__server.server_address[:2]
+        return "{}:{}".format(host, port)
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Adds to a counter
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """
+        Sets a gauge
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__gauges[key] = float(value)
+
+    def observe(self, name, value, **labels):
+        """
+        Adds a value (in seconds) to a histogram with DURATION_BUCKETS
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render_prometheus(self):
+        """
+        Returns
+        -------
+        str
+            Every metric in the Prometheus text exposition format
+        """
+        counters, gauges, histograms = self.__copy()
+        lines = []
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for name in sorted(set(name for name, _ in values)):
+                lines.extend(self.__header(name, kind))
+                for (other, labels), value in sorted(values.items()):
+                    if other == name:
+                        lines.append(METRIC_PREFIX + name + _format_labels(labels) + " " + _format_value(value))
+        for name in sorted(set(name for name, _ in histograms)):
+            lines.extend(self.__header(name, "histogram"))
+            for (other, labels), histogram in sorted(histograms.items()):
+                if other != name:
+                    continue
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    lines.append(METRIC_PREFIX + name + "_bucket" + _format_labels(labels + (("le", repr(bound)),))
+                        + " " + str(count))
+                lines.append(METRIC_PREFIX + name + "_bucket" + _format_labels(labels + (("le", "+Inf"),))
+                    + " " + str(histogram[-1]))
+                lines.append(METRIC_PREFIX + name + "_sum" + _format_labels(labels) + " " + _format_value(histogram[-2]))
+                lines.append(METRIC_PREFIX + name + "_count" + _format_labels(labels) + " " + str(histogram[-1]))
+        return "\n".join(lines) + "\n"
+
+    def render_json(self):
+        """
+        Returns
+        -------
+        dict
+            The counters and gauges as lists of {name, labels, value}, and the histograms as lists
+            of {name, labels, buckets, sum, count}
+        """
+        counters, gauges, histograms = self.__copy()
+        def entries(values):
+            return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(values.items())]
+        return {
+            "counters": entries(counters),
+            "gauges": entries(gauges),
+            "histograms": [{
+                "name": name,
+                "labels": dict(labels),
+                "buckets": dict(zip(map(repr, DURATION_BUCKETS), histogram[:-2])),
+                "sum": histogram[-2],
+                "count": histogram[-1]
+            } for (name, labels), histogram in sorted(histograms.items())]
+        }
+
+    def __copy(self):
+        with self.__lock:
+            return dict(self.__counters), dict(self.__gauges), {key: list(value) for key, value in self.__histograms.items()}
+
+    def __observe_stage(self, name, seconds):
+        self.observe("stage_duration_seconds", seconds, stage=name)
+
+    @staticmethod
+    def __header(name, kind):
+        lines = []
+        if name in METRIC_HELP:
+            lines.append("# HELP " + METRIC_PREFIX + name + " " + METRIC_HELP[name])
+        lines.append("# TYPE " + METRIC_PREFIX + name + " " + kind)
+        return lines
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry of the server it belongs to."""
+
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path == "/metrics":
+            body = registry.render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(registry.render_json()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise be printed to stderr
+        pass
+
+def _format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels) + "}"
+
+def _format_value(value):
+    return repr(float(value))
+
+# The registry every module records to
+METRICS = MetricsRegistry()
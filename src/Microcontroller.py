@@ -11,19 +11,30 @@ This interacts with serial.
 .. todo::
     Make a Testing program that would allow you to directly get values from the micrcocontroller class. Maybe a terminal input or something would be good.
 
-.. todo::
-    Figure out how to mock Serial connection to allow this class to be tested.
+The serial connections are opened through SerialTransport, which can substitute a simulated
+microcontroller for the real one (see the SERIAL_TRANSPORT hardware parameter).
+The signal port is owned by a SerialReader thread; the request_* methods return futures
+and the measure_* methods wait on them.
 
 """
-from serial import Serial
 from time import time
+from threading import Lock
 import numpy as np
 
-from Circuit.CircuitLegacy import CircuitLegacy
 import typing
 
+# Only needed for a type hint, and expensive to import
+if typing.TYPE_CHECKING:
+    from Circuit.CircuitLegacy import CircuitLegacy
+
 from Config import Config
 from Logger import Logger
+from SerialTransport import open_serial_transport, READ_SIGNAL, READ_ENVIRONMENT
+from EnvironmentSampler import EnvironmentSampler, EnvironmentReading
+from SerialReader import SerialReader
+
+# Every temperature/humidity reading taken by the background sampler is appended here
+ENVIRONMENT_LOG_PATH = "workspace/environmentlivedata.log"
 
 class Microcontroller:
     """
@@ -56,20 +67,22 @@ class Microcontroller:
         """
         self.__logger = logger
         self.__config = config
+        # The environment port is shared by the background sampler and direct measure_temp/measure_humidity calls
+        self.__env_lock = Lock()
+        self.__env_sampler = None
+        self.__env_serial = None
+        self.__reader = None
+        # The genome digest of the circuit configured on each FPGA, by FPGA identifier
+        self.__configured = {}
         if config.get_simulation_mode() == "FULLY_INTRINSIC" or config.get_simulation_mode() == "INTRINSIC_SENSITIVITY":
             self.__log_event(1, "MCU SETTINGS ================================", config.get_usb_path(), config.get_serial_baud())
-            self.__serial =  Serial(
-                config.get_usb_path(),
-                config.get_serial_baud(),
-                timeout=config.get_mcu_read_timeout()
-            )
+            self.__serial = open_serial_transport(config, config.get_usb_path(), READ_SIGNAL)
             self.__serial.dtr = False
+            # All reads and writes on the signal port go through the reader thread
+            self.__reader = SerialReader(self.__serial, config.get_mcu_read_timeout())
+            self.__reader.start()
             if(config.reading_temp_humidity()):
-                self.__env_serial =  Serial(
-                    config.get_env_usb_path(),
-                    config.get_serial_baud(),
-                    timeout=config.get_mcu_read_timeout()
-                )
+                self.__env_serial = open_serial_transport(config, config.get_env_usb_path(), READ_ENVIRONMENT)
                 self.__env_serial.dtr = False
             self.__fpga = config.get_fpga()
 
@@ -81,9 +94,7 @@ class Microcontroller:
             Allyn, Is this the correct interpretation of what this does? Do you want to add additional detail?
             Please also check that the other multi-fpga logic is properly represented as well.
         """
-        self.__serial.reset_input_buffer()
-        self.__serial.reset_output_buffer()
-        self.__serial.write(b'4') 
+        self.__reader.send(b'4').result()
         if self.__fpga == self.__config.get_fpga():
             self.__log_event(2, "Switching to FPGA 2")
             self.__fpga = self.__config.get_fpga2()
@@ -106,6 +117,80 @@ class Microcontroller:
         """
         return self.__fpga
 
+    # SECTION Board state
+    def is_configured(self, fpga, digest):
+        """
+        Parameters
+        ----------
+        fpga : str
+            The FPGA identifier
+        digest : str
+            The genome digest of a circuit (see FileBasedCircuit.get_genome_digest)
+
+        Returns
+        -------
+        bool
+            True if that circuit is known to be the one configured on the FPGA
+        """
+        return self.__configured.get(fpga) == digest
+
+    def set_configured(self, fpga, digest):
+        """
+        Records the circuit configured on an FPGA
+
+        Parameters
+        ----------
+        fpga : str
+            The FPGA identifier
+        digest : str | None
+            The genome digest of the circuit, or None if what the FPGA holds is unknown (such
+            as after a failed upload)
+        """
+        if digest is None:
+            self.__configured.pop(fpga, None)
+        else:
+            self.__configured[fpga] = digest
+
+    def request_pulses(self):
+        """
+        Asks the MCU for a pulse count without waiting for the reply
+
+        Returns
+        -------
+        Future[SerialResult]
+            Resolves to the pulse count line, or to no lines if the read timed out
+        """
+        # NOTE The MCU is expecting a string '1' if fitness isn't measured this may be why
+        return self.__reader.request_pulses(b'1')
+
+    def request_signal(self):
+        """
+        Asks the MCU for an ADC capture of the FPGA output (500 samples, 10 microseconds apart)
+        without waiting for the reply
+
+        Returns
+        -------
+        Future[SerialResult]
+            Resolves to the sample lines
+        """
+        # The MCU is expecting a string '2' to initiate the ADC capture from the FPGA (waveform as opposed to pulses)
+        # It is sent again if the MCU does not start replying
+        return self.__reader.request_frame(b'2', resend=True)
+
+    def request_signal_td(self):
+        """
+        Asks the MCU for an ADC capture of the FPGA output and the signal generator's state
+        (1000 samples, 2.5 ms apart) without waiting for the reply
+
+        Returns
+        -------
+        Future[SerialResult]
+            Resolves to the sample lines
+        """
+        # The MCU is expecting a string '5' to initiate the ADC capture from the FPGA (waveform & state as opposed to pulses)
+        # Avoid spamming serial link by not resending it. Experiment works without this.
+        return self.__reader.request_frame(b'5')
+
     def simple_measure_pulses(self, data_filepath):
         """
         This measure pulses function will poll the MCU,
@@ -116,48 +201,21 @@ class Microcontroller:
         circuit : Circuit
             The circuit we will measure pulses of.
         """
-        data_file = open(data_filepath, "w")
-        lines = []
-        buf = []
-        # Poll serial line until START signal
-        self.__log_event(3, f"Starting loop for reading")
-        
-        self.__serial.reset_input_buffer()
-        self.__serial.reset_output_buffer()
-        # NOTE The MCU is expecting a string '1' if fitness isn't measured this may be why
-        self.__serial.write(b'1') 
+        self.__log_event(3, f"Starting MCU read")
         start = time()
-        self.__log_event(3, f"Starting MCU loop...")
-
-        max_attempts = 5
-        attempts = 0
-        while True:
-            attempts = attempts + 1
-            self.__log_event(3, f"Serial reading...")
-            p = self.__serial.read_until()
-            self.__log_event(3, f"Serial read done")
-            if (time() - start) >= self.__config.get_mcu_read_timeout():
-                self.__log_warning(1, f"Time Exceeded")
-                if attempts >= max_attempts:
-                    self.__log_warning(3, f"Exceeded max attempts ({max_attempts}). Halting MCU reading")
-                    buf.append(-1)
-                    break
-            # TODO We should be able to do whatever this line does better
-            # This is currently doing a poor job at REGEXing the MCU serial return - can be done better
-            # It's supposed to handle exceptions from transmission loss (i.e. dropped or additional spaces, shifted colons, etc)
-            self.__log_event(3, "Pulled", p, f"from MCU")
-            if (p != b"" and b":" not in p and b"START" not in p and b"FINISH" not in p and b" " not in p):
-                p = p.translate(None, b"\r\n")
-                buf.append(p)
-                break
-
+        result = self.request_pulses().result()
         end = time() - start
 
+        buf = list(result.lines)
+        if result.timed_out:
+            self.__log_warning(1, f"Time Exceeded. Halting MCU reading")
+            buf.append(-1)
+
         # if the transfer interval is "SAMPLE", switch to the other fpga between samples
         # if self.__config.get_transfer_sample():
         #     self.switch_fpga()
 
-        # buf now has `samples` entries
+        lines = []
         self.__log_event(2, 'Length of buffer:', len(buf))
         if len(buf) == 0:
             buf.append(-1000) # This should never happen
@@ -169,10 +227,11 @@ class Microcontroller:
                 buf[i] = -1
             lines.append(str(buf[i]) + "\n")
 
-        data_file.writelines(lines)
-        data_file.close()
+        self.__log_event(3, "Sampling Duration:", end)
+        with open(data_filepath, "w") as data_file:
+            data_file.writelines(lines)
 
-    def measure_pulses(self, circuit: CircuitLegacy):
+    def measure_pulses(self, circuit: 'CircuitLegacy'):
         """
         Measures the number of pulses generated by the circuit provided.
         
@@ -185,61 +244,28 @@ class Microcontroller:
         if self.__config.get_simulation_mode() == "INTRINSIC_SENSITIVITY":
             samples = 1
 
-        # TODO Use pathlib here
-        # Begin monitoring on load
-        data_file = open(circuit.get_data_filepath(), "wb")
-
+        start = time()
         buf = []
         for i in range(0,samples):
-            # Poll serial line until START signal
-            self.__log_event(3, "Starting loop for reading")
-            
-            self.__serial.reset_input_buffer()
-            self.__serial.reset_output_buffer()
-            # NOTE The MCU is expecting a string '1' if fitness isn't measured this may be why
-            self.__serial.write(b'1') 
-            start = time()
-            self.__log_event(3, "Starting MCU loop...")
-
-            while True:
-                self.__log_event(3, "Serial reading...")
-                p = self.__serial.read_until()
-                self.__log_event(3, "Serial read done")
-                if (time() - start) >= self.__config.get_mcu_read_timeout():
-                    self.__log_warning(1, "Time Exceeded. Halting MCU Reading")
-                    buf.append(0)
-                    break
-                # TODO We should be able to do whatever this line does better
-                # This is currently doing a poor job at REGEXing the MCU serial return - can be done better
-                # It's supposed to handle exceptions from transmission loss (i.e. dropped or additional spaces, shifted colons, etc)
-                self.__log_event(3, "Pulled", p, "from MCU")
-                if (p != b"" and b":" not in p and b"START" not in p and b"FINISH" not in p and b" " not in p):
-                    p = p.translate(None, b"\r\n")
-                    buf.append(p)
-                    break
-
-            end = time() - start
+            result = self.request_pulses().result()
+            if result.timed_out:
+                self.__log_warning(1, "Time Exceeded. Halting MCU Reading")
+                buf.append(0)
+            else:
+                buf.append(int(result.lines[0]))
+        end = time() - start
 
         buf_dif = 0
-        weighted_count = int(buf[0])
+        for i in range(0, len(buf) - 1):
+            buf_dif = abs(buf[i] - buf[i+1])
 
-        for i in range(0, len(buf)):
-            if buf[i] == b'':
-                buf[i] = 0
-            else:
-                buf[i] = int(buf[i])
-                if i + 1 < len(buf):
-                    buf_dif = abs(int(buf[i]) - int(buf[i+1]))
-
-        if len(buf) > 0:
-            if samples > 1:
-                weighted_count = abs(buf[0] - buf_dif)
+        weighted_count = buf[0]
+        if samples > 1:
+            weighted_count = abs(buf[0] - buf_dif)
+        with open(circuit.get_data_filepath(), "wb") as data_file:
             data_file.write(bytes(str(weighted_count) + "\n", "utf-8"))
 
-        if len(buf) > 0:
-            freq = sum(buf)/len(buf)
-        else:
-            freq = 0.0
+        freq = sum(buf)/len(buf)
 
         self.__log_event(2, "Length of Buffer:", len(buf))
         self.__log_event(2, "Number Pulses:", sum(buf))
@@ -247,175 +273,162 @@ class Microcontroller:
         self.__log_event(2, "Sampling Duration:", end)
         self.__log_event(2, "Completed writing to data file")
 
-        data_file.close()
-
     def measure_signal(self, data_filepath):
         """
         Measures the signal, writing the waveform data to the provided data file
-        
-        .. todo::
-            Preexisting todo: This whole section can probably be optimized.
 
         Parameters
         ----------
         circuit : Circuit
             The circuit we are measuring the signal of
         """
-        buf = []
-
-        # Begin monitoring on load
-        data_file = open(data_filepath, "wb")
-
-        self.__serial.reset_input_buffer()
-        self.__serial.reset_output_buffer()
         self.__log_event(1, "Reading microcontroller.")
-        # The MCU is expecting a string '2' to initiate the ADC capture from the FPGA (waveform as opposed to pulses)
-        self.__serial.write(b'2')
-        line = self.__serial.read()
-
-        start = time()
-
         # The MCU returns a START line followed by many lines of data (500 currently) followed by a FINISHED line
-        while b"START\n" not in line:
-            self.__serial.write(b'2')
-            line = self.__serial.read_until()
-
-            if (time() - start) >= self.__config.get_mcu_read_timeout():
-                self.__log_warning(1, "Did not read START from MCU")
-                self.__log_warning(1, "Time Exceeded. Halting MCU Reading.")
-                break
-
-        # TODO  This whole section can probably be optimized
-        # Reads in 500 samples from MCU, with each being 10microseconds apart
-        # Then, dumps into a file
-        while (b"FINISHED\n" not in line):
-            line = self.__serial.read_until()
-            if line != b"\n" and line != b"START\n" and line != b"FINISHED\n" and line != b"FINISHED\n":
-                buf.append(line)
-            if (time() - start) >= self.__config.get_mcu_read_timeout():
-                self.__log_warning(1, "Time Exceeded. Halting MCU Reading.")
-                break
-
-        self.__log_event(2, "Finished reading microcontroller. Logging data to file.")
-
-        for i in buf:
-            if b"FINISHED" not in i:
-                data_file.write(bytes(i))
-
-        data_file.close()
-        self.__log_event(2, "Completed writing to data file")
+        self.__write_frame(self.request_signal().result(), data_filepath)
 
     def measure_signal_td(self, data_filepath):
         """
         Measures (1) the FPGA waveform directly from FPGA output pin and (2) the "state"/frequency waveform
         directly from the signal-generating Nano. Writes 1000 sample points' data to a file.
-        
-        .. todo::
-            Preexisting todo: This whole section can probably be optimized.
 
         Parameters
         ----------
         circuit : Circuit
             The circuit we are measuring the signal of
         """
-        # TODO This whole section can probably be optimized
-        
-        buf = []
-
-        # Begin monitoring on load
-        data_file = open(data_filepath, "wb")
-
-        self.__serial.reset_input_buffer()
-        self.__serial.reset_output_buffer()
         self.__log_event(1, "Reading microcontroller.")
-        # The MCU is expecting a string '5' to initiate the ADC capture from the FPGA (waveform & state as opposed to pulses)
-        self.__serial.write(b'5')
-        line = self.__serial.read()
+        # The MCU returns a START line followed by many lines of data (1000 currently) followed by a FINISHED line
+        self.__write_frame(self.request_signal_td().result(), data_filepath)
 
-        start = time()
+    def __write_frame(self, result, data_filepath):
+        """
+        Dumps the lines of a START/FINISHED frame into a data file
 
-        # The MCU returns a START line followed by many lines of data (1000 currently) followed by a FINISHED line
-        while b"START\n" not in line:
-            # Avoid spamming serial link. Experiment works without this.
-            # self.__serial.write(b'5')
-            line = self.__serial.read_until()
-            if (time() - start) >= self.__config.get_mcu_read_timeout():
+        Parameters
+        ----------
+        result : SerialResult
+            The MCU's reply
+        data_filepath : Path
+            The file to write
+        """
+        if result.timed_out:
+            if len(result.lines) == 0:
                 self.__log_warning(1, "Did not read START from MCU")
-                self.__log_warning(1, "Time Exceeded. Halting MCU Reading.")
-                break
-
-        # TODO  This whole section can probably be optimized
-        # Reads in 1000 samples from MCU, with each being 2.5 ms apart
-        # Then, dumps into a file
-        while (b"FINISHED\n" not in line):
-            line = self.__serial.read_until()
-            if line != b"\n" and line != b"START\n" and line != b"FINISHED\n" and line != b"FINISHED\n":
-                buf.append(line)
-            if (time() - start) >= self.__config.get_mcu_read_timeout():
-                self.__log_warning(1, "Time Exceeded. Halting MCU Reading.")
-                break
+            self.__log_warning(1, "Time Exceeded. Halting MCU Reading.")
 
         self.__log_event(2, "Finished reading microcontroller. Logging data to file.")
+        with open(data_filepath, "wb") as data_file:
+            data_file.write(b"".join(result.lines))
+        self.__log_event(2, "Completed writing to data file")
 
-        for i in buf:
-            if b"FINISHED" not in i:
-                data_file.write(bytes(i))
+    def close(self):
+        """
+        Stops the serial reader and the environment sampler
+        """
+        self.stop_environment_sampler()
+        if self.__reader is not None:
+            self.__reader.stop()
+            self.__reader = None
 
-        data_file.close()
-        self.__log_event(2, "Completed writing to data file")
+    def start_environment_sampler(self):
+        """
+        Starts sampling the temperature and humidity in the background, if reading_temp_humidity is enabled
+        (and the environment port was opened).
+        Readings are appended to the environment live data log and can be looked up with get_environment.
+        """
+        if self.__env_serial is None or self.__env_sampler is not None:
+            return
+        self.__log_event(2, "Starting environment sampler")
+        self.__env_sampler = EnvironmentSampler(
+            self.measure_temp,
+            self.measure_humidity,
+            self.__config.get_env_sample_interval(),
+            self.__config.get_env_buffer_size(),
+            ENVIRONMENT_LOG_PATH
+        )
+        self.__env_sampler.start()
+
+    def stop_environment_sampler(self):
+        """
+        Stops the background environment sampler, if it is running
+        """
+        if self.__env_sampler is not None:
+            self.__env_sampler.stop()
+            self.__env_sampler = None
+
+    def get_environment(self, timestamp=None):
+        """
+        Gets the temperature and humidity at a point in time without waiting on the sensor,
+        using the background sampler's reading closest to timestamp.
+        Measures synchronously if the sampler is not running.
+
+        Parameters
+        ----------
+        timestamp : float | None
+            A time as returned by time.time(). None gets the latest reading
+
+        Returns
+        -------
+        EnvironmentReading
+            The time of the reading, the temperature and the humidity
+        """
+        if self.__env_sampler is None:
+            return EnvironmentReading(time(), self.measure_temp(), self.measure_humidity())
+        if timestamp is None:
+            return self.__env_sampler.latest()
+        return self.__env_sampler.nearest(timestamp)
 
-        
     def measure_temp(self):
         """
         Measures the temperature using a DHT22 sensor conected to the Arduino.
         """
-        self.__log_event(3, "Measuring temperature")
-            
-        self.__env_serial.reset_input_buffer()
-        self.__env_serial.reset_output_buffer()
-        self.__env_serial.write(b'5') 
-        start = time()
+        with self.__env_lock:
+            return self.__measure_env(b'5', "temperature")
 
-        self.__log_event(3, "Serial reading...")
-        p = self.__env_serial.read_until()
-        self.__log_event(3, "Serial read done")
-        if (time() - start) >= self.__config.get_mcu_read_timeout():
-            self.__log_warning(1, "Time Exceeded. Halting MCU Reading of temperature")
-            return -1;
-        # TODO We should be able to do whatever this line does better
-        # This is currently doing a poor job at REGEXing the MCU serial return - can be done better
-        # It's supposed to handle exceptions from transmission loss (i.e. dropped or additional spaces, shifted colons, etc)
-        self.__log_event(3, "Pulled", p, "from MCU")
-        if (p != b"" and b":" not in p and b"START" not in p and b"FINISH" not in p and b" " not in p):
-            p = p.translate(None, b"\r\n")
-            return(float(p))
-        
     def measure_humidity(self):
         """
         Measures the humidity using a DHT22 sensor conected to the Arduino.
         """
-        self.__log_event(3, "Measuring humidity")
+        with self.__env_lock:
+            return self.__measure_env(b'6', "humidity")
+
+    def __measure_env(self, command, quantity):
+        """
+        Sends command to the environment Arduino and parses the single value it replies with
+
+        Parameters
+        ----------
+        command : bytes
+            b'5' for temperature, b'6' for humidity
+        quantity : str
+            The name of the quantity, for logging
+
+        Returns
+        -------
+        float | None
+            The reading, or None if the MCU did not reply in time or the reply could not be parsed
+        """
+        self.__log_event(3, "Measuring " + quantity)
             
         self.__env_serial.reset_input_buffer()
         self.__env_serial.reset_output_buffer()
-        self.__env_serial.write(b'6') 
+        self.__env_serial.write(command)
         start = time()
 
         self.__log_event(3, "Serial reading...")
         p = self.__env_serial.read_until()
         self.__log_event(3, "Serial read done")
         if (time() - start) >= self.__config.get_mcu_read_timeout():
-            self.__log_warning(1, "Time Exceeded. Halting MCU Reading of humidity")
-            return -1;
+            self.__log_warning(1, "Time Exceeded. Halting MCU Reading of " + quantity)
+            # No reading, as for a line that could not be parsed
+            return None
         # TODO We should be able to do whatever this line does better
         # This is currently doing a poor job at REGEXing the MCU serial return - can be done better
         # It's supposed to handle exceptions from transmission loss (i.e. dropped or additional spaces, shifted colons, etc)
         self.__log_event(3, "Pulled", p, "from MCU")
         if (p != b"" and b":" not in p and b"START" not in p and b"FINISH" not in p and b" " not in p):
             p = p.translate(None, b"\r\n")
-            return(float(p))
-
-
-
-
-
+            try:
+                return float(p)
+            except ValueError:
+                self.__log_warning(2, "Could not parse " + quantity + " reading", p)
@@ -17,9 +17,8 @@ import math
 import numpy as np
 import sys
 from utilities import determine_color
-from os.path import exists
-from os import mkdir
 import argparse
+from Telemetry import TelemetryClient
 
 """
 Static parameters can be found and changed in the config.ini file in the root project folder
@@ -29,17 +28,67 @@ DO NOT CHANGE THEM HERE
 MAX_VIOLIN_PLOTS = 11
 HEATMAP_BINS = 40
 
-config = Config("workspace/builtconfig.ini")
-
 arg_parser = argparse.ArgumentParser()
+arg_parser.add_argument("mode", nargs="?", choices=["formal"],
+    help="formal draws every plot once, in the light style, and saves it in the Formal plots directory")
 arg_parser.add_argument("-f", "--frame-interval", required=False, default=10000)
+arg_parser.add_argument("-t", "--telemetry", required=False, default=None,
+    help="Subscribe to the live data published on this address (unix:PATH or HOST:PORT, see the telemetry "
+        + "option) instead of reading the workspace files")
 args = arg_parser.parse_args()
 FRAME_INTERVAL = int(args.frame_interval)
 
+# With telemetry, the live data is pushed to this process (see Telemetry.py), which also works
+# from another machine: the built config comes from the publisher as well
+telemetry = None
+config_path = "workspace/builtconfig.ini"
+if args.telemetry is not None:
+    telemetry = TelemetryClient(args.telemetry)
+    telemetry.wait_for_snapshot()
+    config_path = telemetry.save_stream("builtconfig.ini", ".ini")
+config = Config(config_path)
+
+def read_live_data(name):
+    """
+    Returns
+    -------
+    str
+        The contents of a live data file of the workspace, such as bestlivedata.log
+    """
+    if telemetry is not None:
+        return telemetry.read(name)
+    return open("workspace/" + name, 'r').read()
+
+def read_map_cells(text):
+    """
+    Reads the MAP-Elites map file (given as text), where later lines for a cell replace earlier ones
+
+    Returns
+    -------
+    tuple[list[float], dict[tuple[int, ...], float]]
+        The cell width along each descriptor, and the fitness of every occupied cell by its coordinates
+    """
+    lines = text.split('\n')
+    if len(lines) == 0 or len(lines[0]) == 0:
+        return [], {}
+    bin_sizes = [float(size) for size in lines[0].split(' ')]
+    cells = {}
+    for line in lines[1:]:
+        vals = line.split(' ')
+        if len(vals) <= len(bin_sizes):
+            continue
+        coords = tuple(int(val) for val in vals[:len(bin_sizes)])
+        if len(vals[len(bin_sizes)]) > 0:
+            cells[coords] = float(vals[len(bin_sizes)])
+        else:
+            # The cell was emptied
+            cells.pop(coords, None)
+    return bin_sizes, cells
+
 def run():
     """Temporary function to run all of Plot Evolution Live."""
     def animate_generation(i):
-        graph_data = open('workspace/alllivedata.log','r').read()
+        graph_data = read_live_data('alllivedata.log')
         lines = graph_data.split('\n')
         xs = []
         ys = []
@@ -80,7 +129,7 @@ def run():
                     bbox_to_anchor=(1.05, 0.5), loc="center left", borderaxespad=0)
 
     def animate_epoch(i):
-        graph_data = open('workspace/bestlivedata.log','r').read()
+        graph_data = read_live_data('bestlivedata.log')
         lines = graph_data.split('\n')
         xs = []
         ys = []
@@ -134,7 +183,7 @@ def run():
             fig.savefig(plots_dir.joinpath("1_main.png"), bbox_inches="tight")
 
     def animate_epoch_pulses(i):
-        graph_data = open('workspace/pulselivedata.log','r').read()
+        graph_data = read_live_data('pulselivedata.log')
         lines = graph_data.split('\n')
         xs = [] # closest to desired frequency
         ys = [] # avg # of pulses
@@ -177,7 +226,7 @@ def run():
 
 
     def animate_waveform(i):    
-        graph_data = open('workspace/waveformlivedata.log','r').read()
+        graph_data = read_live_data('waveformlivedata.log')
         lines = graph_data.split('\n')
         pulse_trigger = [341*3.3/715]*500
         xs = []
@@ -203,7 +252,7 @@ def run():
         ax4.set(xlabel='Time (μs)', ylabel='Voltage (V)', title='Current Hardware Waveform')
 
     def animate_state(i):    
-        graph_data = open('workspace/statelivedata.log','r').read()
+        graph_data = read_live_data('statelivedata.log')
         lines = graph_data.split('\n')
         pulse_trigger = [341*3.3/715]*500
         xs = []
@@ -226,24 +275,14 @@ def run():
         ax5.set(xlabel='Time (μs)', ylabel='Voltage (V)', title='Current State')
 
     def animate_map(i):
-        graph_data = open('workspace/maplivedata.log','r').read()
-        lines = graph_data.split('\n')
+        bin_sizes, cells = read_map_cells(read_live_data('maplivedata.log'))
         xs = []
         ys = []
         fits = []
-        if len(lines) > 0 and len(lines[0]) > 0:
-            scale_factor = int(lines[0])
-            lines.pop(0) # Remove scale factor from the lines set
-
-            for line in lines:
-                vals = line.split(' ')
-                if (len(vals) > 2 and len(vals[2]) > 0):
-                    row = int(vals[0])
-                    col = int(vals[1])
-                    fit = float(vals[2])
-                    fits.append(fit)
-                    xs.append((col + 0.5) * scale_factor)
-                    ys.append((row + 0.5) * scale_factor)
+        for (row, col), fit in cells.items():
+            fits.append(fit)
+            xs.append((col + 0.5) * bin_sizes[1])
+            ys.append((row + 0.5) * bin_sizes[0])
 
         ax5.clear()
 
@@ -265,7 +304,7 @@ def run():
             fig_map.savefig(plots_dir.joinpath("5_map.png"), bbox_inches="tight")
 
     def animate_pops(i):
-        graph_data = open('workspace/poplivedata.log','r').read()
+        graph_data = read_live_data('poplivedata.log')
         lines = graph_data.split('\n')
         xs = []
         ys = []
@@ -301,7 +340,7 @@ def run():
             ax6.set(xlabel='Generation', ylabel='Number from Population', title='Circuits from Each Source Population')
 
     def anim_violin_plots(i):
-        data = open('workspace/violinlivedata.log','r').read()
+        data = read_live_data('violinlivedata.log')
         collections = []
         gens = []
         widths = []
@@ -348,7 +387,7 @@ def run():
             fig2.savefig(plots_dir.joinpath("3_violin_plots.png"))
 
     def anim_violin_plots_pulse(i):
-        data = open('workspace/pulselivedata.log','r').read()
+        data = read_live_data('pulselivedata.log')
         collections = []
         gens = []
         widths = []
@@ -387,9 +426,9 @@ def run():
     def anim_heatmap(i):
         global max_pulses
         if config.is_pulse_func():
-            data = open('workspace/pulselivedata.log','r').read()
+            data = read_live_data('pulselivedata.log')
         else:
-            data = open('workspace/heatmaplivedata.log','r').read()
+            data = read_live_data('heatmaplivedata.log')
 
         
         lines = data.split('\n')
@@ -424,23 +463,15 @@ def run():
             fig3.savefig(plots_dir.joinpath("4_heatmap.png"))
 
     def animate_pulse_map(i):
-        graph_data = open('workspace/maplivedata.log','r').read()
-        lines = graph_data.split('\n')
+        bin_sizes, cells = read_map_cells(read_live_data('maplivedata.log'))
         xs = []
         fits = []
-        if len(lines) > 0 and len(lines[0]) > 0:
-            scale_factor = int(lines[0])
-            lines.pop(0) # Remove scale factor from the lines set
-
-            for line in lines:
-                # Two values; the pulse count (frequency) and the fitness
-                for line in lines:
-                    vals = line.split(' ')
-
-                    col = int(vals[0])
-                    fit = float(vals[1])
-                    fits.append(fit)
-                    xs.append((col-0.5) * scale_factor)
+        if len(bin_sizes) > 0:
+            scale_factor = bin_sizes[0]
+            # Two values; the pulse count (frequency) bin and the fitness
+            for (col,), fit in cells.items():
+                fits.append(fit)
+                xs.append((col + 0.5) * scale_factor)
 
             ax5.clear()
 
@@ -460,7 +491,7 @@ def run():
     plots_dir = config.get_plots_directory()
 
     formal = False
-    if len(sys.argv) > 1 and sys.argv[1] == 'formal':
+    if args.mode == 'formal':
         formal = True 
         plots_dir = plots_dir.joinpath("Formal")
         accent_color = "black"
@@ -477,8 +508,7 @@ def run():
         plot = lambda fig, function : animation.FuncAnimation(fig, function, interval=FRAME_INTERVAL, cache_frame_data=False)
 
     
-    if not exists(plots_dir):
-        mkdir(plots_dir)
+    plots_dir.mkdir(parents=True, exist_ok=True)
 
     fig = plt.figure(figsize=(9,7))
     rows = 2
@@ -532,10 +562,11 @@ def run():
         ax10 = fig4.add_subplot(2,1,2)
         ani10 = plot(fig4, anim_violin_plots_pulse)
 
-    if config.get_selection_type() == 'MAP_ELITES':
+    # Maps over more than two descriptors are not plotted
+    if config.get_selection_type() == 'MAP_ELITES' and config.get_map_elites_dimension() in [1, 2]:
         fig_map = plt.figure()
         ax5 = fig_map.add_subplot(1, 1, 1)
-        if config.get_fitness_func() == "PULSE_CONSISTENCY":
+        if config.get_map_elites_dimension() == 1:
             ani4 = plot(fig_map, animate_pulse_map)
         else:
             ani4 = plot(fig_map, animate_map)
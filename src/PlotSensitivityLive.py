@@ -12,8 +12,8 @@ from matplotlib import style
 from Config import Config
 import numpy as np
 import sys
-from os.path import exists
-from os import mkdir
+import argparse
+from Telemetry import TelemetryClient
 from mpl_toolkits.axisartist.parasite_axes import HostAxes
 
 """
@@ -24,11 +24,27 @@ DO NOT CHANGE THEM HERE
 HEATMAP_BINS = 40 
 FRAME_INTERVAL = 10000
 
-config = Config("workspace/builtconfig.ini")
+arg_parser = argparse.ArgumentParser()
+arg_parser.add_argument("mode", nargs="?", choices=["formal"])
+arg_parser.add_argument("-t", "--telemetry", required=False, default=None,
+    help="Subscribe to the live data published on this address instead of reading the workspace files")
+args = arg_parser.parse_args()
+
+# With telemetry, the live data is pushed to this process (see Telemetry.py)
+telemetry = None
+config_path = "workspace/builtconfig.ini"
+if args.telemetry is not None:
+    telemetry = TelemetryClient(args.telemetry)
+    telemetry.wait_for_snapshot()
+    config_path = telemetry.save_stream("builtconfig.ini", ".ini")
+config = Config(config_path)
 
 def run():
     def get_data():
-        graph_data = open('workspace/fitnesssensitivity.log','r').read()
+        if telemetry is not None:
+            graph_data = telemetry.read("fitnesssensitivity.log")
+        else:
+            graph_data = open('workspace/fitnesssensitivity.log','r').read()
         lines = graph_data.split('\n')
         xs = []
         ys = []
@@ -322,7 +338,7 @@ def run():
     plots_dir = config.get_plots_directory()
 
     formal = False
-    if len(sys.argv) > 1 and sys.argv[1] == 'formal':
+    if args.mode == 'formal':
         formal = True 
         plots_dir = plots_dir.joinpath("Formal")
         accent_color = "black"
@@ -336,8 +352,7 @@ def run():
         yellow = "yellow"
         plot = lambda fig, function : animation.FuncAnimation(fig, function, interval=FRAME_INTERVAL, cache_frame_data=False)
 
-    if not exists(plots_dir):
-        mkdir(plots_dir)
+    plots_dir.mkdir(parents=True, exist_ok=True)
 
     fig = plt.figure(figsize=(9,7))
     ax2 = fig.add_subplot(2, 2, 1)
@@ -0,0 +1,200 @@
+"""
+PopulationArrays.py
+-------------------
+
+Struct-of-arrays storage for the circuits of a CircuitPopulation.
+
+The population is held as parallel arrays (circuit references, fitness, pulse counts, voltage
+readings and source population), all kept in ranked order: index 0 is the fittest circuit.
+Re-ranking after an evaluation is a single stable ``argsort`` applied to every array, and elite
+protection is a boolean mask rather than a list that has to be scanned with ``in``.
+"""
+
+import numpy as np
+
+# Extra data measured by the fitness functions that is mirrored into float arrays
+VOLTAGE_KEYS = ("mean_voltage", "low_voltage", "high_voltage")
+
+class PopulationArrays:
+    """
+    Parallel arrays describing a population of circuits, in ranked order.
+    Circuit objects remain the owners of their genomes; this class only holds references to them.
+    """
+
+    def __init__(self, circuits, track_pulses=False, track_voltages=False, track_src_population=False):
+        """
+        Parameters
+        ----------
+        circuits : list[Circuit]
+            The circuits of the population. They are taken to be in ranked order until :meth:`rank` is called
+        track_pulses : bool
+            Whether to mirror each circuit's 'pulses' extra data
+        track_voltages : bool
+            Whether to mirror each circuit's mean/low/high voltage extra data
+        track_src_population : bool
+            Whether to mirror each circuit's 'src_population' file attribute
+        """
+        self.__track_pulses = track_pulses
+        self.__track_voltages = track_voltages
+        self.__track_src_population = track_src_population
+        self.__circuits = np.empty(len(circuits), dtype=object)
+        self.__circuits[:] = circuits
+        self.__pulses = np.zeros(len(circuits), dtype=np.int64)
+        self.__voltages = {key: np.full(len(circuits), np.nan) for key in VOLTAGE_KEYS}
+        self.__src_population = np.zeros(len(circuits), dtype=np.int64)
+        self.__protected = np.zeros(len(circuits), dtype=bool)
+        self.gather()
+
+    # SECTION Gathering and ranking
+    def gather(self):
+        """
+        Reads the fitness (and any tracked extra data) of every circuit into the arrays.
+        Must be called after the circuits are evaluated, before :meth:`rank`.
+        """
+        circuits = self.__circuits
+        n = circuits.size
+        self.__fitness = np.fromiter((ckt.get_fitness() for ckt in circuits), dtype=float, count=n)
+        if self.__track_pulses:
+            self.__pulses = np.fromiter((self.__extra(ckt, 'pulses', 0) for ckt in circuits), dtype=np.int64, count=n)
+        if self.__track_voltages:
+            for key in VOLTAGE_KEYS:
+                self.__voltages[key] = np.fromiter((self.__extra(ckt, key, np.nan) for ckt in circuits), dtype=float, count=n)
+        if self.__track_src_population:
+            self.__src_population = np.fromiter(
+                (int(ckt.get_file_attribute('src_population')) for ckt in circuits), dtype=np.int64, count=n)
+
+    def rank(self):
+        """
+        Re-orders every array by decreasing fitness. Circuits with equal fitness keep their
+        current relative order. Clears the protected-elite mask.
+        """
+        self.__reorder(np.argsort(-self.__fitness, kind="stable"))
+        self.__protected = np.zeros(self.__circuits.size, dtype=bool)
+
+    def update(self, index):
+        """
+        Reads the fitness (and any tracked extra data) of the circuit at one rank again and moves
+        it to its new rank, keeping the order of every other circuit. Used when circuits are
+        evaluated one at a time, so the population stays ranked without a full :meth:`rank`.
+        The circuit goes after any circuits with equal fitness.
+
+        Parameters
+        ----------
+        index : int
+            The rank of the circuit
+
+        Returns
+        -------
+        int
+            The new rank of the circuit
+        """
+        circuit = self.__circuits[index]
+        self.__fitness[index] = circuit.get_fitness()
+        if self.__track_pulses:
+            self.__pulses[index] = self.__extra(circuit, 'pulses', 0)
+        if self.__track_voltages:
+            for key in VOLTAGE_KEYS:
+                self.__voltages[key][index] = self.__extra(circuit, key, np.nan)
+        if self.__track_src_population:
+            self.__src_population[index] = int(circuit.get_file_attribute('src_population'))
+
+        others = np.delete(np.arange(self.__circuits.size), index)
+        rank = int(np.searchsorted(-self.__fitness[others], -self.__fitness[index], side="right"))
+        self.__reorder(np.insert(others, rank, index))
+        return rank
+
+    # SECTION Elite protection
+    def clear_protected(self):
+        self.__protected[:] = False
+
+    def protect(self, selector):
+        """
+        Marks circuits as protected elites (excluded from random injection)
+
+        Parameters
+        ----------
+        selector : int | slice | np.ndarray
+            Ranked indices, a slice of ranks or a boolean mask
+        """
+        self.__protected[selector] = True
+
+    def protect_circuits(self, circuits):
+        """
+        Marks the given circuit objects as protected elites
+
+        Parameters
+        ----------
+        circuits : iterable[Circuit]
+            The circuits to protect
+        """
+        ids = set(map(id, circuits))
+        self.__protected |= np.fromiter((id(ckt) in ids for ckt in self.__circuits), dtype=bool, count=self.__circuits.size)
+
+    def get_protected(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            Boolean mask (in ranked order) of the protected elites
+        """
+        return self.__protected
+
+    # SECTION Getters
+    def get_circuits(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            Object array of the circuits, in ranked order
+        """
+        return self.__circuits
+
+    def get_fitness(self):
+        return self.__fitness
+
+    def get_pulses(self):
+        return self.__pulses
+
+    def get_voltage(self, key):
+        """
+        Parameters
+        ----------
+        key : str
+            One of mean_voltage, low_voltage or high_voltage
+        """
+        return self.__voltages[key]
+
+    def get_src_populations(self):
+        return self.__src_population
+
+    def __len__(self):
+        return self.__circuits.size
+
+    def __iter__(self):
+        return iter(self.__circuits)
+
+    def __getitem__(self, index):
+        return self.__circuits[index]
+
+    def __repr__(self):
+        return repr(list(self.__circuits))
+
+    # SECTION Helpers
+    def __reorder(self, order):
+        self.__circuits = self.__circuits[order]
+        self.__fitness = self.__fitness[order]
+        self.__protected = self.__protected[order]
+        if self.__track_pulses:
+            self.__pulses = self.__pulses[order]
+        if self.__track_voltages:
+            for key in VOLTAGE_KEYS:
+                self.__voltages[key] = self.__voltages[key][order]
+        if self.__track_src_population:
+            self.__src_population = self.__src_population[order]
+
+    @staticmethod
+    def __extra(circuit, key, default):
+        try:
+            return circuit.get_extra_data(key)
+        except KeyError:
+            return default
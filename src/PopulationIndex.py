@@ -0,0 +1,162 @@
+"""
+PopulationIndex.py
+------------------
+
+A manifest of the circuits stored in one source population directory (as used by the
+EXISTING_POPULATION init mode).
+
+For each hardware file the index stores its fitness and pulse count (read from the file's
+FILE_ATTRIBUTES line), a hash of its genome, and the size and modification time the values were
+read at. The index is written next to the circuits as ``INDEX_FILENAME``. When it is opened again
+only files that are new or have changed since are read, so seeding from a large archive only
+touches the index and the circuits that are actually selected.
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from Circuit.FileBasedCircuit import FileBasedCircuit
+
+INDEX_FILENAME = ".population_index.json"
+
+# Bump when the layout of an index entry changes, so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+class PopulationIndex:
+    """
+    Fitness, pulse count and genome hash of every circuit in a source population directory,
+    kept up to date with the directory's contents.
+    """
+
+    def __init__(self, directory, max_workers=None):
+        """
+        Loads the index of directory, reading any hardware files that are missing from it or
+        have changed, and saves it back if anything changed.
+
+        Parameters
+        ----------
+        directory : Path
+            The source population directory
+        max_workers : int | None
+            The number of threads used to read changed files. None uses the ThreadPoolExecutor default
+        """
+        self.__directory = directory
+        self.__index_path = directory.joinpath(INDEX_FILENAME)
+        self.__entries = {}
+        self.refresh(max_workers)
+
+    def refresh(self, max_workers=None):
+        """
+        Brings the index up to date with the directory, reading only new or modified files
+
+        Parameters
+        ----------
+        max_workers : int | None
+            The number of threads used to read changed files
+
+        Returns
+        -------
+        int
+            The number of files that had to be read
+        """
+        cached = self.__load()
+        stats = {}
+        with os.scandir(self.__directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith(INDEX_FILENAME):
+                    stat = entry.stat()
+                    stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+        entries = {}
+        stale = []
+        for name, (size, mtime) in stats.items():
+            old = cached.get(name)
+            if old is not None and old["size"] == size and old["mtime_ns"] == mtime:
+                entries[name] = old
+            else:
+                stale.append(name)
+
+        if len(stale) > 0:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for name, entry in zip(stale, executor.map(self.__read_entry, stale)):
+                    entry["size"], entry["mtime_ns"] = stats[name]
+                    entries[name] = entry
+
+        self.__entries = entries
+        if len(stale) > 0 or len(entries) != len(cached):
+            self.__save()
+        return len(stale)
+
+    def get_ranked(self):
+        """
+        Returns
+        -------
+        list[tuple[Path, float]]
+            The path and fitness of every circuit, fittest first. Ties are ordered by file name
+        """
+        names = sorted(self.__entries, key=lambda name: (-self.__entries[name]["fitness"], name))
+        return [(self.__directory.joinpath(name), self.__entries[name]["fitness"]) for name in names]
+
+    def get_entry(self, name):
+        """
+        Parameters
+        ----------
+        name : str
+            The file name of a circuit in the directory
+
+        Returns
+        -------
+        dict
+            The circuit's fitness, pulses, hash, size and mtime_ns
+        """
+        return self.__entries[name]
+
+    def __len__(self):
+        return len(self.__entries)
+
+    # SECTION Reading and writing
+    def __read_entry(self, name):
+        """
+        Reads the attributes and genome hash of one hardware file
+        """
+        with open(self.__directory.joinpath(name), "rb") as hw_file:
+            contents = hw_file.read()
+        return {
+            "fitness": self.__parse_float(FileBasedCircuit.get_file_attribute_st(contents, "fitness")),
+            "pulses": int(self.__parse_float(FileBasedCircuit.get_file_attribute_st(contents, "pulse_count"))),
+            # The genome is everything after the attribute line, so circuits that only differ
+            # in their recorded fitness share a hash
+            "hash": hashlib.blake2b(contents[FileBasedCircuit._body_start(contents):], digest_size=16).hexdigest(),
+        }
+
+    @staticmethod
+    def __parse_float(value):
+        # Missing or unparsable attributes count as 0
+        if value is None:
+            return 0.0
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+
+    def __load(self):
+        try:
+            with open(self.__index_path, "r") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("entries", {})
+
+    def __save(self):
+        # Write to a temporary file first so an interrupted run never leaves a truncated index
+        tmp_path = self.__index_path.with_name(INDEX_FILENAME + ".tmp")
+        try:
+            with open(tmp_path, "w") as index_file:
+                json.dump({"version": INDEX_VERSION, "entries": self.__entries}, index_file)
+            os.replace(tmp_path, self.__index_path)
+        except OSError:
+            # A read-only archive can still be used, it just can't be indexed
+            pass
@@ -0,0 +1,149 @@
+"""
+Racing.py
+---------
+
+Racing for the measurements of one generation. With several samples or passes per circuit, most
+of the measurement time goes to circuits whose first samples already show they are far below the
+elites. A race keeps a running estimate of each circuit's fitness from the fitness of every single
+sample taken so far, with a confidence interval around it, and eliminates a circuit as soon as the
+top of its interval is below the bottom of the interval of the num_elites-th best circuit: at that
+point it can no longer be expected to reach the elite set, and its remaining samples are skipped.
+The samples saved can then be spent on the contenders, the circuits whose intervals still
+straddle that threshold.
+
+The interval is mean +/- confidence * sigma / sqrt(samples), where sigma is the standard deviation
+of single-sample fitness pooled over every circuit, since any one circuit has too few samples to
+estimate its own.
+"""
+
+import numpy as np
+
+# The fewest samples a circuit is eliminated on
+MIN_SAMPLES = 2
+
+class Race:
+    """
+    The per-sample fitness statistics of the circuits of one generation, and which of them have
+    been eliminated
+    """
+
+    def __init__(self, num_circuits, num_elites, confidence):
+        """
+        Parameters
+        ----------
+        num_circuits : int
+            The number of circuits racing, referred to by index
+        num_elites : int
+            The size of the elite set the circuits race for
+        confidence : float
+            The half width of the confidence interval, in standard errors
+        """
+        self.__num_elites = max(1, num_elites)
+        self.__confidence = confidence
+        self.__counts = np.zeros(num_circuits, dtype=np.int64)
+        self.__sums = np.zeros(num_circuits)
+        self.__squares = np.zeros(num_circuits)
+        self.__eliminated = np.zeros(num_circuits, dtype=bool)
+
+    def add(self, index, fitness):
+        """
+        Records the fitness of one sample of a circuit
+
+        Parameters
+        ----------
+        index : int
+            The circuit
+        fitness : float
+            The fitness of the sample on its own
+        """
+        self.__counts[index] += 1
+        self.__sums[index] += fitness
+        self.__squares[index] += fitness * fitness
+
+    def eliminate(self, index=None):
+        """
+        Eliminates a circuit (or every circuit not yet eliminated if index is None) if its upper
+        bound is below the threshold and it has at least MIN_SAMPLES samples
+
+        Parameters
+        ----------
+        index : int | None
+            The circuit to check
+
+        Returns
+        -------
+        bool | np.ndarray
+            Whether the circuit is eliminated, or the indices newly eliminated if index is None
+        """
+        lower, upper = self.bounds()
+        threshold = self.__threshold(lower)
+        if index is not None:
+            if not self.__eliminated[index] and self.__counts[index] >= MIN_SAMPLES and upper[index] < threshold:
+                self.__eliminated[index] = True
+            return bool(self.__eliminated[index])
+        newly = ~self.__eliminated & (self.__counts >= MIN_SAMPLES) & (upper < threshold)
+        self.__eliminated |= newly
+        return np.flatnonzero(newly)
+
+    def contenders(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            The circuits that are not eliminated but not yet certain to be elites either (their
+            lower bound is below the threshold), closest to the threshold first
+        """
+        lower, upper = self.bounds()
+        threshold = self.__threshold(lower)
+        if not np.isfinite(threshold):
+            return np.zeros(0, dtype=np.int64)
+        undecided = np.flatnonzero(~self.__eliminated & (self.__counts > 0) & (lower < threshold))
+        means = self.__sums[undecided] / self.__counts[undecided]
+        return undecided[np.argsort(np.abs(means - threshold), kind="stable")]
+
+    def bounds(self):
+        """
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The lower and upper confidence bound of each circuit's mean sample fitness. Circuits
+            without samples have bounds of -inf and inf, and every bound is infinite until the
+            pooled standard deviation can be estimated
+        """
+        counts = self.__counts
+        measured = counts > 0
+        means = np.divide(self.__sums, counts, out=np.zeros(counts.size), where=measured)
+        freedom = np.sum(counts[measured] - 1)
+        if freedom <= 0:
+            return np.full(counts.size, -np.inf), np.full(counts.size, np.inf)
+        deviations = np.sum(self.__squares[measured] - counts[measured] * means[measured] ** 2)
+        sigma = np.sqrt(max(deviations, 0.0) / freedom)
+        half_width = np.full(counts.size, np.inf)
+        half_width[measured] = self.__confidence * sigma / np.sqrt(counts[measured])
+        return means - half_width, means + half_width
+
+    # SECTION Getters
+    def is_eliminated(self, index):
+        return bool(self.__eliminated[index])
+
+    def get_eliminated(self):
+        """
+        Returns
+        -------
+        np.ndarray
+            Boolean array, True for each eliminated circuit
+        """
+        return self.__eliminated.copy()
+
+    def get_sample_counts(self):
+        return self.__counts.copy()
+
+    # SECTION Helpers
+    def __threshold(self, lower):
+        """
+        The num_elites-th highest lower bound, -inf while fewer circuits than that have samples
+        """
+        measured = lower[self.__counts > 0]
+        if measured.size < self.__num_elites:
+            return -np.inf
+        return np.partition(measured, measured.size - self.__num_elites)[measured.size - self.__num_elites]
@@ -0,0 +1,422 @@
+"""
+RunAnalytics.py
+---------------
+
+Statistics across many runs. Scans directories for the workspaces saved at the end of runs
+(by Logger.save_workspace or WorkspaceFormatter, as directories or compressed tars), parses their
+live data files into NumPy arrays and summarises them as a table with one row per run: how long
+the run took to converge, and whether and when it succeeded.
+
+Parsing is the slow part, so runs are parsed in parallel processes and each run's arrays are
+cached as an .npz file in a cache directory. A cached run is only parsed again when one of its
+files changes size or modification time, so re-analysing hundreds of runs (e.g. with another
+success threshold) only reads the cache. See tools/analyze_runs.py for the command line.
+"""
+
+import os
+import hashlib
+import tarfile
+from configparser import ConfigParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import numpy as np
+from WorkspaceArchiver import ARCHIVE_EXTENSIONS
+
+# Bump when the parsed arrays change, so old cache entries are no longer used
+CACHE_VERSION = 1
+
+# The live data files a run is parsed from
+BEST_LIVE_DATA = "bestlivedata.log"
+VIOLIN_LIVE_DATA = "violinlivedata.log"
+PULSE_LIVE_DATA = "pulselivedata.log"
+BUILT_CONFIG = "builtconfig.ini"
+RUN_FILES = (BEST_LIVE_DATA, VIOLIN_LIVE_DATA, PULSE_LIVE_DATA, BUILT_CONFIG)
+
+# Columns of bestlivedata.log (see CircuitPopulation.__write_generation)
+BEST_COLUMNS = ("epoch", "best", "worst", "average", "overall_best", "diversity")
+EPOCH, BEST, WORST, AVERAGE, OVERALL_BEST, DIVERSITY = range(len(BEST_COLUMNS))
+
+class RunData(NamedTuple):
+    """
+    The parsed live data of one run
+    """
+    name: str
+    # One row of BEST_COLUMNS per generation
+    best: np.ndarray
+    # The generation of each row of violin, and every circuit's fitness in that generation
+    violin_epochs: np.ndarray
+    violin: np.ndarray
+    # The generation of each row of pulses, and every circuit's pulse count in that generation
+    pulse_epochs: np.ndarray
+    pulses: np.ndarray
+    # From builtconfig.ini. Empty and NaN if the run has no built config
+    fitness_func: str
+    desired_freq: float
+
+def find_runs(roots):
+    """
+    Finds the saved workspaces under some directories, without entering them
+
+    Parameters
+    ----------
+    roots : Iterable[str | Path]
+        Directories to search (or runs themselves)
+
+    Returns
+    -------
+    list[str]
+        The path of every run found: directories holding a bestlivedata.log, and .tar.gz and
+        .tar.xz files
+    """
+    runs = []
+    for root in map(str, roots):
+        if _is_archive(root) or os.path.isfile(os.path.join(root, BEST_LIVE_DATA)):
+            runs.append(root)
+            continue
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            if BEST_LIVE_DATA in files:
+                runs.append(directory)
+                # A saved workspace never holds other runs
+                subdirectories.clear()
+                continue
+            runs.extend(os.path.join(directory, name) for name in sorted(files) if _is_archive(name))
+    return runs
+
+def load_runs(paths, cache_dir=None, workers=None):
+    """
+    Parses runs in parallel, reading unchanged runs from the cache
+
+    Parameters
+    ----------
+    paths : list[str]
+        Runs, as returned by find_runs
+    cache_dir : str | Path | None
+        The directory of the parsed arrays. None disables the cache
+    workers : int | None
+        The number of processes parsing runs. None uses one per CPU
+
+    Returns
+    -------
+    list[RunData]
+        The runs, in the order of paths
+    """
+    runs = [None] * len(paths)
+    missing = []
+    for i, path in enumerate(paths):
+        if cache_dir is not None:
+            runs[i] = _read_cache(cache_dir, path)
+        if runs[i] is None:
+            missing.append(i)
+
+    if len(missing) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(missing) // (4 * (workers or os.cpu_count() or 1)))
+            parsed = list(executor.map(parse_run, [paths[i] for i in missing], chunksize=chunksize))
+    else:
+        parsed = [parse_run(paths[i]) for i in missing]
+
+    for i, run in zip(missing, parsed):
+        runs[i] = run
+        if cache_dir is not None:
+            _write_cache(cache_dir, paths[i], run)
+    return runs
+
+def parse_run(path):
+    """
+    Parameters
+    ----------
+    path : str
+        A saved workspace directory or archive
+
+    Returns
+    -------
+    RunData
+        Its parsed live data. Files the run does not have parse as empty arrays
+    """
+    texts = _read_run_files(path)
+    for name in (BEST_LIVE_DATA, VIOLIN_LIVE_DATA, PULSE_LIVE_DATA):
+        if name in texts:
+            # Drops a last line that was still being written when the run stopped
+            texts[name] = texts[name][:texts[name].rfind("\n") + 1]
+    violin_epochs, violin = parse_generation_data(texts.get(VIOLIN_LIVE_DATA, ""))
+    pulse_epochs, pulses = parse_generation_data(texts.get(PULSE_LIVE_DATA, ""))
+    fitness_func = ""
+    desired_freq = np.nan
+    if BUILT_CONFIG in texts:
+        config = ConfigParser(interpolation=None)
+        config.read_string(texts[BUILT_CONFIG])
+        fitness_func = config.get("FITNESS PARAMETERS", "fitness_func", fallback="")
+        desired_freq = float(config.get("FITNESS PARAMETERS", "desired_freq", fallback="nan"))
+    return RunData(
+        name=path,
+        best=parse_best_live_data(texts.get(BEST_LIVE_DATA, "")),
+        violin_epochs=violin_epochs,
+        violin=violin,
+        pulse_epochs=pulse_epochs,
+        pulses=pulses,
+        fitness_func=fitness_func,
+        desired_freq=desired_freq
+    )
+
+def parse_best_live_data(text):
+    """
+    Parameters
+    ----------
+    text : str
+        The contents of a bestlivedata.log
+
+    Returns
+    -------
+    np.ndarray
+        One row of BEST_COLUMNS per line. Incomplete lines (e.g. the last line of a run that
+        was killed) are skipped
+    """
+    lines = text.splitlines()
+    fields = text.replace(",", " ").split()
+    if len(fields) == len(lines) * len(BEST_COLUMNS):
+        try:
+            return np.array(fields, dtype=float).reshape(-1, len(BEST_COLUMNS))
+        except ValueError:
+            pass
+    rows = [row for row in (line.split(",") for line in lines) if len(row) == len(BEST_COLUMNS)]
+    return np.array(rows, dtype=float).reshape(-1, len(BEST_COLUMNS))
+
+def parse_generation_data(text):
+    """
+    Parameters
+    ----------
+    text : str
+        The contents of a live data file with a line of "generation:value,value,..." per
+        generation (violinlivedata.log or pulselivedata.log)
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The generation of each line, and a matrix with a row of values per line. Lines shorter
+        than the longest are padded with NaN
+    """
+    epochs = []
+    values = []
+    for line in text.splitlines():
+        epoch, _, data = line.partition(":")
+        if data.strip() == "":
+            continue
+        epochs.append(int(epoch))
+        values.append(data)
+    if len(values) == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, 0))
+
+    lengths = np.array([data.count(",") + 1 for data in values])
+    flat = np.array(",".join(values).split(","), dtype=float)
+    width = lengths.max()
+    if (lengths == width).all():
+        return np.array(epochs), flat.reshape(-1, width)
+    matrix = np.full((len(values), width), np.nan)
+    matrix[np.arange(width) < lengths[:, None]] = flat
+    return np.array(epochs), matrix
+
+def summarize_runs(runs, target_fitness=None, target_frequency=None, tolerance=0, convergence_fraction=0.95):
+    """
+    Summarises every run in a columnar table
+
+    A run succeeds in the first generation its overall best fitness reaches target_fitness. If
+    no target_fitness is given, runs with pulse data succeed in the first generation any
+    circuit's pulse count is within tolerance of target_frequency (by default the run's own
+    desired_freq), and other runs have no success criterion.
+
+    Parameters
+    ----------
+    runs : list[RunData]
+        The runs
+    target_fitness : float | None
+        The fitness a run must reach to succeed
+    target_frequency : float | None
+        The pulse count a pulse count run must reach to succeed
+    tolerance : float
+        How far from target_frequency a pulse count may be
+    convergence_fraction : float
+        A run converges in the first generation its overall best fitness has made this fraction
+        of its total improvement
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        Columns "name", "generations", "final_best", "final_average", "overall_best",
+        "convergence_generation", "has_criterion", "success" and "success_generation" (NaN
+        for runs that did not succeed)
+    """
+    count = len(runs)
+    table = {
+        "name": np.array([run.name for run in runs], dtype=str),
+        "generations": np.zeros(count, dtype=int),
+        "final_best": np.full(count, np.nan),
+        "final_average": np.full(count, np.nan),
+        "overall_best": np.full(count, np.nan),
+        "convergence_generation": np.full(count, np.nan),
+        "has_criterion": np.zeros(count, dtype=bool),
+        "success": np.zeros(count, dtype=bool),
+        "success_generation": np.full(count, np.nan),
+    }
+    for i, run in enumerate(runs):
+        best = run.best
+        if len(best) > 0:
+            epochs = best[:, EPOCH]
+            overall = best[:, OVERALL_BEST]
+            table["generations"][i] = int(epochs[-1])
+            table["final_best"][i] = best[-1, BEST]
+            table["final_average"][i] = best[-1, AVERAGE]
+            table["overall_best"][i] = overall[-1]
+            threshold = overall[0] + convergence_fraction * (overall[-1] - overall[0])
+            table["convergence_generation"][i] = epochs[np.argmax(overall >= threshold)]
+
+        if target_fitness is not None:
+            table["has_criterion"][i] = True
+            epochs, reached = best[:, EPOCH], best[:, OVERALL_BEST] >= target_fitness
+        elif len(run.pulses) > 0:
+            target = run.desired_freq if target_frequency is None else target_frequency
+            table["has_criterion"][i] = not np.isnan(target)
+            epochs, reached = run.pulse_epochs, (np.abs(run.pulses - target) <= tolerance).any(axis=1)
+        else:
+            continue
+        if reached.any():
+            table["success"][i] = True
+            table["success_generation"][i] = epochs[np.argmax(reached)]
+    return table
+
+def aggregate(table):
+    """
+    Parameters
+    ----------
+    table : dict[str, np.ndarray]
+        A table from summarize_runs
+
+    Returns
+    -------
+    dict[str, float]
+        The number of runs, the success rate (over the runs with a success criterion, NaN if
+        none has one), and the mean, median and 90th percentile of the generations to success,
+        the generations to convergence and the overall best fitness
+    """
+    stats = {"runs": len(table["name"])}
+    judged = table["has_criterion"]
+    stats["runs_with_criterion"] = int(judged.sum())
+    stats["success_rate"] = table["success"][judged].mean() if judged.any() else np.nan
+    for column in ("success_generation", "convergence_generation", "overall_best"):
+        values = table[column][~np.isnan(table[column])]
+        for name, function in (("mean", np.mean), ("median", np.median), ("p90", lambda x: np.percentile(x, 90))):
+            stats[column + "_" + name] = function(values) if len(values) > 0 else np.nan
+    return stats
+
+def best_fitness_curves(runs):
+    """
+    Parameters
+    ----------
+    runs : list[RunData]
+        The runs
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The generations, and a matrix with each run's overall best fitness in every generation.
+        A run that stopped early keeps its last overall best; generations before a run's first
+        are NaN
+    """
+    runs = [run for run in runs if len(run.best) > 0]
+    if len(runs) == 0:
+        return np.zeros(0, dtype=int), np.zeros((0, 0))
+    last = max(int(run.best[-1, EPOCH]) for run in runs)
+    generations = np.arange(last + 1)
+    curves = np.full((len(runs), last + 1), np.nan)
+    for i, run in enumerate(runs):
+        epochs = run.best[:, EPOCH].astype(int)
+        curves[i, epochs] = run.best[:, OVERALL_BEST]
+        curves[i, epochs[-1]:] = run.best[-1, OVERALL_BEST]
+        # Generations missing from the log (e.g. a killed run's torn line) keep the previous value
+        filled = np.where(np.isnan(curves[i]), 0, np.arange(last + 1))
+        np.maximum.accumulate(filled, out=filled)
+        curves[i] = curves[i, filled]
+    return generations, curves
+
+def _is_archive(path):
+    return any(path.endswith(extension) for extension in ARCHIVE_EXTENSIONS.values() if extension != "")
+
+def _read_run_files(path):
+    """
+    Returns the text of the RUN_FILES a run has, by file name
+    """
+    texts = {}
+    if not _is_archive(path):
+        for name in RUN_FILES:
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                with open(file_path) as run_file:
+                    texts[name] = run_file.read()
+        return texts
+    # Archives hold the workspace in a single top level directory. Stream mode reads them once
+    # front to back, which is what an .xz archive costs anyway
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            parts = member.name.split("/")
+            if member.isfile() and len(parts) == 2 and parts[1] in RUN_FILES:
+                texts[parts[1]] = archive.extractfile(member).read().decode()
+    return texts
+
+def _source_key(path):
+    """
+    Identifies the version of a run's files: a cached run is stale if this has changed
+    """
+    paths = [path] if _is_archive(path) else [os.path.join(path, name) for name in RUN_FILES]
+    parts = [str(CACHE_VERSION)]
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+            parts.append("{}:{}:{}".format(os.path.basename(file_path), stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            parts.append(os.path.basename(file_path) + ":missing")
+    return "|".join(parts)
+
+def _cache_path(cache_dir, path):
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+    return os.path.join(str(cache_dir), digest + ".npz")
+
+def _read_cache(cache_dir, path):
+    cache_path = _cache_path(cache_dir, path)
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if str(cached["key"]) != _source_key(path):
+                return None
+            return RunData(
+                name=path,
+                best=cached["best"],
+                violin_epochs=cached["violin_epochs"],
+                violin=cached["violin"],
+                pulse_epochs=cached["pulse_epochs"],
+                pulses=cached["pulses"],
+                fitness_func=str(cached["fitness_func"]),
+                desired_freq=float(cached["desired_freq"])
+            )
+    except (OSError, ValueError, KeyError):
+        # A cache file that was being written when another analysis was stopped
+        return None
+
+def _write_cache(cache_dir, path, run):
+    os.makedirs(str(cache_dir), exist_ok=True)
+    cache_path = _cache_path(cache_dir, path)
+    # Written under another name first, so a concurrent reader never sees half a file
+    temp_path = cache_path + ".{}.tmp".format(os.getpid())
+    with open(temp_path, "wb") as cache_file:
+        np.savez(
+            cache_file,
+            key=np.array(_source_key(path)),
+            best=run.best,
+            violin_epochs=run.violin_epochs,
+            violin=run.violin,
+            pulse_epochs=run.pulse_epochs,
+            pulses=run.pulses,
+            fitness_func=np.array(run.fitness_func),
+            desired_freq=np.array(run.desired_freq)
+        )
+    os.replace(temp_path, cache_path)
@@ -0,0 +1,199 @@
+"""
+Selection.py
+------------
+
+Vectorized building blocks for the selection algorithms in CircuitPopulation.
+
+Every function works on a fitness vector of the population in ranked order (index 0 is the
+fittest circuit), so the parents, losers and crossover-versus-clone decisions of a whole
+generation are drawn with a handful of NumPy calls instead of one call per circuit.
+"""
+
+import numpy as np
+
+def fitness_proportions(elite_fitness):
+    """
+    Probability of choosing each elite, proportional to its fitness.
+    Elites are chosen uniformly if all of their fitnesses are zero.
+
+    Parameters
+    ----------
+    elite_fitness : np.ndarray
+        The fitness of each elite. Must not sum to a negative number
+
+    Returns
+    -------
+    np.ndarray
+        The probability of choosing each elite
+    """
+    elite_sum = elite_fitness.sum()
+    if elite_sum > 0:
+        return elite_fitness / elite_sum
+    return np.full(elite_fitness.size, 1 / elite_fitness.size)
+
+def rank_proportions(n_elites):
+    """
+    Probability of choosing each of the n_elites best circuits, proportional to its rank
+    (the best circuit has weight n_elites, the worst elite has weight 1).
+
+    Parameters
+    ----------
+    n_elites : int
+        The number of elites
+
+    Returns
+    -------
+    np.ndarray
+        The probability of choosing each elite
+    """
+    # Sum of ranks is the sum of the natural numbers up to n_elites
+    elite_sum = n_elites * (n_elites + 1) / 2
+    return np.arange(n_elites, 0, -1) / elite_sum
+
+def draw_parents(rand, population_size, probabilities=None):
+    """
+    Draws one parent for every circuit in the population.
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    population_size : int
+        The number of circuits to draw a parent for
+    probabilities : np.ndarray | None
+        The probability of drawing each of the best len(probabilities) circuits.
+        None draws uniformly from the whole population
+
+    Returns
+    -------
+    np.ndarray
+        The index of each circuit's parent
+    """
+    if probabilities is None:
+        return rand.integers(0, population_size, population_size)
+    return rand.choice(probabilities.size, size=population_size, p=probabilities)
+
+def replaceable(fitness, parents, n_protected):
+    """
+    Which circuits should be overwritten by (a crossover with) their parent: those that are not
+    one of the protected best circuits, are not their own parent, and are no fitter than their parent.
+
+    Parameters
+    ----------
+    fitness : np.ndarray
+        The fitness of each circuit, in ranked order
+    parents : np.ndarray
+        The index of each circuit's parent
+    n_protected : int
+        The number of best circuits that are never overwritten
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the circuits to overwrite
+    """
+    indices = np.arange(fitness.size)
+    mask = (fitness <= fitness[parents]) & (parents != indices)
+    mask[:n_protected] = False
+    return mask
+
+def tournament_pairs(rand, fitness):
+    """
+    Randomly pairs up the population and compares each pair's fitness.
+    Ties go to the first circuit of the pair. If the population size is odd, one randomly
+    chosen circuit sits out.
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    fitness : np.ndarray
+        The fitness of each circuit
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The indices of the winner and the loser of each pair
+    """
+    order = rand.permutation(fitness.size)
+    pairs = order[:fitness.size // 2 * 2].reshape(-1, 2)
+    first, second = pairs[:, 0], pairs[:, 1]
+    second_wins = fitness[second] > fitness[first]
+    winners = np.where(second_wins, second, first)
+    losers = np.where(second_wins, first, second)
+    return winners, losers
+
+def crossover_decisions(rand, count, crossover_probability):
+    """
+    Decides, for each of count offspring, whether it is produced by crossover (True) or by cloning (False)
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    count : int
+        The number of offspring
+    crossover_probability : float
+        The probability of crossover
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True where crossover should be used
+    """
+    return rand.uniform(0, 1, count) <= crossover_probability
+
+def tournament_winner(rand, fitness, size, exclude=None):
+    """
+    Runs one tournament among size randomly chosen circuits (which may repeat), for steady
+    state selection. The population is in ranked order, so the winner is the lowest index drawn.
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    fitness : np.ndarray
+        The fitness of each circuit, in ranked order
+    size : int
+        The number of circuits in the tournament
+    exclude : int | None
+        A circuit that can not take part. The population must have at least one other circuit
+
+    Returns
+    -------
+    int
+        The index of the winner
+    """
+    # Drawn with replacement, so a tournament costs O(size) rather than O(population size)
+    drawn = rand.integers(0, fitness.size, size)
+    if exclude is not None:
+        hits = drawn == exclude
+        while hits.any():
+            drawn[hits] = rand.integers(0, fitness.size, int(hits.sum()))
+            hits = drawn == exclude
+    return int(drawn.min())
+
+def steady_state_victim(rand, fitness, n_protected, replace_worst):
+    """
+    Chooses the circuit a steady state offspring replaces. The n_protected best circuits are
+    never chosen.
+
+    Parameters
+    ----------
+    rand : np.random.Generator
+        The random generator to draw from
+    fitness : np.ndarray
+        The fitness of each circuit, in ranked order
+    n_protected : int
+        The number of best circuits that are never replaced. Must be less than the population size
+    replace_worst : bool
+        True to replace the worst circuit, False to replace the loser of a tournament of two
+
+    Returns
+    -------
+    int
+        The index of the circuit to replace
+    """
+    if replace_worst:
+        return fitness.size - 1
+    return int(rand.integers(n_protected, fitness.size, 2).max())
@@ -0,0 +1,285 @@
+"""
+SerialReader.py
+---------------
+
+A reader thread that owns the signal microcontroller's serial port.
+
+The thread drains the port continuously, splits what arrives into lines and keeps the most recent
+lines in a ring buffer. Measurements are submitted as requests and answered with a
+``concurrent.futures.Future``, so a caller can do other work while the reply streams in and only
+block when it needs the result. Requests are handled one at a time in the order they were
+submitted: the thread clears the port, writes the request's command byte and frames the reply
+(a single pulse count line, or everything between START and FINISHED) as it arrives.
+
+Every serial call happens on the reader thread, so the port is never read and reset concurrently.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Thread, Event, Lock
+from time import time
+from Metrics import METRICS
+
+# Longest the thread blocks on a read, which bounds the delay before a new request is sent
+READ_POLL_INTERVAL = 0.01
+
+# A frame request whose command gets no reply for this long has its command sent again
+RESEND_INTERVAL = 0.25
+
+# The kinds of request
+SEND = "SEND"
+PULSES = "PULSES"
+FRAME = "FRAME"
+
+SerialResult = namedtuple("SerialResult", ["lines", "timed_out"])
+"""
+The reply to a request. lines holds the pulse count line (without its line ending) for PULSES,
+or the data lines between START and FINISHED for FRAME. timed_out is True if the reply did not
+complete before the read timeout, in which case lines holds whatever had arrived.
+"""
+
+class _Request:
+    __slots__ = ("kind", "command", "resend", "future", "lines", "started", "deadline", "last_sent")
+
+    def __init__(self, kind, command, resend):
+        self.kind = kind
+        self.command = command
+        self.resend = resend
+        self.future = Future()
+        self.lines = []
+        self.started = False
+        self.deadline = None
+        self.last_sent = None
+
+class SerialReader:
+    """
+    Owns a serial port on a background thread and answers measurement requests with futures
+    """
+
+    def __init__(self, serial, read_timeout, history=4096):
+        """
+        Parameters
+        ----------
+        serial : serial.Serial | SimulatedMCU
+            The open port. Its timeout is lowered to READ_POLL_INTERVAL
+        read_timeout : float
+            Seconds a request may take, from sending its command to its last line
+        history : int
+            The number of received lines kept in the ring buffer
+        """
+        self.__serial = serial
+        self.__read_timeout = read_timeout
+        self.__history = deque(maxlen=history)
+        self.__requests = Queue()
+        self.__active = None
+        # Bytes received after the last complete line
+        self.__partial = bytearray()
+        self.__stop = Event()
+        self.__thread = None
+        # Guards __closed, so that no request can be queued after the thread has given up on the queue
+        self.__lock = Lock()
+        self.__closed = True
+        self.__error = None
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__serial.timeout = READ_POLL_INTERVAL
+        self.__stop.clear()
+        self.__closed = False
+        self.__error = None
+        self.__thread = Thread(target=self.__run, name="SerialReader", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops the reader thread. Requests that have not completed are answered as timed out
+        """
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+        self.__fail_all(None)
+
+    def is_running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    # SECTION Requests
+    def send(self, command):
+        """
+        Writes a command that has no reply
+
+        Parameters
+        ----------
+        command : bytes
+            The command byte
+
+        Returns
+        -------
+        Future[SerialResult]
+            Completes once the command has been written
+        """
+        return self.__submit(_Request(SEND, command, False))
+
+    def request_pulses(self, command=b'1'):
+        """
+        Requests a pulse count. The reply is the first line that looks like a bare number
+
+        Parameters
+        ----------
+        command : bytes
+            The command byte
+
+        Returns
+        -------
+        Future[SerialResult]
+            The pulse count line
+        """
+        return self.__submit(_Request(PULSES, command, False))
+
+    def request_frame(self, command, resend=False):
+        """
+        Requests a block of data lines sent between START and FINISHED lines
+
+        Parameters
+        ----------
+        command : bytes
+            The command byte
+        resend : bool
+            Whether to send the command again if the microcontroller does not start replying
+
+        Returns
+        -------
+        Future[SerialResult]
+            The data lines
+        """
+        return self.__submit(_Request(FRAME, command, resend))
+
+    def get_recent_lines(self):
+        """
+        Returns
+        -------
+        list[tuple[float, bytes]]
+            The most recently received lines with the time they arrived, oldest first
+        """
+        return list(self.__history)
+
+    def __submit(self, request):
+        with self.__lock:
+            if self.__closed:
+                raise RuntimeError("SerialReader is not running") from self.__error
+            self.__requests.put(request)
+        return request.future
+
+    # SECTION Reader thread
+    def __run(self):
+        try:
+            while not self.__stop.is_set():
+                if self.__active is None:
+                    self.__begin_next()
+                data = self.__serial.read(max(1, self.__serial.in_waiting))
+                now = time()
+                if len(data) > 0:
+                    self.__feed(data, now)
+                self.__check_active(now)
+        except Exception as e:
+            self.__error = e
+            self.__fail_all(e)
+
+    def __begin_next(self):
+        """
+        Clears the port and sends the next queued request's command
+        """
+        try:
+            request = self.__requests.get_nowait()
+        except Empty:
+            return
+        if not request.future.set_running_or_notify_cancel():
+            return
+        self.__serial.reset_input_buffer()
+        self.__serial.reset_output_buffer()
+        self.__partial.clear()
+        self.__serial.write(request.command)
+        METRICS.inc("serial_bytes_sent_total", len(request.command))
+        now = time()
+        if request.kind == SEND:
+            request.future.set_result(SerialResult([], False))
+            return
+        request.deadline = now + self.__read_timeout
+        request.last_sent = now
+        self.__active = request
+
+    def __feed(self, data, now):
+        """
+        Splits received bytes into lines and passes complete lines to the active request
+        """
+        METRICS.inc("serial_bytes_received_total", len(data))
+        self.__partial.extend(data)
+        start = 0
+        end = self.__partial.find(b"\n")
+        while end >= 0:
+            line = bytes(self.__partial[start:end + 1])
+            self.__history.append((now, line))
+            if self.__active is not None:
+                self.__frame(line)
+            start = end + 1
+            end = self.__partial.find(b"\n", start)
+        del self.__partial[:start]
+
+    def __frame(self, line):
+        request = self.__active
+        request.last_sent = None
+        if request.kind == PULSES:
+            # TODO We should be able to do whatever this line does better
+            # It's supposed to handle exceptions from transmission loss (i.e. dropped or additional spaces, shifted colons, etc)
+            line = line.translate(None, b"\r\n")
+            if line != b"" and b":" not in line and b"START" not in line and b"FINISH" not in line and b" " not in line:
+                self.__finish([line], False)
+        elif not request.started:
+            request.started = b"START\n" in line
+        elif b"FINISHED\n" in line:
+            self.__finish(request.lines, False)
+        elif line != b"\n" and line != b"START\n":
+            request.lines.append(line)
+
+    def __check_active(self, now):
+        request = self.__active
+        if request is None:
+            return
+        if now >= request.deadline:
+            self.__finish(request.lines, True)
+        elif request.resend and not request.started and request.last_sent is not None \
+                and now - request.last_sent >= RESEND_INTERVAL:
+            self.__serial.write(request.command)
+            METRICS.inc("serial_bytes_sent_total", len(request.command))
+            METRICS.inc("serial_resends_total")
+            request.last_sent = now
+
+    def __finish(self, lines, timed_out):
+        request = self.__active
+        self.__active = None
+        if timed_out:
+            METRICS.inc("serial_timeouts_total")
+        request.future.set_result(SerialResult(lines, timed_out))
+
+    def __fail_all(self, exception):
+        """
+        Answers the active and every queued request, with exception if given or as timed out otherwise
+        """
+        with self.__lock:
+            self.__closed = True
+        pending = [] if self.__active is None else [self.__active]
+        self.__active = None
+        while True:
+            try:
+                pending.append(self.__requests.get_nowait())
+            except Empty:
+                break
+        for request in pending:
+            if request.future.done() or (not request.future.running() and not request.future.set_running_or_notify_cancel()):
+                continue
+            if exception is None:
+                request.future.set_result(SerialResult(request.lines, True))
+            else:
+                request.future.set_exception(exception)
@@ -0,0 +1,306 @@
+"""
+SerialTransport.py
+------------------
+
+Provides the serial connections used by the Microcontroller class.
+
+A transport is either a real ``serial.Serial`` port or a :class:`SimulatedMCU`, an in-process
+stand-in for the Arduino sketches in ``data/``. The simulated MCU speaks the same single-byte
+command protocol, paces its output like a real serial link of the configured baud rate and can
+inject dropped responses and malformed lines. Together with ``src/tools/stub_iceprog.py`` it lets
+the FULLY_INTRINSIC pipeline be run and profiled without an FPGA bench.
+"""
+
+from collections import deque
+from threading import RLock
+from time import time, sleep
+import math
+from numpy.random import default_rng
+
+# The sketch the simulated MCU imitates
+READ_SIGNAL = "READ_SIGNAL"
+READ_ENVIRONMENT = "READ_ENVIRONMENT"
+
+# Bits on the wire per byte (8N1 framing)
+BITS_PER_BYTE = 10
+
+# Firmware delays of data/ReadSignal/ReadSignal.ino and data/ReadEnvironment/ReadEnvironment.ino, in seconds
+PULSE_COUNT_WINDOW = 1.0
+ADC_SAMPLE_DELAY = 10e-6
+ADC_TD_SAMPLE_DELAY = 1.95e-3
+ADC_TD_FINISH_DELAY = 1.0
+DHT_READ_TIME = 0.25
+COMMAND_DELAY = 0.01
+
+ADC_SAMPLES = 500
+ADC_TD_SAMPLES = 1000
+
+def open_serial_transport(config, port, sketch=READ_SIGNAL):
+    """
+    Opens the serial connection to a microcontroller, either a real port or a simulated one
+    depending on the config's SERIAL_TRANSPORT.
+
+    Parameters
+    ----------
+    config : Config
+        The configuration of the run
+    port : str
+        The device file of the serial port (ignored by the simulated transport)
+    sketch : str
+        READ_SIGNAL or READ_ENVIRONMENT, the Arduino sketch the simulated MCU imitates
+
+    Returns
+    -------
+    serial.Serial | SimulatedMCU
+        The opened transport
+    """
+    if config.get_serial_transport() == "SIMULATED":
+        return SimulatedMCU(
+            sketch=sketch,
+            baud=config.get_simulated_baud(),
+            timeout=config.get_mcu_read_timeout(),
+            time_scale=config.get_simulated_time_scale(),
+            dropout_rate=config.get_simulated_dropout_rate(),
+            malformed_rate=config.get_simulated_malformed_rate()
+        )
+
+    # Imported here so pyserial is only needed when talking to real hardware
+    from serial import Serial
+    return Serial(port, config.get_serial_baud(), timeout=config.get_mcu_read_timeout())
+
+class SimulatedMCU:
+    """
+    An in-process fake of the Arduino connected over serial.
+    Implements the subset of the ``serial.Serial`` interface used by this project.
+
+    Commands understood (see data/ReadSignal/ReadSignal.ino and data/ReadEnvironment/ReadEnvironment.ino):
+
+    **'1'** (READ_SIGNAL)
+        Replies with the number of pulses counted over one second
+    **'2'** (READ_SIGNAL)
+        Replies with START lines, 500 "i: adc" lines, an "ELAPSED: us" line with the duration
+        of the capture and FINISHED lines
+    **'4'** (READ_SIGNAL)
+        Switches FPGAs. No reply
+    **'5'** (READ_SIGNAL)
+        Replies with START lines, 1000 "i: adc state" lines and FINISHED lines
+    **'5'** / **'6'** (READ_ENVIRONMENT)
+        Replies with the temperature / humidity
+    """
+
+    def __init__(self, sketch=READ_SIGNAL, baud=115200, timeout=1.0, time_scale=1.0,
+            dropout_rate=0.0, malformed_rate=0.0, pulse_frequency=1000, seed=None):
+        """
+        Parameters
+        ----------
+        sketch : str
+            READ_SIGNAL or READ_ENVIRONMENT
+        baud : int
+            Baud rate the output is paced at. 0 delivers output instantly
+        timeout : float
+            Read timeout in seconds, as for serial.Serial
+        time_scale : float
+            Multiplier applied to the firmware's measurement delays (e.g. the one second pulse
+            counting window). 0 makes measurements instantaneous
+        dropout_rate : float
+            Probability that a command gets no reply at all
+        malformed_rate : float
+            Probability that any line of a reply is corrupted
+        pulse_frequency : int
+            Mean number of pulses reported by the '1' command
+        seed : int | None
+            Seed of the random generator
+        """
+        self.timeout = timeout
+        self.dtr = True
+        self.is_open = True
+        self.__sketch = sketch
+        self.__byte_time = BITS_PER_BYTE / baud if baud > 0 else 0
+        self.__time_scale = time_scale
+        self.__dropout_rate = dropout_rate
+        self.__malformed_rate = malformed_rate
+        self.__pulse_frequency = pulse_frequency
+        self.__rand = default_rng(seed)
+        self.__lock = RLock()
+        # Bytes that have "arrived" and can be read
+        self.__received = bytearray()
+        # Output that is still on its way, as (arrival time, bytes) in arrival order
+        self.__in_flight = deque()
+        # The time the MCU is done with everything it has been asked to do so far
+        self.__busy_until = 0
+
+    # SECTION serial.Serial interface
+    @property
+    def in_waiting(self):
+        with self.__lock:
+            self.__deliver(time())
+            return len(self.__received)
+
+    def write(self, data):
+        with self.__lock:
+            for command in bytes(data):
+                self.__handle_command(bytes([command]))
+        return len(data)
+
+    def read(self, size=1):
+        deadline = self.__deadline()
+        while True:
+            with self.__lock:
+                self.__deliver(time())
+                if len(self.__received) >= size or not self.__wait_for_arrival(deadline):
+                    return self.__take(min(size, len(self.__received)))
+
+    def read_until(self, expected=b"\n", size=None):
+        deadline = self.__deadline()
+        while True:
+            with self.__lock:
+                self.__deliver(time())
+                end = self.__received.find(expected)
+                if end >= 0:
+                    end = end + len(expected)
+                    if size is not None:
+                        end = min(end, size)
+                    return self.__take(end)
+                if size is not None and len(self.__received) >= size:
+                    return self.__take(size)
+                if not self.__wait_for_arrival(deadline):
+                    return self.__take(len(self.__received))
+
+    def readline(self):
+        return self.read_until()
+
+    def reset_input_buffer(self):
+        with self.__lock:
+            self.__deliver(time())
+            self.__received.clear()
+
+    def reset_output_buffer(self):
+        # Commands are handled as soon as they are written, so there is nothing to discard
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    # SECTION Reply generation
+    def __handle_command(self, command):
+        now = time()
+        start = max(now, self.__busy_until) + COMMAND_DELAY * self.__time_scale
+        if self.__sketch == READ_ENVIRONMENT:
+            if command == b'5':
+                lines = [self.__format_float(self.__rand.normal(22, 0.5))]
+            elif command == b'6':
+                lines = [self.__format_float(self.__rand.normal(40, 2))]
+            else:
+                return
+            self.__send(lines, start + DHT_READ_TIME * self.__time_scale, 0)
+        elif command == b'1':
+            pulses = max(0, int(self.__rand.normal(self.__pulse_frequency, 0.05 * self.__pulse_frequency)))
+            self.__send([b"%d\r\n" % pulses], start + PULSE_COUNT_WINDOW * self.__time_scale, 0)
+        elif command == b'2':
+            samples = [b"%d: %d\n" % (i + 1, value) for i, value in enumerate(self.__waveform(ADC_SAMPLES))]
+            # Like the firmware, report how long the capture took, which is set by the pacing of the sample lines
+            elapsed = sum(ADC_SAMPLE_DELAY * self.__time_scale + len(line) * self.__byte_time for line in samples)
+            lines = [b"START\n"] * 3 + samples + [b"ELAPSED: %d\n" % round(elapsed * 1e6)] + [b"FINISHED\n"] * 3
+            self.__send(lines, start, ADC_SAMPLE_DELAY * self.__time_scale)
+        elif command == b'5':
+            lines = [b"START\n"] * 3
+            states = self.__rand.integers(0, 2, ADC_TD_SAMPLES)
+            for i, value in enumerate(self.__waveform(ADC_TD_SAMPLES)):
+                lines.append(b"%d: %d %d\n" % (i + 1, value, states[i]))
+            lines = lines + [b"FINISHED\n"] * 3
+            self.__send(lines, start, ADC_TD_SAMPLE_DELAY * self.__time_scale)
+            self.__busy_until = self.__busy_until + ADC_TD_FINISH_DELAY * self.__time_scale
+        # '4' (switch FPGAs) and unknown commands produce no output
+
+    def __send(self, lines, start, delay_per_line):
+        """
+        Queues lines of output. Line i arrives once the MCU has spent delay_per_line on each
+        line before it and the link has transmitted every byte up to and including it.
+        """
+        if self.__rand.uniform(0, 1) < self.__dropout_rate:
+            self.__busy_until = start
+            return
+        arrival = max(start, self.__in_flight[-1][0] if len(self.__in_flight) > 0 else 0)
+        for line in lines:
+            if self.__rand.uniform(0, 1) < self.__malformed_rate:
+                line = self.__malform(line)
+            arrival = arrival + delay_per_line + len(line) * self.__byte_time
+            self.__in_flight.append((arrival, line))
+        self.__busy_until = arrival
+
+    def __waveform(self, samples):
+        """Generates ADC readings (0-1023) of a noisy oscillation with a random period, phase and amplitude"""
+        period = self.__rand.uniform(4, 100)
+        phase = self.__rand.uniform(0, 2 * math.pi)
+        amplitude = self.__rand.uniform(0, 400)
+        offset = self.__rand.uniform(300, 700)
+        noise = self.__rand.normal(0, 5, samples)
+        values = []
+        for i in range(samples):
+            value = offset + amplitude * math.sin(2 * math.pi * i / period + phase) + noise[i]
+            values.append(min(1023, max(0, int(value))))
+        return values
+
+    def __malform(self, line):
+        """Corrupts a line in one of the ways seen on a noisy serial link"""
+        kind = self.__rand.integers(0, 4)
+        if kind == 0:
+            # Dropped characters
+            cut = self.__rand.integers(0, max(1, len(line) - 1))
+            return line[:cut] + line[cut + 1:]
+        elif kind == 1:
+            # Extra space
+            cut = self.__rand.integers(0, len(line))
+            return line[:cut] + b" " + line[cut:]
+        elif kind == 2:
+            # Shifted colon
+            return line.replace(b": ", b" :", 1) if b": " in line else b":" + line
+        else:
+            # Line noise
+            return bytes(self.__rand.integers(128, 256, 4).tolist()) + line
+
+    @staticmethod
+    def __format_float(value):
+        return b"%.2f\r\n" % value
+
+    # SECTION Buffer helpers
+    def __deadline(self):
+        return None if self.timeout is None else time() + self.timeout
+
+    def __deliver(self, now):
+        while len(self.__in_flight) > 0 and self.__in_flight[0][0] <= now:
+            self.__received.extend(self.__in_flight.popleft()[1])
+
+    def __take(self, count):
+        data = bytes(self.__received[:count])
+        del self.__received[:count]
+        return data
+
+    def __wait_for_arrival(self, deadline):
+        """
+        Sleeps until the next piece of output arrives. Must be called holding the lock,
+        which is released while sleeping so other threads can write commands.
+
+        Returns
+        -------
+        bool
+            False if nothing more can arrive before the deadline
+        """
+        now = time()
+        if deadline is not None and now >= deadline:
+            return False
+        if len(self.__in_flight) > 0:
+            wake = self.__in_flight[0][0]
+        elif deadline is not None:
+            # Nothing is on its way, but a command written by another thread could still produce output
+            wake = min(deadline, now + 0.01)
+        else:
+            wake = now + 0.01
+        if deadline is not None:
+            wake = min(wake, deadline)
+        self.__lock.release()
+        try:
+            sleep(max(0, wake - now))
+        finally:
+            self.__lock.acquire()
+        return True
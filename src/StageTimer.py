@@ -0,0 +1,193 @@
+"""
+StageTimer.py
+-------------
+
+Lightweight wall-clock timers for the stages of a generation (compilation, iceprog upload,
+serial capture, selection, ...). Each generation's per-stage totals are appended to a timing
+log, and every timed stage can optionally be streamed to a Chrome trace-event JSON file
+(open it in chrome://tracing or https://ui.perfetto.dev).
+
+A single module-level timer, ``TIMER``, is shared by the population, the circuits and the
+fitness functions so that none of them need an extra constructor argument. It does nothing
+until :meth:`StageTimer.configure` is called (the Logger does this at startup).
+"""
+
+from time import perf_counter
+from threading import Lock, get_ident
+from os import getpid
+import json
+
+class _Stage:
+    """Context manager returned by :meth:`StageTimer.stage`."""
+    __slots__ = ("_timer", "_name", "_start")
+
+    def __init__(self, timer, name):
+        self._timer = timer
+        self._name = name
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._timer._record(self._name, self._start, perf_counter())
+        return False
+
+class _NullStage:
+    """Context manager used while timing is disabled. Does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class StageTimer:
+    """
+    Accumulates the time spent in named stages during a generation.
+
+    Stages may be nested; a stage's time always includes the time of the stages inside it
+    (e.g. ``measure`` includes ``serial_capture`` and ``parse``).
+    """
+
+    def __init__(self):
+        self.__enabled = False
+        self.__log_path = None
+        self.__trace_path = None
+        self.__lock = Lock()
+        self.__totals = {}
+        self.__counts = {}
+        self.__pending_trace = []
+        self.__listeners = ()
+        self.__origin = perf_counter()
+        self.__generation_start = self.__origin
+
+    def configure(self, log_path, trace_path=None):
+        """
+        Enables the timer.
+
+        Parameters
+        ----------
+        log_path : str | Path | None
+            File the per-generation stage breakdowns are appended to. None disables the log.
+        trace_path : str | Path | None
+            File the Chrome trace events are streamed to. None disables the trace.
+        """
+        self.__enabled = True
+        self.__log_path = log_path
+        self.__trace_path = trace_path
+        self.__origin = perf_counter()
+        self.__generation_start = self.__origin
+        if log_path is not None:
+            open(log_path, "w").close()
+        if trace_path is not None:
+            # The JSON array format does not require the closing bracket, which lets us
+            # append events every generation and still have a readable file after a crash
+            with open(trace_path, "w") as trace_file:
+                trace_file.write("[\n")
+
+    def is_enabled(self):
+        return self.__enabled
+
+    def add_listener(self, listener):
+        """
+        Calls listener(name, seconds) every time a stage finishes (e.g. to export the durations as
+        metrics). Stages are only timed once the timer is configured
+
+        Parameters
+        ----------
+        listener : Callable[[str, float], None]
+            Called on the thread that ran the stage
+        """
+        with self.__lock:
+            self.__listeners = self.__listeners + (listener,)
+
+    def remove_listener(self, listener):
+        with self.__lock:
+            self.__listeners = tuple(other for other in self.__listeners if other != listener)
+
+    def stage(self, name):
+        """
+        Returns a context manager that times the enclosed block as the stage ``name``.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage
+        """
+        if not self.__enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _record(self, name, start, end):
+        elapsed = end - start
+        with self.__lock:
+            self.__totals[name] = self.__totals.get(name, 0.0) + elapsed
+            self.__counts[name] = self.__counts.get(name, 0) + 1
+            if self.__trace_path is not None:
+                self.__pending_trace.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.__origin) * 1e6,
+                    "dur": elapsed * 1e6,
+                    "pid": getpid(),
+                    "tid": get_ident()
+                })
+        for listener in self.__listeners:
+            listener(name, elapsed)
+
+    def begin_generation(self):
+        """
+        Discards any stage times recorded since the last generation ended
+        (e.g. those recorded while randomizing the initial population).
+        """
+        with self.__lock:
+            self.__totals = {}
+            self.__counts = {}
+        self.__generation_start = perf_counter()
+
+    def end_generation(self, epoch):
+        """
+        Writes the stage breakdown of the generation that just finished and resets the totals.
+
+        Parameters
+        ----------
+        epoch : int
+            The generation that just finished
+
+        Returns
+        -------
+        dict[str, float]
+            Seconds spent in each stage during the generation, plus the wall-clock "total"
+        """
+        now = perf_counter()
+        with self.__lock:
+            breakdown = self.__totals
+            counts = self.__counts
+            pending_trace = self.__pending_trace
+            self.__totals = {}
+            self.__counts = {}
+            self.__pending_trace = []
+        total = now - self.__generation_start
+        self.__generation_start = now
+
+        if self.__log_path is not None:
+            # Format: Epoch:stage=seconds/count,...,total=seconds
+            entries = ["{}={:.6f}/{}".format(name, breakdown[name], counts[name]) for name in breakdown]
+            entries.append("total={:.6f}".format(total))
+            with open(self.__log_path, "a") as timing_file:
+                timing_file.write("{}:{}\n".format(epoch, ",".join(entries)))
+
+        if self.__trace_path is not None and len(pending_trace) > 0:
+            with open(self.__trace_path, "a") as trace_file:
+                for event in pending_trace:
+                    trace_file.write(json.dumps(event) + ",\n")
+
+        breakdown = dict(breakdown)
+        breakdown["total"] = total
+        return breakdown
+
+TIMER = StageTimer()
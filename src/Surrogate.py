@@ -0,0 +1,99 @@
+"""
+Surrogate.py
+------------
+
+An online model of fitness as a function of the genome, used to decide which offspring are worth
+measuring on hardware.
+
+The model is ridge regression on the modifiable bits (as -1/+1 features), trained on every
+(genome, measured fitness) pair of the run, up to the last SAMPLE_CAPACITY pairs. Genomes have far
+more bits than the buffer has samples, so the model is solved in its dual (kernel) form: fitting
+is one solve of a samples x samples system and predicting is a matrix-vector product, both
+independent of the genome length beyond the cost of the dot products.
+"""
+
+import numpy as np
+
+# The number of most recent samples the model is fit to
+SAMPLE_CAPACITY = 1000
+
+# Ridge regularization strength, relative to the number of bits
+L2_PER_BIT = 0.05
+
+class RidgeSurrogate:
+    """
+    Kernel ridge regression over genome bits with a bounded buffer of samples
+    """
+
+    def __init__(self, capacity=SAMPLE_CAPACITY):
+        """
+        Parameters
+        ----------
+        capacity : int
+            The number of samples kept. The oldest is replaced once the buffer is full
+        """
+        self.__capacity = capacity
+        self.__features = None
+        self.__fitness = np.zeros(capacity)
+        # Number of samples ever added; the next one is written at __count % capacity
+        self.__count = 0
+        self.__weights = None
+        self.__mean = 0.0
+
+    def add(self, bits, fitness):
+        """
+        Adds measured samples. The model is not refit until :meth:`fit` is called
+
+        Parameters
+        ----------
+        bits : np.ndarray
+            (samples x bits) array of 0/1 genome bits
+        fitness : np.ndarray
+            The measured fitness of each sample
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        if self.__features is None or self.__features.shape[1] != bits.shape[1]:
+            # A different genome length starts the model again
+            self.__features = np.zeros((self.__capacity, bits.shape[1]), dtype=np.float32)
+            self.__count = 0
+        for row, value in zip(bits, fitness):
+            pos = self.__count % self.__capacity
+            self.__features[pos] = row * 2.0 - 1.0
+            self.__fitness[pos] = value
+            self.__count += 1
+
+    def fit(self):
+        """
+        Fits the model to the stored samples
+        """
+        n = len(self)
+        if n == 0:
+            self.__weights = None
+            return
+        features = self.__features[:n]
+        fitness = self.__fitness[:n]
+        self.__mean = float(fitness.mean())
+        kernel = features @ features.T
+        kernel[np.diag_indices(n)] += L2_PER_BIT * features.shape[1]
+        alpha = np.linalg.solve(kernel.astype(float), fitness - self.__mean)
+        self.__weights = features.T.astype(float) @ alpha
+
+    def predict(self, bits):
+        """
+        Parameters
+        ----------
+        bits : np.ndarray
+            (candidates x bits) array of 0/1 genome bits
+
+        Returns
+        -------
+        np.ndarray
+            The predicted fitness of each candidate. The mean measured fitness if the model has not been fit
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        if self.__weights is None:
+            return np.full(bits.shape[0], self.__mean)
+        return (bits * 2.0 - 1.0) @ self.__weights + self.__mean
+
+    def __len__(self):
+        return min(self.__count, self.__capacity)
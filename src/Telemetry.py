@@ -0,0 +1,315 @@
+"""
+Telemetry.py
+------------
+
+A push-based bus for the live data the plots show. The live data files in the workspace are
+written as before, and every change to them is also published as a delta to the subscribers of a
+local Unix-domain socket (``unix:PATH``) or a TCP socket (``HOST:PORT``, to plot a headless run
+from another machine). A subscriber is first sent a snapshot of every stream, then each delta as
+it happens, so the plots (see PlotEvolutionLive.py ``--telemetry``) keep an in-memory copy of the
+files instead of re-reading them on a timer.
+
+Streams are named after the file they mirror (e.g. ``bestlivedata.log``), and each message is one
+line of JSON:
+
+- ``{"op": "snapshot", "streams": {name: text}}``
+- ``{"op": "append", "stream": name, "text": text}``
+- ``{"op": "replace", "stream": name, "text": text}``
+- ``{"op": "set_line", "stream": name, "line": index, "text": text}``
+
+Publishing is non-blocking: a subscriber that falls SUBSCRIBER_QUEUE_SIZE messages behind is
+disconnected rather than slowing the evolution down.
+"""
+
+import os
+import json
+import socket
+import tempfile
+from queue import Queue, Full
+from threading import Thread, Lock, Event
+
+# Messages queued for a subscriber before it is disconnected for falling behind
+SUBSCRIBER_QUEUE_SIZE = 4096
+
+def parse_address(address):
+    """
+    Parameters
+    ----------
+    address : str
+        ``unix:PATH`` or ``HOST:PORT``
+
+    Returns
+    -------
+    tuple[int, str | tuple[str, int]]
+        The socket family and the address in the form socket expects
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if host == "" or not port.isdigit():
+        raise ValueError("Invalid telemetry address '" + address + "'. Must be unix:PATH or HOST:PORT")
+    return socket.AF_INET, (host, int(port))
+
+class LiveData:
+    """
+    The text of every stream, kept up to date by applying telemetry messages
+    """
+
+    def __init__(self):
+        # The lines (with their line endings) of each stream
+        self.__streams = {}
+
+    def apply(self, message):
+        """
+        Parameters
+        ----------
+        message : dict
+            A snapshot or delta message (see the module docstring)
+        """
+        op = message["op"]
+        if op == "snapshot":
+            self.__streams = {name: text.splitlines(True) for name, text in message["streams"].items()}
+            return
+        lines = self.__streams.setdefault(message["stream"], [])
+        if op == "replace":
+            lines[:] = message["text"].splitlines(True)
+        elif op == "append":
+            lines.extend(message["text"].splitlines(True))
+        elif op == "set_line":
+            index = message["line"]
+            while len(lines) <= index:
+                lines.append("\n")
+            lines[index] = message["text"]
+
+    def read(self, stream):
+        """
+        Returns
+        -------
+        str
+            The text of a stream, empty if nothing was published to it
+        """
+        return "".join(self.__streams.get(stream, []))
+
+    def snapshot(self):
+        """
+        Returns
+        -------
+        dict
+            A snapshot message of every stream
+        """
+        return {"op": "snapshot", "streams": {name: "".join(lines) for name, lines in self.__streams.items()}}
+
+class TelemetryBus:
+    """
+    Publishes the live data streams to the subscribers of a socket. Disabled (every call is a
+    no-op) until :meth:`start` is called
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__live = None
+        self.__server = None
+        self.__unix_path = None
+        self.__subscribers = []
+
+    def start(self, address):
+        """
+        Starts listening for subscribers
+
+        Parameters
+        ----------
+        address : str
+            ``unix:PATH`` or ``HOST:PORT``
+        """
+        family, sockaddr = parse_address(address)
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            # A socket file left behind by an earlier run
+            if os.path.exists(sockaddr):
+                os.remove(sockaddr)
+            self.__unix_path = sockaddr
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(sockaddr)
+        server.listen()
+        self.__live = LiveData()
+        self.__server = server
+        Thread(target=self.__accept, args=(server,), name="telemetry", daemon=True).start()
+
+    def stop(self):
+        """
+        Disconnects every subscriber and stops listening
+        """
+        if self.__server is None:
+            return
+        with self.__lock:
+            server, self.__server = self.__server, None
+            self.__live = None
+            for queue in self.__subscribers:
+                self.__close_queue(queue)
+            self.__subscribers = []
+        try:
+            # Wakes the accepting thread
+            server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        server.close()
+        if self.__unix_path is not None and os.path.exists(self.__unix_path):
+            os.remove(self.__unix_path)
+        self.__unix_path = None
+
+    def is_enabled(self):
+        return self.__live is not None
+
+    def append(self, stream, text):
+        """
+        Publishes text appended to a stream
+        """
+        if self.__live is not None:
+            self.__publish({"op": "append", "stream": stream, "text": text})
+
+    def replace(self, stream, text):
+        """
+        Publishes the new text of a rewritten stream
+        """
+        if self.__live is not None:
+            self.__publish({"op": "replace", "stream": stream, "text": text})
+
+    def set_line(self, stream, index, text):
+        """
+        Publishes a change to one line (counting from 0) of a stream
+        """
+        if self.__live is not None:
+            self.__publish({"op": "set_line", "stream": stream, "line": index, "text": text})
+
+    def __publish(self, message):
+        line = (json.dumps(message) + "\n").encode()
+        with self.__lock:
+            if self.__live is None:
+                return
+            self.__live.apply(message)
+            for queue in list(self.__subscribers):
+                try:
+                    queue.put_nowait(line)
+                except Full:
+                    # Too far behind to catch up. The sender disconnects once the queue drains
+                    self.__subscribers.remove(queue)
+                    self.__close_queue(queue)
+
+    def __accept(self, server):
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                # The server was closed
+                return
+            queue = Queue(SUBSCRIBER_QUEUE_SIZE)
+            with self.__lock:
+                if self.__live is None:
+                    connection.close()
+                    return
+                queue.put_nowait((json.dumps(self.__live.snapshot()) + "\n").encode())
+                self.__subscribers.append(queue)
+            Thread(target=self.__send, args=(connection, queue), name="telemetry-subscriber", daemon=True).start()
+
+    def __send(self, connection, queue):
+        try:
+            while True:
+                line = queue.get()
+                if line is None:
+                    return
+                connection.sendall(line)
+        except OSError:
+            with self.__lock:
+                if queue in self.__subscribers:
+                    self.__subscribers.remove(queue)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def __close_queue(queue):
+        # Blocking would stall the publisher, so a full queue is emptied first
+        while True:
+            try:
+                queue.put_nowait(None)
+                return
+            except Full:
+                queue.get_nowait()
+
+class TelemetryClient:
+    """
+    Subscribes to a TelemetryBus and keeps a LiveData copy of its streams up to date on a
+    background thread
+    """
+
+    def __init__(self, address):
+        """
+        Parameters
+        ----------
+        address : str
+            The address the bus was started with (a HOST of 0.0.0.0 can be replaced with the
+            publishing machine's name)
+        """
+        family, sockaddr = parse_address(address)
+        self.__socket = socket.socket(family, socket.SOCK_STREAM)
+        self.__socket.connect(sockaddr)
+        self.__lock = Lock()
+        self.__live = LiveData()
+        self.__snapshot = Event()
+        self.__connected = True
+        Thread(target=self.__receive, name="telemetry-client", daemon=True).start()
+
+    def wait_for_snapshot(self, timeout=None):
+        """
+        Returns
+        -------
+        bool
+            Whether the snapshot has been received
+        """
+        return self.__snapshot.wait(timeout)
+
+    def read(self, stream):
+        """
+        Returns
+        -------
+        str
+            The current text of a stream
+        """
+        with self.__lock:
+            return self.__live.read(stream)
+
+    def save_stream(self, stream, suffix=""):
+        """
+        Writes the current text of a stream to a temporary file, for code that reads files (such
+        as Config with the builtconfig.ini stream)
+
+        Returns
+        -------
+        str
+            The path of the file
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as stream_file:
+            stream_file.write(self.read(stream))
+            return stream_file.name
+
+    def is_connected(self):
+        return self.__connected
+
+    def close(self):
+        self.__socket.close()
+
+    def __receive(self):
+        try:
+            with self.__socket.makefile("r") as messages:
+                for line in messages:
+                    message = json.loads(line)
+                    with self.__lock:
+                        self.__live.apply(message)
+                    if message["op"] == "snapshot":
+                        self.__snapshot.set()
+        except (OSError, ValueError):
+            pass
+        self.__connected = False
+
+# The bus every module publishes to
+TELEMETRY = TelemetryBus()
@@ -0,0 +1,142 @@
+"""
+WorkspaceArchiver.py
+--------------------
+
+Copies the workspace at the end of a run in a single pass. Directories that are not wanted are
+pruned while walking instead of being copied and deleted afterwards, and the files can be
+streamed straight into a compressed tar instead of a directory tree.
+"""
+
+import os
+import lzma
+import tarfile
+from pathlib import Path
+from shutil import copy2
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVE_FORMATS = ["DIRECTORY", "TAR_GZ", "TAR_XZ"]
+
+# The suffix added to the destination of each format
+ARCHIVE_EXTENSIONS = {"DIRECTORY": "", "TAR_GZ": ".tar.gz", "TAR_XZ": ".tar.xz"}
+
+# Compression levels favouring speed: the workspace is mostly text that compresses well anyway
+GZIP_LEVEL = 6
+XZ_PRESET = 1
+
+def walk_workspace(root, exclude=(), drop_empty_logs=False):
+    """
+    Walks a directory, skipping excluded subdirectories without entering them
+
+    Parameters
+    ----------
+    root : Path
+        The directory to walk
+    exclude : Iterable[str]
+        Paths of subdirectories to skip, relative to root
+    drop_empty_logs : bool
+        Whether to also skip .log files that are empty
+
+    Returns
+    -------
+    Iterator[tuple[str, str, bool]]
+        The path, the path relative to root and whether it is a directory of everything kept.
+        Directories come before their contents
+    """
+    excluded = set(os.path.normpath(path) for path in exclude)
+    stack = [(str(root), "")]
+    while len(stack) > 0:
+        directory, relative = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                name = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in excluded:
+                        yield entry.path, name, True
+                        stack.append((entry.path, name))
+                elif drop_empty_logs and entry.name.endswith(".log") and entry.stat().st_size == 0:
+                    continue
+                else:
+                    yield entry.path, name, False
+
+def archive_workspace(root, destination, archive_format, exclude=(), drop_empty_logs=False):
+    """
+    Copies a directory to a directory tree or a compressed tar in one pass
+
+    Parameters
+    ----------
+    root : Path
+        The directory to archive
+    destination : Path
+        Where to write it. The format's extension (see ARCHIVE_EXTENSIONS) is appended. A
+        DIRECTORY destination that already exists is merged into
+    archive_format : str
+        One of ARCHIVE_FORMATS
+    exclude : Iterable[str]
+        Paths of subdirectories to leave out, relative to root
+    drop_empty_logs : bool
+        Whether to leave out empty .log files
+
+    Returns
+    -------
+    Path
+        The path written
+    """
+    destination = Path(str(destination) + ARCHIVE_EXTENSIONS[archive_format])
+    files = walk_workspace(root, exclude, drop_empty_logs)
+    if archive_format == "DIRECTORY":
+        destination.mkdir(parents=True, exist_ok=True)
+        for path, name, is_dir in files:
+            if is_dir:
+                destination.joinpath(name).mkdir(exist_ok=True)
+            else:
+                copy2(path, destination.joinpath(name))
+        return destination
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if archive_format == "TAR_GZ":
+        stream = tarfile.open(destination, "w:gz", compresslevel=GZIP_LEVEL)
+        compressed = None
+    else:
+        compressed = lzma.open(destination, "wb", preset=XZ_PRESET)
+        stream = tarfile.open(fileobj=compressed, mode="w|")
+    try:
+        top = destination.name[:-len(ARCHIVE_EXTENSIONS[archive_format])]
+        for path, name, is_dir in files:
+            stream.add(path, arcname=os.path.join(top, name), recursive=False)
+    finally:
+        stream.close()
+        if compressed is not None:
+            compressed.close()
+    return destination
+
+class WorkspaceArchiver:
+    """
+    Runs archive_workspace calls on a background thread, so several copies of the workspace can
+    be made while the caller does other work
+    """
+
+    def __init__(self):
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self.__pending = []
+
+    def submit(self, *args, **kwargs):
+        """
+        Starts archive_workspace(*args, **kwargs) in the background
+        """
+        self.__pending.append(self.__executor.submit(archive_workspace, *args, **kwargs))
+
+    def wait(self):
+        """
+        Waits for every archive submitted and stops the background thread, raising the first
+        error any of the archives had
+
+        Returns
+        -------
+        list[Path]
+            The paths written, in submission order
+        """
+        pending, self.__pending = self.__pending, []
+        try:
+            return [future.result() for future in pending]
+        finally:
+            self.__executor.shutdown()
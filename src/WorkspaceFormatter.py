@@ -1,8 +1,9 @@
-from shutil import copytree, rmtree
 from datetime import date
+from pathlib import Path
 import os
 
 from Config import Config
+from WorkspaceArchiver import archive_workspace
 
 class WorkspaceFormatter:
     def __init__(self, config: Config, experiment_explanation):
@@ -17,40 +18,18 @@ class WorkspaceFormatter:
         if(self.__config.is_pulse_count()):
             folder_name+= str(int(self.__config.get_desired_frequency()/1000)) + "k"
 
-        # copy the contents of workspace to the new folder
-        try:
-            copytree("workspace", folder_name, dirs_exist_ok=True)
-        except OSError as error:
-            print(error) 
-
-        #go through and remove files of 0 bytes
-        for filename in os.listdir(folder_name):
-            path = folder_name + "/" + filename
-            if path.endswith(".log") and os.stat(path).st_size == 0:
-                os.remove(path)
-
-        #remove directories we don't want included
-        try:
-            rmtree(folder_name + "/experiment_bin")
-        except OSError as error:
-            pass
+        #leave out directories we don't want included
+        exclude = ["experiment_bin", "experiment_data"]
+        if(not self.__config.get_using_configurable_io()):
+            exclude.append("template")
+        if(self.__config.get_init_mode() != "EXISTING_POPULATION"):
+            exclude.append("source_populations")
 
+        # copy the contents of workspace to the new folder, without the files of 0 bytes
         try:
-            rmtree(folder_name + "/experiment_data")
+            archive_workspace(Path("workspace"), Path(folder_name), "DIRECTORY", exclude, drop_empty_logs=True)
         except OSError as error:
-            pass
-
-        if(not self.__config.get_using_configurable_io()):
-            try:
-                rmtree(folder_name + "/template")
-            except OSError as error:
-                pass
-        
-        if(self.__config.get_init_mode() != "EXISTING_POPULATION"):
-            try:
-                rmtree(folder_name + "/source_populations")
-            except OSError as error:
-                pass
+            print(error) 
 
         return folder_name
     
@@ -0,0 +1,97 @@
+'''
+analyze_runs.py
+===============
+
+program goal
+============
+This program summarises many runs at once. It finds the workspaces saved at the end of runs
+(backups and formatted experiment directories, including compressed ones) under the given
+directories, parses them in parallel and prints the success rate and convergence statistics
+across them (see RunAnalytics.py). The parsed runs are cached, so analysing the same runs again
+(e.g. with another target) only takes a moment.
+
+Args: the directories to search
+'''
+
+from argparse import ArgumentParser
+import csv
+import numpy as np
+from RunAnalytics import find_runs, load_runs, summarize_runs, aggregate, best_fitness_curves
+
+program_name = "analyze_runs"
+program_description = "This program prints convergence and success rate statistics across saved runs"
+program_epilog = None
+
+def run():
+    #Argument Parser is in the run file because it scared sphinx into thinking sys.exit() might be called
+    parser = ArgumentParser(prog=program_name,
+                            description=program_description,
+                            epilog=program_epilog)
+    parser.add_argument('directories',type=str,nargs='+',
+                    help=f"Directories holding saved runs (searched recursively), or runs themselves")
+    parser.add_argument('-f','--target-fitness',type=float,default=None,
+                    help=f"The overall best fitness a run must reach to succeed. Default: pulse count runs succeed when a circuit reaches the target frequency, and other runs are not judged")
+    parser.add_argument('-t','--target-frequency',type=float,default=None,
+                    help=f"The pulse count a pulse count run must reach to succeed. Default: each run's desired_freq")
+    parser.add_argument('--tolerance',type=float,default=0,
+                    help=f"How far from the target frequency a pulse count may be. Default: 0")
+    parser.add_argument('--convergence-fraction',type=float,default=0.95,
+                    help=f"A run converges when its overall best fitness has made this fraction of its total improvement. Default: 0.95")
+    parser.add_argument('-o','--output',type=str,default=None,
+                    help=f"A CSV file to write the statistics of every run to")
+    parser.add_argument('--curves',type=str,default=None,
+                    help=f"A CSV file to write the mean, median and 10th/90th percentile overall best fitness of every generation to")
+    parser.add_argument('-c','--cache-directory',type=str,default='./workspace/analysis/run_cache',
+                    help=f"The directory the parsed runs are cached in. Default: ./workspace/analysis/run_cache")
+    parser.add_argument('--no-cache',action='store_true',
+                    help=f"Parse every run again without reading or writing the cache")
+    parser.add_argument('-w','--workers',type=int,default=None,
+                    help=f"The number of processes parsing runs. Default: the number of CPUs")
+    args = parser.parse_args()
+
+    paths = find_runs(args.directories)
+    if len(paths) == 0:
+        print(f'No saved runs were found in {", ".join(args.directories)}.')
+        exit(1)
+
+    runs = load_runs(paths, None if args.no_cache else args.cache_directory, args.workers)
+    table = summarize_runs(runs, args.target_fitness, args.target_frequency, args.tolerance, args.convergence_fraction)
+    stats = aggregate(table)
+
+    print(f"Runs: {stats['runs']}")
+    if stats['runs_with_criterion'] > 0:
+        print(f"Success rate: {stats['success_rate']:.1%} of {stats['runs_with_criterion']} runs")
+    for column, label in (("success_generation", "Generations to success"),
+                          ("convergence_generation", "Generations to converge"),
+                          ("overall_best", "Overall best fitness")):
+        print(f"{label}: mean {stats[column + '_mean']:.6g}, median {stats[column + '_median']:.6g}, 90th percentile {stats[column + '_p90']:.6g}")
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(table.keys())
+            writer.writerows(zip(*table.values()))
+        print(f"Wrote the statistics of every run to {args.output}")
+
+    if args.curves is not None:
+        generations, curves = best_fitness_curves(runs)
+        # Generations no run logged (e.g. generation 0) have no statistics
+        logged = ~np.isnan(curves).all(axis=0)
+        generations, curves = generations[logged], curves[:, logged]
+        with open(args.curves, 'w', newline='') as curves_file:
+            writer = csv.writer(curves_file)
+            writer.writerow(["generation", "mean", "median", "p10", "p90"])
+            if len(curves) > 0:
+                writer.writerows(zip(
+                    generations,
+                    np.nanmean(curves, axis=0),
+                    np.nanmedian(curves, axis=0),
+                    np.nanpercentile(curves, 10, axis=0),
+                    np.nanpercentile(curves, 90, axis=0)
+                ))
+        print(f"Wrote the overall best fitness curves to {args.curves}")
+
+
+#only runs if it is imported directly
+if (__name__ == "__main__"):
+    run()
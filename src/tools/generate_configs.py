@@ -22,14 +22,6 @@ path_store_best_asc =           "data/previous_best.asc"
 """This variable is where the best.asc is copied to is set command to copy_best_target_path by default"""
 
 
-# This will create the directory to put the generated configs in if it doesn't exist
-if not os.path.isdir(generated_configs_dir):
-    os.makedirs(generated_configs_dir)
-
-#Make the directory for the final results
-if not os.path.isdir(results_output_directory):
-    os.makedirs(results_output_directory)
-
 ## Some Protocalls and Dataclasses to streamline operation & Provide good defaults
 
 class CommandInfo(Protocol):
@@ -388,55 +380,68 @@ exit 0
 
 """
 
-with open(generated_bash_script_path, 'w') as bash_file:
-    # Invoke the bash shell for bash script
-    bash_file.write(bash_head)
-
-    command_count = 0
-    for command_data in config_generator:
-
-        # Add a call to this 
-        bash_file.write(
-            bash_command_wrapper_logic.format(
-                command = evolve_command_base.format(
-                    config_path = command_data.config_path,
-                    description = f'"{command_data.description}"', 
-                    # Note that it is important that outer string uses double quotes or this messes up wrapper logic
-                    output_directory = results_output_directory
-                ),
-                action_if_failure = "SkipNextCommand=1" if command_data.skip_next_command_if_error else "SkipNextCommand=0",
-                action_if_success = ("SkipNextCommand=1" if command_data.skip_next_command_if_success else "SkipNextCommand=0")  +\
-                                    (f"\n\tcp {path_best_asc_in_workspace} {command_data.copy_best_asc_target_path}" if command_data.copy_best_asc_target_path is not None else ""),
-                action_if_skipped = "SkipNextCommand=1" if command_data.skip_next_command_if_skipped else "SkipNextCommand=0"
+def main():
+    """
+    Writes the generated configs and the bash script that runs them. Nothing is written until
+    this is called, so the generators and templates above can be imported freely.
+    """
+    # This will create the directory to put the generated configs in if it doesn't exist
+    if not os.path.isdir(generated_configs_dir):
+        os.makedirs(generated_configs_dir)
+
+    #Make the directory for the final results
+    if not os.path.isdir(results_output_directory):
+        os.makedirs(results_output_directory)
+
+    with open(generated_bash_script_path, 'w') as bash_file:
+        # Invoke the bash shell for bash script
+        bash_file.write(bash_head)
+
+        command_count = 0
+        for command_data in config_generator:
+
+            # Add a call to this 
+            bash_file.write(
+                bash_command_wrapper_logic.format(
+                    command = evolve_command_base.format(
+                        config_path = command_data.config_path,
+                        description = f'"{command_data.description}"', 
+                        # Note that it is important that outer string uses double quotes or this messes up wrapper logic
+                        output_directory = results_output_directory
+                    ),
+                    action_if_failure = "SkipNextCommand=1" if command_data.skip_next_command_if_error else "SkipNextCommand=0",
+                    action_if_success = ("SkipNextCommand=1" if command_data.skip_next_command_if_success else "SkipNextCommand=0")  +\
+                                        (f"\n\tcp {path_best_asc_in_workspace} {command_data.copy_best_asc_target_path}" if command_data.copy_best_asc_target_path is not None else ""),
+                    action_if_skipped = "SkipNextCommand=1" if command_data.skip_next_command_if_skipped else "SkipNextCommand=0"
+                )
             )
-        )
 
-        #count the number of commands we add
-        command_count += 1
+            #count the number of commands we add
+            command_count += 1
     
-    bash_file.write(bash_tail.format(num_commands = command_count))
-
-#ensure bash script is executable if possible, but don't require permisions to do so.
-try:
-    os.chmod(generated_bash_script_path,stat.S_IREAD
-            |stat.S_IWRITE
-            |stat.S_IRWXU
-            |stat.S_IRWXG
-            |stat.S_IRWXO)
-except PermissionError:
-    print(
-    f"""
+        bash_file.write(bash_tail.format(num_commands = command_count))
+
+    #ensure bash script is executable if possible, but don't require permisions to do so.
+    try:
+        os.chmod(generated_bash_script_path,stat.S_IREAD
+                |stat.S_IWRITE
+                |stat.S_IRWXU
+                |stat.S_IRWXG
+                |stat.S_IRWXO)
+    except PermissionError:
+        print(
+        f"""
 You may need to make the bash file executable.
 Alternatively, you could run this command with sudo privilages. (sudo python3 ...)
 To do so run the following command:
-    
+
 chmod +x {bash_file.name}
 
 """
-    )
+        )
 
-completion_message=\
-f"""
+    completion_message=\
+    f"""
 --------------------------------------------------------------------------
 Finished completing the bash file, and related folders.
 
@@ -457,4 +462,8 @@ i.e.   .../BitstreamEvolution$ python3 src/tools/generate_configs.py
        .../BitstreamEvolution$ ./{bash_file.name}
 """
 
-print(completion_message)
\ No newline at end of file
+    print(completion_message)
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,40 @@
+"""
+Stub iceprog
+============
+
+Stands in for ``iceprog`` when running the intrinsic pipeline without an FPGA attached.
+It accepts the same arguments BitstreamEvolution passes to iceprog (``<bitstream> -d <device>``),
+checks that the bitstream exists and optionally sleeps to imitate the time taken to flash the board.
+
+Use it by setting the ICEPROG_COMMAND system parameter, e.g.::
+
+    ICEPROG_COMMAND = python3 src/tools/stub_iceprog.py --seconds 1.5
+
+and pair it with ``SERIAL_TRANSPORT = SIMULATED``.
+"""
+
+import argparse
+import os
+import sys
+from time import sleep
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Pretends to program an iCE40 FPGA")
+    parser.add_argument("bitstream", help="The bitstream that would have been uploaded")
+    parser.add_argument("-d", "--device", default=None, help="The device the bitstream would have been uploaded to")
+    parser.add_argument("--seconds", type=float, default=0.0, help="How long the fake upload takes")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.bitstream):
+        print("stub_iceprog: can't open '{}' for reading".format(args.bitstream), file=sys.stderr)
+        return 1
+
+    sleep(args.seconds)
+    print("stub_iceprog: pretended to program {} with {} ({} bytes)".format(
+        args.device, args.bitstream, os.path.getsize(args.bitstream)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -1,11 +1,13 @@
 import os
 from pathlib import Path
 from unittest.mock import Mock
+import numpy as np
+from numpy.random import default_rng
 from Circuit.SimHardwareCircuit import SimHardwareCircuit
 
 circuit = None
 config = Mock()
-rand = Mock()
+rand = default_rng(0)
 logger = Mock()
 
 # Set directories for workspace files in tests
@@ -20,10 +22,12 @@ config.get_routing_type.return_value = 'MOORE'
 template = Path(os.path.join('test', 'res', 'inputs', 'hardware_file.asc'))
 circuit = SimHardwareCircuit(1, 'test', config, template, logger, rand)
 
+def fill_bitstream(ckt, bit):
+    # Sets every modifiable bit to the same value
+    ckt.set_bitstream(np.full(ckt.get_modifiable_layout().offsets.size, bit))
+
 def test_zero_eval():
-    # Mock randomize all to set every bit to 0
-    rand.integers.return_value = 48
-    circuit.randomize_bitstream()
+    fill_bitstream(circuit, 0)
 
     circuit.clear_data()
     circuit.upload()
@@ -33,9 +37,7 @@ def test_zero_eval():
     assert fit == 0
 
 def test_simple_eval():
-    # Mock randomize all to set every bit to 1
-    rand.integers.return_value = 49
-    circuit.randomize_bitstream()
+    fill_bitstream(circuit, 1)
     
     circuit.clear_data()
     circuit.upload()
@@ -44,13 +46,10 @@ def test_simple_eval():
     assert fit == 1728
 
 def test_mutate():
-    # Mock randomize all to set every bit to 0
-    rand.integers.return_value = 48
-    circuit.randomize_bitstream()
+    fill_bitstream(circuit, 0)
 
     # Should mutate every value (since all start at 0)
-    config.get_mutation_probability.return_value = 1
-    rand.uniform.return_value = 0
+    config.get_snapshot.return_value.mutation_probability = 1
     circuit.mutate()
 
     circuit.clear_data()
@@ -62,11 +61,8 @@ def test_mutate():
 def test_crossover():
     parent = SimHardwareCircuit(2, 'test2', config, template, logger, rand)
     
-    rand.integers.return_value = 48
-    circuit.randomize_bitstream()
-
-    rand.integers.return_value = 49
-    parent.randomize_bitstream()
+    fill_bitstream(circuit, 0)
+    fill_bitstream(parent, 1)
 
     circuit.crossover(parent, 3)
     
@@ -76,3 +72,25 @@ def test_crossover():
     fit = circuit.calculate_fitness()
     # 96 tiles, and we are allowing 2 bits in each of them to be crossed over & set to 1
     assert fit == 96 * 2
+
+def test_fitness_cache(tmp_path):
+    from unittest.mock import patch
+    from FitnessCache import FitnessCache
+    from Circuit.FileBasedCircuit import FileBasedCircuit
+    cache = FitnessCache(tmp_path.joinpath("cache.sqlite"), FitnessCache.make_context(), 100)
+    first = SimHardwareCircuit(2, 'test', config, template, logger, rand, cache)
+    second = SimHardwareCircuit(3, 'test', config, template, logger, rand, cache)
+    fill_bitstream(first, 1)
+    fill_bitstream(second, 1)
+
+    with patch.object(FileBasedCircuit, "_compile") as compile:
+        for ckt in [first, second]:
+            ckt.clear_data()
+            ckt.upload()
+            ckt.collect_data_once()
+            ckt.collect_data_once()
+        # The second circuit has the same genome, so it is not compiled again
+        assert compile.call_count == 1
+    assert first.calculate_fitness() == second.calculate_fitness() > 0
+    assert cache.get(first.get_genome_digest()) == first.get_fitness()
+    cache.close()
@@ -1,11 +1,12 @@
 import os
 from pathlib import Path
 from unittest.mock import Mock
+from numpy.random import default_rng
 from Circuit.IntrinsicCircuit import IntrinsicCircuit
 
 circuit = None
 config = Mock()
-rand = Mock()
+rand = default_rng(0)
 logger = Mock()
 microcontroller = Mock()
 
@@ -34,3 +35,62 @@ def test_eval():
     fit = circuit.calculate_fitness()
     assert fit == 6
     fitness_func.get_measurements.assert_called()
+
+def test_estimate_fitness():
+    estimated_func = Mock()
+    estimating = IntrinsicCircuit(4, 'test', config, template, rand, logger, microcontroller, estimated_func)
+    extra_data = estimated_func.attach.call_args.args[3]
+    def calculate_fitness(data):
+        # Like the pulse count functions, the pulse count of the data is kept as extra data
+        extra_data['pulses'] = sum(data)
+        return sum(data)
+    estimated_func.calculate_fitness.side_effect = calculate_fitness
+    estimated_func.get_measurements.return_value = [5]
+    estimating.clear_data()
+    estimating.collect_data_once()
+    estimating.collect_data_once()
+    extra_data['pulses'] = 10
+
+    assert estimating.estimate_fitness([3]) == 3
+    # Neither the collected data nor the extra data change
+    assert estimating.get_extra_data('pulses') == 10
+    assert estimating._calculate_fitness() == 10
+
+def test_skips_redundant_upload():
+    from unittest.mock import patch
+    from Microcontroller import Microcontroller
+    board_config = Mock()
+    board_config.get_simulation_mode.return_value = "FULLY_SIM"
+    board_config.get_snapshot.return_value = Mock(upload_fpgas=("fpga1",), skip_redundant_uploads=True,
+        iceprog_command=("iceprog",), settle_time=0)
+    for attr in ["get_data_directory", "get_asc_directory", "get_bin_directory", "get_accessed_columns", "get_routing_type"]:
+        getattr(board_config, attr).return_value = getattr(config, attr).return_value
+    mcu = Microcontroller(board_config, Mock())
+    first = IntrinsicCircuit(2, 'test', board_config, template, rand, logger, mcu, Mock())
+    second = IntrinsicCircuit(3, 'test', board_config, template, rand, logger, mcu, Mock())
+    os.makedirs(os.path.join('test', 'out', 'bin'), exist_ok=True)
+
+    def compile_circuit(ckt):
+        Path(ckt._bitstream_filepath).touch()
+
+    with patch("Circuit.IntrinsicCircuit.run") as run, patch.object(IntrinsicCircuit, "_compile", autospec=True, side_effect=compile_circuit) as compile, \
+            patch("Circuit.IntrinsicCircuit.METRICS") as metrics:
+        run.return_value.returncode = 0
+        first.upload()
+        # The same genome is already on the FPGA
+        first.upload()
+        second.upload()
+        assert run.call_count == 1
+        assert compile.call_count == 1
+        assert mcu.is_configured("fpga1", first.get_genome_digest())
+        # A failed upload leaves the FPGA's contents unknown
+        mcu.set_configured("fpga1", None)
+        run.return_value.returncode = 1
+        first.upload()
+        first.upload()
+        assert run.call_count == 3
+        # The bitstream was compiled from the same genome, so it is not compiled again
+        assert compile.call_count == 1
+        counted = [call.args[0] for call in metrics.inc.call_args_list]
+        assert counted.count("uploads_total") == 1
+        assert counted.count("uploads_failed_total") == 2
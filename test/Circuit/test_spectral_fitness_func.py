@@ -0,0 +1,80 @@
+import math
+from unittest.mock import Mock
+from Circuit.SpectralFitnessFunction import SpectralFitnessFunction, estimate_frequency
+
+def sine_wave(freq, points=500, interval=0.8e-3):
+    return [int(500 + 300 * math.sin(2 * math.pi * freq * i * interval)) for i in range(points)]
+
+def test_estimate_frequency():
+    for freq in [20, 100, 250, 456]:
+        assert abs(estimate_frequency(sine_wave(freq), 0.8e-3) - freq) < 0.01 * freq
+    assert abs(estimate_frequency(sine_wave(10000, interval=10e-6), 10e-6) - 10000) < 100
+    assert estimate_frequency([512] * 500) == 0
+
+def test_single_capture(tmp_path):
+    data_filepath = tmp_path / "data.log"
+    # A capture the microcontroller reports took 0.5s, so the points are 1ms apart
+    waveform = sine_wave(200, points=500, interval=1e-3)
+    lines = b"".join(b"%d: %d\n" % (i + 1, x) for i, x in enumerate(waveform))
+    data_filepath.write_bytes(lines + b"ELAPSED: 500000\n")
+
+    config = Mock()
+    config.get_desired_frequency.return_value = 10000
+    config.get_fitness_func.return_value = "TOLERANT_PULSE_COUNT"
+    extra_data = dict()
+    ff = SpectralFitnessFunction(500, sample_interval=0.8e-3)
+    ff.attach(data_filepath, Mock(), config, extra_data)
+
+    frequency, variance = ff.get_measurements()
+    assert abs(frequency - 200) < 2
+    assert variance > 0
+    assert extra_data["low_voltage"] < 300 and extra_data["high_voltage"] > 700
+
+    # Older firmware does not report the duration, so the configured interval is used
+    data_filepath.write_bytes(lines)
+    frequency, variance = ff.get_measurements()
+    assert abs(frequency - 250) < 3
+
+    # The worst of several captures is used
+    assert ff.calculate_fitness([10000, 1.0, 9000, 1.0]) < 0.01
+    assert extra_data["pulses"] == 9000
+    assert ff.calculate_fitness([10000, 1.0]) == 1.0
+
+    config.get_fitness_func.return_value = "COMBINED"
+    config.get_combined_mode.return_value = "ADD"
+    config.get_pulse_weight.return_value = 2
+    config.get_var_weight.return_value = 0.5
+    assert ff.calculate_fitness([10000, 4.0, 10000, 2.0]) == 2 * 1.0 + 0.5 * 3.0
+
+def test_simulated_capture(tmp_path):
+    from Microcontroller import Microcontroller
+    from SerialTransport import BITS_PER_BYTE
+    config = Mock()
+    config.get_simulation_mode.return_value = "FULLY_INTRINSIC"
+    config.reading_temp_humidity.return_value = False
+    config.get_serial_transport.return_value = "SIMULATED"
+    config.get_simulated_baud.return_value = 1000000
+    config.get_simulated_time_scale.return_value = 0
+    config.get_simulated_dropout_rate.return_value = 0
+    config.get_simulated_malformed_rate.return_value = 0
+    config.get_mcu_read_timeout.return_value = 2
+    mcu = Microcontroller(config, Mock())
+    data_filepath = tmp_path / "data.log"
+    ff = SpectralFitnessFunction(500, sample_interval=0.8e-3)
+    ff.attach(data_filepath, mcu, config, dict())
+    try:
+        frequency, variance = ff.get_measurements()
+    finally:
+        mcu.close()
+
+    lines = data_filepath.read_bytes().splitlines(keepends=True)
+    samples = lines[:-1]
+    assert len(samples) == 500
+    # The reported duration is how long the simulated link took to send the sample lines
+    byte_time = BITS_PER_BYTE / 1000000
+    interval = sum(len(line) for line in samples) * byte_time / len(samples)
+    assert abs(ff._read_sample_interval() - interval) < 1e-6
+    # Not the configured fallback
+    assert interval < 0.8e-3 / 2
+    waveform = [int(line.split(b": ")[1]) for line in samples]
+    assert frequency == estimate_frequency(waveform, ff._read_sample_interval())
@@ -0,0 +1,56 @@
+import numpy as np
+from itertools import combinations
+from BitMatrix import BitMatrix
+
+BITSTREAMS = [
+    [0, 1, 1, 0, 1],
+    [0, 1, 0, 0, 1],
+    [1, 1, 0, 0, 0],
+    [0, 1, 1, 0, 1],
+]
+
+def naive_dist(a, b):
+    return sum(x != y for x, y in zip(a, b))
+
+def make_matrix(bitstreams=BITSTREAMS):
+    matrix = BitMatrix()
+    matrix.update(bitstreams)
+    return matrix
+
+def test_ascii_bits():
+    # Hardware files give bits as the ASCII bytes 48 ('0') and 49 ('1')
+    matrix = make_matrix([[48 + b for b in bitstream] for bitstream in BITSTREAMS])
+    assert np.array_equal(matrix.get_bits(), BITSTREAMS)
+
+def test_bit_frequencies():
+    assert np.array_equal(make_matrix().get_bit_frequencies(), [1, 4, 2, 0, 3])
+
+def test_avg_hamming_dist():
+    pairs = list(combinations(BITSTREAMS, 2))
+    expected = sum(naive_dist(a, b) for a, b in pairs) / len(pairs)
+    assert np.isclose(make_matrix().avg_hamming_dist(), expected)
+
+def test_avg_hamming_dist_single_circuit():
+    assert make_matrix(BITSTREAMS[:1]).avg_hamming_dist() == 0
+
+def test_count_differing_bits():
+    assert make_matrix().count_differing_bits() == 3
+
+def test_count_unique():
+    assert make_matrix().count_unique() == 3
+
+def test_pairwise_hamming():
+    distances = make_matrix().pairwise_hamming()
+    for i, a in enumerate(BITSTREAMS):
+        for j, b in enumerate(BITSTREAMS):
+            assert distances[i, j] == naive_dist(a, b)
+
+def test_pairwise_hamming_large():
+    rand = np.random.default_rng(0)
+    bits = rand.integers(0, 2, (40, 77))
+    distances = make_matrix(bits).pairwise_hamming()
+    assert distances[3, 17] == np.count_nonzero(bits[3] != bits[17])
+    assert np.isclose(distances.sum() / (40 * 39), make_matrix(bits).avg_hamming_dist())
+
+def test_differing_bits_str():
+    assert make_matrix().differing_bits_str() == "".join(chr(c + 32) for c in [1, 4, 2, 0, 3])
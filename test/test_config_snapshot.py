@@ -0,0 +1,21 @@
+import os
+import pytest
+from Config import Config
+
+config = Config(os.path.join('data', 'default_config.ini'))
+
+def test_snapshot_matches_getters():
+    snapshot = config.get_snapshot()
+    assert snapshot.population_size == config.get_population_size()
+    assert snapshot.fitness_func == config.get_fitness_func()
+    assert snapshot.is_pulse_func == config.is_pulse_func()
+    assert snapshot.mutation_probability == config.get_mutation_probability()
+    assert snapshot.routing_type == config.get_routing_type()
+    assert snapshot.accessed_columns == tuple(int(col) for col in config.get_accessed_columns())
+    # Built once and shared
+    assert config.get_snapshot() is snapshot
+
+def test_snapshot_is_immutable():
+    snapshot = config.get_snapshot()
+    with pytest.raises(AttributeError):
+        snapshot.population_size = 1
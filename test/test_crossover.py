@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+from unittest.mock import Mock
+import numpy as np
+from numpy.random import default_rng
+import Crossover
+from Circuit.IntrinsicCircuit import IntrinsicCircuit
+
+config = Mock()
+config.get_data_directory.return_value = Path(os.path.join('test', 'out', 'data'))
+config.get_asc_directory.return_value = Path(os.path.join('test', 'out', 'asc'))
+config.get_bin_directory.return_value = Path(os.path.join('test', 'out', 'bin'))
+config.get_accessed_columns.return_value = [14,15,24,25,40,41]
+config.get_routing_type.return_value = 'MOORE'
+
+template = Path(os.path.join('test', 'res', 'inputs', 'hardware_file.asc'))
+
+def make_circuit(index, bits):
+    circuit = IntrinsicCircuit(index, 'crossover_' + str(index), config, template, Mock(), Mock(), Mock(), Mock())
+    circuit._rand = Mock()
+    circuit._rand.integers.return_value = bits
+    circuit.randomize_bitstream()
+    return circuit
+
+def test_uniform_mask():
+    mask = Crossover.uniform_mask(default_rng(0), 10000)
+    assert mask.dtype == bool and mask.size == 10000
+    assert abs(mask.mean() - 0.5) < 0.03
+
+def test_k_point_mask():
+    mask = Crossover.k_point_mask(default_rng(0), 100, 3)
+    assert mask[0]
+    # Three cuts give four alternating segments
+    assert np.count_nonzero(np.diff(mask.astype(int))) == 3
+    # More points than gaps between bits alternates every bit
+    assert np.count_nonzero(np.diff(Crossover.k_point_mask(default_rng(0), 5, 10).astype(int))) == 4
+
+def test_tile_block_mask():
+    tile_x = np.repeat(np.arange(4), 4)
+    tile_y = np.tile(np.arange(4), 4)
+    mask = Crossover.tile_block_mask(default_rng(0), tile_x, tile_y)
+    xs, ys = tile_x[mask], tile_y[mask]
+    assert mask.any()
+    # The selected tiles form a full rectangle
+    assert mask.sum() == (xs.max() - xs.min() + 1) * (ys.max() - ys.min() + 1)
+
+def test_layout():
+    circuit = make_circuit(1, 48)
+    layout = circuit.get_modifiable_layout()
+    # 96 tiles, 3 rows, 6 columns
+    assert layout.offsets.size == 1728
+    assert layout.tile_x.size == layout.tile_y.size == 1728
+    bitstream = circuit.get_bitstream()
+    assert len(bitstream) == 1728
+    assert np.all(bitstream == 48)
+
+def test_crossover_mask():
+    child = make_circuit(1, 48)
+    parent = make_circuit(2, 49)
+    mask = np.zeros(1728, dtype=bool)
+    mask[::3] = True
+    child.crossover_mask(parent, mask)
+    bitstream = child.get_bitstream()
+    assert np.all(bitstream[mask] == 49)
+    assert np.all(bitstream[~mask] == 48)
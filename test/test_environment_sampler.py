@@ -0,0 +1,67 @@
+from itertools import count
+from time import sleep
+import numpy as np
+from EnvironmentSampler import EnvironmentSampler
+
+def make_sampler(capacity=4, temps=None):
+    temps = count() if temps is None else iter(temps)
+    return EnvironmentSampler(lambda: next(temps), lambda: 50.0, 0.01, capacity)
+
+def test_ring_buffer():
+    sampler = make_sampler()
+    assert sampler.latest() is None and sampler.nearest(0) is None
+    for _ in range(6):
+        sampler.sample()
+    times, temps, hums = sampler.get_readings()
+    # Only the last four readings are kept, oldest first
+    assert list(temps) == [2, 3, 4, 5]
+    assert np.all(np.diff(times) >= 0)
+    assert np.all(hums == 50.0)
+    assert sampler.latest().temperature == 5
+
+def test_nearest():
+    sampler = make_sampler(capacity=8)
+    readings = [sampler.sample() for _ in range(3)]
+    assert sampler.nearest(readings[1].time).temperature == 1
+    assert sampler.nearest(readings[0].time - 100).temperature == 0
+    assert sampler.nearest(readings[2].time + 100).temperature == 2
+
+def test_failed_reading():
+    sampler = make_sampler(temps=[None])
+    assert np.isnan(sampler.sample().temperature)
+
+def test_timed_out_reading():
+    from unittest.mock import Mock
+    from Microcontroller import Microcontroller
+    config = Mock()
+    config.get_simulation_mode.return_value = "FULLY_INTRINSIC"
+    config.reading_temp_humidity.return_value = True
+    config.get_serial_transport.return_value = "SIMULATED"
+    config.get_simulated_baud.return_value = 0
+    config.get_simulated_time_scale.return_value = 0
+    # The environment MCU never replies
+    config.get_simulated_dropout_rate.return_value = 1.0
+    config.get_simulated_malformed_rate.return_value = 0
+    config.get_mcu_read_timeout.return_value = 0.05
+    mcu = Microcontroller(config, Mock())
+    try:
+        sampler = EnvironmentSampler(mcu.measure_temp, mcu.measure_humidity, 0.01, 4)
+        reading = sampler.sample()
+    finally:
+        mcu.close()
+    # A timed out read is stored as missing, not as a reading of -1
+    assert np.isnan(reading.temperature) and np.isnan(reading.humidity)
+    assert np.isnan(sampler.nearest(reading.time).temperature)
+
+def test_background_sampling(tmp_path):
+    log_path = tmp_path.joinpath("env.log")
+    sampler = EnvironmentSampler(lambda: 21.5, lambda: 40.0, 0.01, 16, log_path)
+    sampler.start()
+    # The first reading is taken before start returns
+    assert sampler.latest() is not None
+    sleep(0.1)
+    sampler.stop()
+    assert not sampler.is_running()
+    lines = log_path.read_text().splitlines()
+    assert len(lines) > 1
+    assert lines[0].endswith(",21.5,40.0")
@@ -0,0 +1,35 @@
+import FitnessCache as fitness_cache_module
+from FitnessCache import FitnessCache
+
+def test_get_and_put(tmp_path):
+    path = tmp_path.joinpath("cache.sqlite")
+    context = FitnessCache.make_context("SIM_HARDWARE", "MOORE", (14, 15))
+    cache = FitnessCache(path, context, 100)
+    assert cache.get("genome") is None
+    cache.put("genome", 12.5)
+    assert cache.get("genome") == 12.5
+
+    # A second run shares the file, but only within the same context
+    other = FitnessCache(path, context, 100)
+    assert other.get("genome") == 12.5
+    different = FitnessCache(path, FitnessCache.make_context("SIM_HARDWARE", "NEWSE", (14, 15)), 100)
+    assert different.get("genome") is None
+    different.put("genome", 1.0)
+    assert other.get("genome") == 12.5
+    assert len(cache) == 2
+    for db in [cache, other, different]:
+        db.close()
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(fitness_cache_module, "time", lambda: next(clock))
+    cache = FitnessCache(tmp_path.joinpath("cache.sqlite"), FitnessCache.make_context(), 3)
+    for genome in ["a", "b", "c", "d"]:
+        cache.put(genome, 1.0)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == 1.0
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert [cache.get(genome) for genome in ["a", "c", "d"]] == [1.0, 1.0, 1.0]
+    assert cache.evict() == 0
+    cache.close()
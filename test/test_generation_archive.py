@@ -0,0 +1,51 @@
+import os
+from pathlib import Path
+import numpy as np
+from numpy.random import default_rng
+from Circuit.FileBasedCircuit import FileBasedCircuit
+import GenerationArchive as ga
+
+COLUMNS = ['14', '15', '24', '25', '40', '41']
+TEMPLATE = Path(os.path.join('test', 'res', 'inputs', 'hardware_file.asc'))
+
+def evolve_bits(rand, generations, circuits, num_bits):
+    bits = rand.integers(0, 2, (circuits, num_bits), dtype=np.uint8)
+    history = []
+    for _ in range(generations):
+        bits = bits ^ (rand.random(bits.shape) < 0.01)
+        history.append(bits.copy())
+    return history
+
+def test_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(ga, "KEYFRAME_INTERVAL", 4)
+    history = evolve_bits(default_rng(0), 10, 5, 1000)
+    archive = ga.GenerationArchive(tmp_path)
+    archive.start(["hardware" + str(i) for i in range(1, 6)], 1000, "MOORE", COLUMNS)
+    # Saved as ASCII bytes, as FileBasedCircuit.get_bitstream returns them
+    sizes = [archive.save(gen, history[gen - 1] + 48) for gen in range(1, 11)]
+    # Deltas of sparse changes compress far below the packed size
+    assert sizes[1] < 5 * 1000 / 8
+
+    reader = ga.GenerationArchive(tmp_path)
+    assert reader.get_generations() == list(range(1, 11))
+    assert reader.get_metadata()["names"][0] == "hardware1"
+    for gen in [1, 3, 4, 7, 10]:
+        assert np.array_equal(reader.load(gen), history[gen - 1])
+
+def test_reconstruct(tmp_path):
+    template = TEMPLATE.read_bytes()
+    offsets = FileBasedCircuit.get_modifiable_layout_st(template, COLUMNS, "MOORE").offsets
+    bits = default_rng(1).integers(0, 2, (3, offsets.size), dtype=np.uint8)
+    archive = ga.GenerationArchive(tmp_path.joinpath("generations"))
+    archive.start(["a", "b", "c"], offsets.size, "MOORE", COLUMNS, template)
+    archive.save(1, bits)
+
+    paths = ga.GenerationArchive(tmp_path.joinpath("generations")).reconstruct(1, tmp_path.joinpath("asc"), max_workers=2)
+    assert [path.name for path in paths] == ["a.asc", "b.asc", "c.asc"]
+    contents = np.frombuffer(paths[1].read_bytes(), dtype=np.uint8)
+    assert contents.size == len(template)
+    assert np.array_equal(contents[offsets] - 48, bits[1])
+    # Everything else is the template
+    mask = np.ones(contents.size, dtype=bool)
+    mask[offsets] = False
+    assert np.array_equal(contents[mask], np.frombuffer(template, dtype=np.uint8)[mask])
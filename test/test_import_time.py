@@ -0,0 +1,36 @@
+import os
+import sys
+import subprocess
+
+# Modules that only an actual evolution run needs
+HEAVY_MODULES = ["numpy", "serial", "sortedcontainers", "Circuit.CircuitLegacy", "CircuitPopulation", "Microcontroller"]
+
+# The import times are recorded here rather than asserted on, since they depend on the machine
+IMPORT_TIME_LOG = os.path.join("test", "out", "import_time.log")
+
+def import_in_fresh_interpreter(module):
+    """
+    Imports module in a new interpreter with -X importtime, returning the microseconds the import
+    took (including the modules it imported) and the modules it loaded
+    """
+    code = ("import sys\n"
+            "import " + module + "\n"
+            "print(','.join(sys.modules))\n")
+    env = dict(os.environ, PYTHONPATH=os.path.join(os.getcwd(), "src"))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True, check=True)
+    # Format: import time: self [us] | cumulative | imported package
+    microseconds = None
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            microseconds = int(fields[1])
+    return microseconds, set(result.stdout.splitlines()[-1].split(","))
+
+def test_cli_imports_are_light():
+    os.makedirs(os.path.dirname(IMPORT_TIME_LOG), exist_ok=True)
+    with open(IMPORT_TIME_LOG, "w") as log_file:
+        for module in ["evolve", "multi_evolve"]:
+            microseconds, modules = import_in_fresh_interpreter(module)
+            assert modules.isdisjoint(HEAVY_MODULES), module + " imported " + str(modules.intersection(HEAVY_MODULES))
+            assert microseconds is not None, module + " is missing from the -X importtime output"
+            log_file.write("{} {:.1f}ms\n".format(module, microseconds / 1000))
@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+from unittest.mock import Mock
+from Logger import Logger
+
+def make_logger(tmp_path, monkeypatch, log_level=2):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("workspace")
+    config = Mock()
+    config.get_log_file.return_value = Path("workspace/monitor.log")
+    config.get_log_level.return_value = log_level
+    config.get_save_log.return_value = True
+    config.get_log_timing.return_value = False
+    config.get_timing_trace.return_value = False
+    config.get_plots_directory.return_value = Path("workspace/plots")
+    config.get_launch_plots.return_value = False
+    config.get_telemetry.return_value = None
+    config.get_metrics.return_value = None
+    config.get_raw_data.return_value = "raw config"
+    return config, Logger(config, "test")
+
+def test_levels(tmp_path, monkeypatch):
+    config, logger = make_logger(tmp_path, monkeypatch)
+    assert logger.is_enabled(2) and not logger.is_enabled(3)
+    logger.log_event(2, "shown", 1)
+    logger.log_event(3, "hidden")
+    logger.log_warning(1, "careful")
+    logger.flush()
+    monitor = Path("workspace/monitor.log").read_text()
+    assert "shown 1" in monitor and "hidden" not in monitor
+    assert monitor.index("shown") < monitor.index("careful")
+    # The level is read once, not on every message
+    assert config.get_log_level.call_count == 1
+    logger.close()
+
+def test_monitor_file(tmp_path, monkeypatch):
+    _, logger = make_logger(tmp_path, monkeypatch)
+    values = [1, 2]
+    logger.log_event(1, "values", values)
+    # Mutable arguments are formatted when they are logged, not when they are written
+    values.append(3)
+    logger.log_error(1, "failed")
+    monitor = Path("workspace/monitor.log").read_text()
+    assert "values [1, 2]\n" in monitor
+    assert "ERROR:  failed" in monitor
+    logger.close()
+
+def test_log_generation(tmp_path, monkeypatch):
+    from CircuitPopulation import GenerationRecord, CircuitInfo
+    _, logger = make_logger(tmp_path, monkeypatch)
+    record = GenerationRecord(epoch=7, epoch_time=1.5, best_name="hardware3", best_fitness=2.0,
+        worst_fitness=0.5, overall_best=CircuitInfo("hardware9", 4.0), best_epoch=5, fitness=None,
+        pulses=None, src_populations=None, bits=None, saving_bitstream=False, saving_generation=False,
+        waveform=None)
+    logger.log_generation(record)
+    logger.flush()
+    monitor = Path("workspace/monitor.log").read_text()
+    assert "CURRENT BEST: hardware9 : EPOCH 5 : FITNESS 4.0" in monitor
+    assert "HIGHEST FITNESS OF EPOCH 7 IS: hardware3 = 2.0 over 1.5 seconds" in monitor
+    logger.close()
@@ -0,0 +1,46 @@
+import numpy as np
+from MapElitesArchive import MapElitesArchive
+
+def test_insert_if_better(tmp_path):
+    archive = MapElitesArchive([10, 10], [3, 3])
+    genomes = np.array([[0, 0, 0], [0, 0, 1], [0, 1, 0], [1, 0, 0]], dtype=np.uint8)
+    descriptors = np.array([[5, 5], [6, 4], [25, 95], [-3, 12]])
+    assert archive.update(genomes, np.array([1.0, 2.0, 3.0, 4.0]), descriptors) == 3
+    assert len(archive) == 3
+    grid = archive.get_fitness_grid()
+    # Out of range values fall into the edge cells
+    assert grid[0, 0] == 2.0 and grid[2, 2] == 3.0 and grid[0, 1] == 4.0
+    assert np.isnan(grid[1, 1])
+    # The genomes are copied in cell order
+    assert archive.get_elites().tolist() == [[0, 0, 1], [1, 0, 0], [0, 1, 0]]
+
+    # A worse circuit does not replace an elite, a better one does
+    genomes[:] = [[1, 1, 1], [1, 1, 0], [0, 1, 1], [1, 0, 1]]
+    assert archive.update(genomes, np.array([1.5, 2.5, 0.5, 4.0]), descriptors) == 1
+    assert archive.get_fitness_grid()[0, 0] == 2.5
+    assert archive.get_elites().tolist() == [[1, 1, 0], [1, 0, 0], [0, 1, 0]]
+
+def test_holds_more_elites_than_the_population():
+    archive = MapElitesArchive([1], [100])
+    rand = np.random.default_rng(0)
+    for generation in range(10):
+        genomes = rand.integers(0, 2, (10, 20), dtype=np.uint8)
+        archive.update(genomes, np.ones(10), np.arange(10)[:, None] + 10 * generation)
+    # The population is overwritten every generation, the archive keeps every cell
+    assert len(archive) == 100
+    assert archive.get_elites()[-1].tolist() == genomes[-1].tolist()
+    samples = archive.sample(rand, 50)
+    assert samples.shape == (50, 20)
+    assert set(map(bytes, samples)) <= set(map(bytes, archive.get_elites()))
+
+def test_map_file(tmp_path):
+    path = tmp_path.joinpath("map.log")
+    archive = MapElitesArchive([50], [4])
+    genomes = np.zeros((2, 8), dtype=np.uint8)
+    archive.update(genomes, np.array([1.0, 2.0]), np.array([[10], [120]]))
+    archive.write_changes(path)
+    assert path.read_text() == "50\n0 1.0\n2 2.0\n"
+    archive.update(genomes, np.array([1.0, 3.0]), np.array([[10], [120]]))
+    archive.write_changes(path)
+    # Only the changed cell is appended
+    assert path.read_text() == "50\n0 1.0\n2 2.0\n2 3.0\n"
@@ -0,0 +1,58 @@
+import json
+from urllib.request import urlopen
+from urllib.error import HTTPError
+import pytest
+from Metrics import MetricsRegistry, METRIC_PREFIX
+from StageTimer import StageTimer
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    registry.inc("generations_total")
+    registry.set("best_fitness", 3.0)
+    assert registry.render_json() == {"counters": [], "gauges": [], "histograms": []}
+
+def test_render_and_serve():
+    registry = MetricsRegistry()
+    registry.start("127.0.0.1:0")
+    try:
+        registry.inc("generations_total")
+        registry.inc("generations_total")
+        registry.inc("fitness_cache_requests_total", 3, result="hit")
+        registry.set("best_fitness", 1.5)
+        registry.observe("stage_duration_seconds", 0.2, stage="compile")
+        registry.observe("stage_duration_seconds", 20.0, stage="compile")
+
+        text = registry.render_prometheus()
+        assert "# TYPE " + METRIC_PREFIX + "generations_total counter" in text
+        assert METRIC_PREFIX + "generations_total 2.0" in text
+        assert METRIC_PREFIX + 'fitness_cache_requests_total{result="hit"} 3.0' in text
+        assert METRIC_PREFIX + "best_fitness 1.5" in text
+        assert METRIC_PREFIX + 'stage_duration_seconds_bucket{stage="compile",le="0.25"} 1' in text
+        assert METRIC_PREFIX + 'stage_duration_seconds_bucket{stage="compile",le="+Inf"} 2' in text
+        assert METRIC_PREFIX + 'stage_duration_seconds_count{stage="compile"} 2' in text
+
+        url = "http://" + registry.get_address()
+        with urlopen(url + "/metrics") as response:
+            assert response.read().decode() == text
+        with urlopen(url + "/metrics.json") as response:
+            served = json.loads(response.read())
+        assert served["counters"][0] == {"name": "fitness_cache_requests_total", "labels": {"result": "hit"}, "value": 3}
+        assert served["histograms"][0]["sum"] == pytest.approx(20.2)
+        with pytest.raises(HTTPError):
+            urlopen(url + "/other")
+    finally:
+        registry.stop()
+    assert not registry.is_enabled()
+
+def test_stage_listeners():
+    timer = StageTimer()
+    durations = []
+    listener = lambda name, seconds: durations.append(name)
+    timer.add_listener(listener)
+    timer.configure(None)
+    with timer.stage("compile"):
+        pass
+    timer.remove_listener(listener)
+    with timer.stage("iceprog"):
+        pass
+    assert durations == ["compile"]
@@ -0,0 +1,72 @@
+import numpy as np
+from unittest.mock import Mock
+from PopulationArrays import PopulationArrays
+
+def make_circuit(fitness, pulses=0):
+    ckt = Mock()
+    ckt.get_fitness.return_value = fitness
+    ckt.get_extra_data.side_effect = lambda key: {'pulses': pulses}[key]
+    ckt.get_file_attribute.return_value = '1'
+    return ckt
+
+def test_rank():
+    circuits = [make_circuit(1, 10), make_circuit(3, 30), make_circuit(2, 20)]
+    population = PopulationArrays(circuits, track_pulses=True)
+    population.rank()
+    assert list(population) == [circuits[1], circuits[2], circuits[0]]
+    assert np.array_equal(population.get_fitness(), [3, 2, 1])
+    assert np.array_equal(population.get_pulses(), [30, 20, 10])
+    assert population[0] is circuits[1]
+    assert len(population) == 3
+
+def test_rank_is_stable():
+    circuits = [make_circuit(1), make_circuit(1), make_circuit(2), make_circuit(1)]
+    population = PopulationArrays(circuits)
+    population.rank()
+    assert list(population) == [circuits[2], circuits[0], circuits[1], circuits[3]]
+
+def test_gather_after_reevaluation():
+    circuits = [make_circuit(1), make_circuit(2)]
+    population = PopulationArrays(circuits)
+    population.rank()
+    circuits[0].get_fitness.return_value = 5
+    population.gather()
+    population.rank()
+    assert population[0] is circuits[0]
+
+def test_missing_extra_data():
+    ckt = make_circuit(1)
+    population = PopulationArrays([ckt], track_pulses=True, track_voltages=True)
+    assert population.get_pulses()[0] == 0
+    assert np.isnan(population.get_voltage('mean_voltage')[0])
+
+def test_src_populations():
+    population = PopulationArrays([make_circuit(1), make_circuit(2)], track_src_population=True)
+    assert np.array_equal(population.get_src_populations(), [1, 1])
+
+def test_protection():
+    circuits = [make_circuit(3), make_circuit(2), make_circuit(1)]
+    population = PopulationArrays(circuits)
+    population.protect(slice(0, 1))
+    population.protect_circuits([circuits[2]])
+    assert np.array_equal(population.get_protected(), [True, False, True])
+    population.clear_protected()
+    assert not population.get_protected().any()
+
+def test_update_moves_one_circuit():
+    circuits = [make_circuit(4, 40), make_circuit(3, 30), make_circuit(2, 20), make_circuit(1, 10)]
+    population = PopulationArrays(circuits, track_pulses=True)
+    population.protect(0)
+    circuits[3].get_fitness.return_value = 3
+    circuits[3].get_extra_data.side_effect = lambda key: {'pulses': 35}[key]
+    # Goes after the circuit it ties with
+    assert population.update(3) == 2
+    assert list(population) == [circuits[0], circuits[1], circuits[3], circuits[2]]
+    assert np.array_equal(population.get_fitness(), [4, 3, 3, 2])
+    assert np.array_equal(population.get_pulses(), [40, 30, 35, 20])
+    assert np.array_equal(population.get_protected(), [True, False, False, False])
+
+    circuits[0].get_fitness.return_value = 0
+    assert population.update(0) == 3
+    assert population[3] is circuits[0]
+    assert np.array_equal(population.get_protected(), [False, False, False, True])
@@ -0,0 +1,41 @@
+import os
+import json
+from PopulationIndex import PopulationIndex, INDEX_FILENAME
+
+BODY = ".logic_tile 1 1\n0101\n"
+
+def write_circuit(directory, name, fitness=None, body=BODY):
+    attributes = "" if fitness is None else ".comment FILE_ATTRIBUTES fitness={" + str(fitness) + "} pulse_count={7}\n"
+    directory.joinpath(name).write_text(attributes + body)
+
+def test_ranked(tmp_path):
+    write_circuit(tmp_path, "a.asc", 0.5)
+    write_circuit(tmp_path, "b.asc", 2.0)
+    write_circuit(tmp_path, "c.asc")
+    index = PopulationIndex(tmp_path)
+    assert len(index) == 3
+    # Circuits without a fitness attribute rank as 0
+    assert [(path.name, fitness) for path, fitness in index.get_ranked()] == [("b.asc", 2.0), ("a.asc", 0.5), ("c.asc", 0.0)]
+    assert index.get_entry("b.asc")["pulses"] == 7
+    assert index.get_entry("c.asc")["pulses"] == 0
+    # Only the genome is hashed, not the attribute line
+    assert index.get_entry("a.asc")["hash"] == index.get_entry("c.asc")["hash"]
+
+def test_incremental_refresh(tmp_path):
+    write_circuit(tmp_path, "a.asc", 1.0)
+    write_circuit(tmp_path, "b.asc", 2.0)
+    PopulationIndex(tmp_path)
+    assert tmp_path.joinpath(INDEX_FILENAME).exists()
+
+    # Unchanged files are taken from the saved index without being read
+    index = PopulationIndex(tmp_path)
+    assert index.refresh() == 0
+
+    write_circuit(tmp_path, "a.asc", 3.0, ".logic_tile 1 1\n1111\n")
+    stat = os.stat(tmp_path.joinpath("a.asc"))
+    os.utime(tmp_path.joinpath("a.asc"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    os.remove(tmp_path.joinpath("b.asc"))
+    assert index.refresh() == 1
+    assert [path.name for path, _ in index.get_ranked()] == ["a.asc"]
+    with open(tmp_path.joinpath(INDEX_FILENAME)) as index_file:
+        assert list(json.load(index_file)["entries"]) == ["a.asc"]
@@ -0,0 +1,48 @@
+import numpy as np
+from numpy.random import default_rng
+from Racing import Race, MIN_SAMPLES
+
+def test_eliminates_clearly_worse():
+    rand = default_rng(0)
+    means = np.array([10.0, 9.5, 5.0, 1.0])
+    race = Race(4, 2, 2.0)
+    for sample in range(4):
+        for i in range(4):
+            race.add(i, means[i] + rand.normal(scale=0.1))
+    assert list(race.eliminate()) == [2, 3]
+    assert not race.is_eliminated(0) and not race.is_eliminated(1)
+    assert race.is_eliminated(3)
+    # Elites are never eliminated, however long they are sampled
+    for sample in range(20):
+        for i in range(2):
+            race.add(i, means[i] + rand.normal(scale=0.1))
+            assert not race.eliminate(i)
+
+def test_needs_samples_and_variance_estimate():
+    race = Race(3, 1, 2.0)
+    race.add(0, 10.0)
+    race.add(1, 0.0)
+    # No circuit has two samples, so the spread is unknown
+    assert race.eliminate().size == 0
+    race.add(0, 10.0)
+    # The spread is now known, but circuit 1 has fewer than MIN_SAMPLES samples
+    assert MIN_SAMPLES == 2
+    assert not race.eliminate(1)
+    race.add(1, 0.0)
+    assert race.eliminate(1)
+
+def test_contenders_straddle_threshold():
+    race = Race(4, 1, 2.0)
+    for value in [10.0, 11.0]:
+        race.add(0, value)
+    for value in [9.0, 11.0]:
+        race.add(1, value)
+    for value in [-20.0, -19.0]:
+        race.add(2, value)
+    race.eliminate()
+    lower, upper = race.bounds()
+    assert race.is_eliminated(2)
+    # Circuit 0 sets the threshold, circuit 1 may still beat it, and 3 has no samples
+    assert list(race.contenders()) == [1]
+    assert upper[1] >= lower[0] > lower[1]
+    assert list(race.get_sample_counts()) == [2, 2, 2, 0]
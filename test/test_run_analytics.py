@@ -0,0 +1,81 @@
+import tarfile
+import numpy as np
+from RunAnalytics import (find_runs, load_runs, parse_run, parse_best_live_data, parse_generation_data,
+    summarize_runs, aggregate, best_fitness_curves, OVERALL_BEST)
+
+BEST = (
+    "1, 1.0, 0.0, 0.5, 1.0, 3\n"
+    "2, 2.0, 0.0, 1.0, 2.0, 3\n"
+    "3, 1.5, 0.5, 1.0, 2.0, 2\n"
+    "4, 4.0, 1.0, 2.0, 4.0, 1\n"
+)
+PULSES = "1:100,5000\n2:9990,0\n3:10000,-1\n"
+CONFIG = "[FITNESS PARAMETERS]\nfitness_func = PULSE_COUNT\ndesired_freq = 10000\n"
+
+def make_run(directory, best=BEST, pulses=PULSES):
+    directory.mkdir(parents=True)
+    directory.joinpath("bestlivedata.log").write_text(best)
+    directory.joinpath("violinlivedata.log").write_text("1:1.0,0.0\n2:2.0,0.0\n3:1.5,0.5\n4:4.0,1.0\n")
+    directory.joinpath("pulselivedata.log").write_text(pulses)
+    directory.joinpath("builtconfig.ini").write_text(CONFIG)
+    return directory
+
+def test_parse_live_data():
+    best = parse_best_live_data(BEST + "5, 4.0, 1.0")
+    assert best.shape == (4, 6)
+    assert best[3, OVERALL_BEST] == 4.0
+    epochs, values = parse_generation_data("1:1,2,3\n2:4,5\n")
+    assert list(epochs) == [1, 2]
+    assert np.array_equal(values, [[1, 2, 3], [4, 5, np.nan]], equal_nan=True)
+    assert parse_generation_data("")[1].shape == (0, 0)
+
+def test_find_and_parse_runs(tmp_path):
+    run = make_run(tmp_path.joinpath("experiments", "a"))
+    # A run killed while writing its last line
+    make_run(tmp_path.joinpath("experiments", "nested", "b"), best=BEST + "5, 4.0", pulses=PULSES + "4:12")
+    with tarfile.open(tmp_path.joinpath("experiments", "c.tar.gz"), "w:gz") as archive:
+        archive.add(run, arcname="c")
+    paths = find_runs([tmp_path.joinpath("experiments")])
+    assert [path[len(str(tmp_path)):] for path in paths] == ["/experiments/c.tar.gz", "/experiments/a", "/experiments/nested/b"]
+    for path in paths:
+        parsed = parse_run(path)
+        assert parsed.best.shape == (4, 6)
+        assert parsed.pulses.shape == (3, 2) and parsed.violin.shape == (4, 2)
+        assert parsed.fitness_func == "PULSE_COUNT" and parsed.desired_freq == 10000
+
+def test_cache(tmp_path):
+    run = make_run(tmp_path.joinpath("a"))
+    cache = tmp_path.joinpath("cache")
+    first, = load_runs([str(run)], cache, workers=1)
+    assert len(list(cache.iterdir())) == 1
+    cached, = load_runs([str(run)], cache, workers=1)
+    assert np.array_equal(cached.best, first.best) and cached.desired_freq == 10000
+    # A changed file is parsed again
+    run.joinpath("bestlivedata.log").write_text(BEST + "5, 5.0, 1.0, 2.0, 5.0, 1\n")
+    updated, = load_runs([str(run)], cache, workers=1)
+    assert updated.best.shape == (5, 6)
+
+def test_parallel_load(tmp_path):
+    paths = [str(make_run(tmp_path.joinpath(str(i)))) for i in range(3)]
+    runs = load_runs(paths, workers=2)
+    assert [run.name for run in runs] == paths
+    assert all(run.best.shape == (4, 6) for run in runs)
+
+def test_statistics(tmp_path):
+    slow = parse_run(str(make_run(tmp_path.joinpath("slow"), best=BEST[:BEST.index("4,")], pulses="1:0,0\n")))
+    fast = parse_run(str(make_run(tmp_path.joinpath("fast"))))
+
+    table = summarize_runs([slow, fast], tolerance=10)
+    assert list(table["success"]) == [False, True]
+    assert np.array_equal(table["success_generation"], [np.nan, 2], equal_nan=True)
+    assert list(table["convergence_generation"]) == [2, 4]
+    stats = aggregate(table)
+    assert stats["success_rate"] == 0.5 and stats["success_generation_median"] == 2
+
+    table = summarize_runs([slow, fast], target_fitness=2.0)
+    assert list(table["success_generation"]) == [2, 2]
+    assert aggregate(table)["success_rate"] == 1.0
+
+    generations, curves = best_fitness_curves([slow, fast])
+    assert list(generations) == [0, 1, 2, 3, 4]
+    assert np.array_equal(curves, [[np.nan, 1, 2, 2, 2], [np.nan, 1, 2, 2, 4]], equal_nan=True)
@@ -0,0 +1,65 @@
+import numpy as np
+from numpy.random import default_rng
+import Selection
+
+def test_fitness_proportions():
+    assert np.allclose(Selection.fitness_proportions(np.array([3.0, 1.0])), [0.75, 0.25])
+    assert np.allclose(Selection.fitness_proportions(np.zeros(4)), [0.25] * 4)
+
+def test_rank_proportions():
+    assert np.allclose(Selection.rank_proportions(3), [3 / 6, 2 / 6, 1 / 6])
+
+def test_draw_parents():
+    rand = default_rng(0)
+    parents = Selection.draw_parents(rand, 10000, np.array([0.75, 0.25]))
+    assert parents.size == 10000
+    assert set(np.unique(parents)) == {0, 1}
+    assert abs(np.mean(parents == 0) - 0.75) < 0.03
+    uniform = Selection.draw_parents(rand, 50)
+    assert uniform.min() >= 0 and uniform.max() < 50
+
+def test_replaceable():
+    fitness = np.array([5.0, 4.0, 4.0, 1.0])
+    parents = np.array([1, 0, 1, 0])
+    # 0 is protected; 1 and 3 are weaker than their parent and 2 ties its parent
+    assert np.array_equal(Selection.replaceable(fitness, parents, 1), [False, True, True, True])
+    # Circuits are never their own parent, and fitter circuits are not replaced
+    assert np.array_equal(Selection.replaceable(fitness, np.array([0, 1, 3, 3]), 0), [False, False, False, False])
+
+def test_tournament_pairs():
+    rand = default_rng(0)
+    fitness = np.arange(11, dtype=float)
+    winners, losers = Selection.tournament_pairs(rand, fitness)
+    assert winners.size == losers.size == 5
+    assert np.all(fitness[winners] >= fitness[losers])
+    # Every circuit is in at most one pair
+    assert np.unique(np.concatenate([winners, losers])).size == 10
+
+def test_tournament_ties_go_to_first():
+    rand = default_rng(0)
+    winners, losers = Selection.tournament_pairs(rand, np.zeros(2))
+    order = default_rng(0).permutation(2)
+    assert winners[0] == order[0] and losers[0] == order[1]
+
+def test_crossover_decisions():
+    rand = default_rng(0)
+    assert Selection.crossover_decisions(rand, 100, 1.0).all()
+    assert not Selection.crossover_decisions(rand, 100, 0.0).any()
+
+def test_tournament_winner():
+    rand = default_rng(0)
+    fitness = np.arange(10, 0, -1, dtype=float)
+    winners = [Selection.tournament_winner(rand, fitness, 2, exclude=0) for i in range(200)]
+    assert 0 not in winners
+    # The better of two circuits wins, so low indices win more often than high ones
+    counts = np.bincount(winners, minlength=10)
+    assert counts[1] > counts[5] > counts[9]
+    # Almost certainly draws the best circuit
+    assert Selection.tournament_winner(rand, fitness, 100) == 0
+
+def test_steady_state_victim():
+    rand = default_rng(0)
+    fitness = np.arange(10, 0, -1, dtype=float)
+    assert Selection.steady_state_victim(rand, fitness, 2, True) == 9
+    victims = [Selection.steady_state_victim(rand, fitness, 2, False) for i in range(200)]
+    assert min(victims) >= 2 and max(victims) == 9
@@ -0,0 +1,51 @@
+from time import time
+import pytest
+from SerialTransport import SimulatedMCU
+from SerialReader import SerialReader
+
+def make_reader(timeout=0.5, **kwargs):
+    args = {"baud": 0, "time_scale": 0, "seed": 0}
+    args.update(kwargs)
+    reader = SerialReader(SimulatedMCU(**args), timeout)
+    reader.start()
+    return reader
+
+def test_pulses():
+    reader = make_reader()
+    result = reader.request_pulses().result()
+    reader.stop()
+    assert not result.timed_out
+    assert int(result.lines[0]) > 0
+    assert reader.get_recent_lines()[-1][1].endswith(b"\r\n")
+
+def test_frame():
+    reader = make_reader()
+    result = reader.request_frame(b'2').result()
+    reader.stop()
+    assert not result.timed_out
+    # 500 samples, then the duration of the capture
+    assert len(result.lines) == 501
+    assert result.lines[0].startswith(b"1: ")
+    assert result.lines[-1].startswith(b"ELAPSED: ")
+
+def test_requests_are_pipelined():
+    reader = make_reader()
+    futures = [reader.request_pulses(), reader.request_frame(b'5'), reader.request_pulses()]
+    results = [future.result() for future in futures]
+    reader.stop()
+    assert len(results[1].lines) == 1000
+    assert all(not result.timed_out for result in results)
+
+def test_timeout():
+    reader = make_reader(timeout=0.1, dropout_rate=1.0)
+    start = time()
+    result = reader.request_pulses().result()
+    assert result.timed_out and result.lines == []
+    assert time() - start < 1
+    reader.stop()
+
+def test_stopped():
+    reader = make_reader()
+    reader.stop()
+    with pytest.raises(RuntimeError):
+        reader.request_pulses()
@@ -0,0 +1,112 @@
+import os
+from pathlib import Path
+from time import time
+from unittest.mock import Mock
+from SerialTransport import SimulatedMCU, open_serial_transport, READ_SIGNAL, READ_ENVIRONMENT
+from Microcontroller import Microcontroller
+
+def make_mcu(**kwargs):
+    args = {"baud": 0, "time_scale": 0, "timeout": 0.2, "seed": 0}
+    args.update(kwargs)
+    return SimulatedMCU(**args)
+
+def test_pulse_count():
+    mcu = make_mcu()
+    mcu.write(b'1')
+    line = mcu.read_until()
+    assert line.endswith(b"\r\n")
+    assert int(line.strip()) >= 0
+
+def test_signal_capture():
+    mcu = make_mcu()
+    mcu.write(b'2')
+    lines = []
+    while True:
+        line = mcu.read_until()
+        if line == b"":
+            break
+        lines.append(line)
+    assert lines[:3] == [b"START\n"] * 3
+    assert lines[-3:] == [b"FINISHED\n"] * 3
+    # Output is delivered instantly, so the capture took no time
+    assert lines[-4] == b"ELAPSED: 0\n"
+    samples = lines[3:-4]
+    assert len(samples) == 500
+    index, value = samples[0].split(b": ")
+    assert int(index) == 1
+    assert 0 <= int(value) <= 1023
+
+def test_td_capture():
+    mcu = make_mcu()
+    mcu.write(b'5')
+    lines = [mcu.read_until() for _ in range(1006)]
+    assert len(lines[3].split(b" ")) == 3
+    assert lines[-1] == b"FINISHED\n"
+
+def test_switch_fpga_has_no_reply():
+    mcu = make_mcu()
+    mcu.write(b'4')
+    assert mcu.read_until() == b""
+
+def test_environment():
+    mcu = make_mcu(sketch=READ_ENVIRONMENT)
+    mcu.write(b'5')
+    temperature = float(mcu.read_until())
+    mcu.write(b'6')
+    humidity = float(mcu.read_until())
+    assert 0 < temperature < 50
+    assert 0 < humidity < 100
+
+def test_baud_pacing():
+    # 500 lines of about 8 bytes at 115200 baud take about 0.35s to transmit
+    mcu = make_mcu(baud=115200, timeout=2)
+    start = time()
+    mcu.write(b'2')
+    while mcu.read_until() != b"FINISHED\n":
+        pass
+    assert time() - start > 0.2
+
+def test_dropout():
+    mcu = make_mcu(dropout_rate=1.0, timeout=0.05)
+    mcu.write(b'1')
+    assert mcu.read_until() == b""
+
+def test_malformed():
+    mcu = make_mcu(malformed_rate=1.0)
+    mcu.write(b'2')
+    assert mcu.read_until() != b"START\n"
+
+def test_reset_input_buffer():
+    mcu = make_mcu()
+    mcu.write(b'1')
+    assert mcu.in_waiting > 0
+    mcu.reset_input_buffer()
+    assert mcu.in_waiting == 0
+
+def test_factory():
+    config = Mock()
+    config.get_serial_transport.return_value = "SIMULATED"
+    config.get_simulated_baud.return_value = 0
+    config.get_simulated_time_scale.return_value = 0
+    config.get_simulated_dropout_rate.return_value = 0
+    config.get_simulated_malformed_rate.return_value = 0
+    config.get_mcu_read_timeout.return_value = 0.5
+    assert isinstance(open_serial_transport(config, "/dev/null", READ_SIGNAL), SimulatedMCU)
+
+def test_microcontroller_pulses():
+    config = Mock()
+    config.get_simulation_mode.return_value = "FULLY_INTRINSIC"
+    config.reading_temp_humidity.return_value = False
+    config.get_serial_transport.return_value = "SIMULATED"
+    config.get_simulated_baud.return_value = 0
+    config.get_simulated_time_scale.return_value = 0
+    config.get_simulated_dropout_rate.return_value = 0
+    config.get_simulated_malformed_rate.return_value = 0
+    config.get_mcu_read_timeout.return_value = 0.5
+    mcu = Microcontroller(config, Mock())
+
+    os.makedirs(os.path.join('test', 'out'), exist_ok=True)
+    data_filepath = Path(os.path.join('test', 'out', 'simulated_pulses.log'))
+    mcu.simple_measure_pulses(data_filepath)
+    with open(data_filepath, "r") as data_file:
+        assert int(data_file.read().strip()) > 0
@@ -0,0 +1,77 @@
+import json
+from time import sleep
+from StageTimer import StageTimer
+
+def test_disabled():
+    timer = StageTimer()
+    assert not timer.is_enabled()
+    with timer.stage("compile"):
+        pass
+    assert timer.end_generation(1).keys() == {"total"}
+
+def test_stage_accumulation(tmp_path):
+    timer = StageTimer()
+    timer.configure(tmp_path.joinpath("timing.log"))
+    timer.begin_generation()
+    for i in range(3):
+        with timer.stage("measure"):
+            # Nested stages are included in the outer stage's time
+            with timer.stage("parse"):
+                sleep(0.01)
+    breakdown = timer.end_generation(1)
+    assert breakdown.keys() == {"measure", "parse", "total"}
+    assert breakdown["parse"] >= 0.03
+    assert breakdown["measure"] >= breakdown["parse"]
+    assert breakdown["total"] >= breakdown["measure"]
+
+def test_end_generation(tmp_path):
+    log_path = tmp_path.joinpath("timing.log")
+    timer = StageTimer()
+    timer.configure(log_path)
+    # Stages before the generation starts are discarded
+    with timer.stage("randomize"):
+        pass
+    timer.begin_generation()
+    with timer.stage("compile"):
+        pass
+    with timer.stage("compile"):
+        pass
+    assert timer.end_generation(1).keys() == {"compile", "total"}
+    # The totals start again every generation
+    assert timer.end_generation(2).keys() == {"total"}
+
+    lines = log_path.read_text().splitlines()
+    assert len(lines) == 2
+    epoch, entries = lines[0].split(":")
+    assert epoch == "1"
+    entries = entries.split(",")
+    assert entries[0].startswith("compile=") and entries[0].endswith("/2")
+    assert entries[-1].startswith("total=")
+    assert lines[1].startswith("2:total=")
+
+def test_trace(tmp_path):
+    trace_path = tmp_path.joinpath("timing_trace.json")
+    timer = StageTimer()
+    timer.configure(None, trace_path)
+    for epoch in range(1, 3):
+        timer.begin_generation()
+        with timer.stage("upload"):
+            with timer.stage("iceprog"):
+                pass
+        timer.end_generation(epoch)
+
+    # The trace-event format allows the array to be left open, so that the file can be read
+    # while it is being written
+    text = trace_path.read_text()
+    assert text.startswith("[\n")
+    events = json.loads(text.rstrip().rstrip(",") + "]")
+    assert [event["name"] for event in events] == ["iceprog", "upload"] * 2
+    for event in events:
+        # Complete events, with their times in microseconds
+        assert event["ph"] == "X"
+        assert event["ts"] >= 0 and event["dur"] >= 0
+        assert isinstance(event["pid"], int) and isinstance(event["tid"], int)
+    # The outer stage starts before and ends after the stage inside it
+    iceprog, upload = events[:2]
+    assert upload["ts"] <= iceprog["ts"]
+    assert upload["ts"] + upload["dur"] >= iceprog["ts"] + iceprog["dur"]
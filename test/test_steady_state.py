@@ -0,0 +1,79 @@
+import os
+from unittest.mock import Mock
+import numpy as np
+import Selection
+from Config import Config
+from ConfigBuilder import ConfigBuilder
+from PopulationArrays import PopulationArrays
+
+POPULATION_SIZE = 10
+GENERATIONS = 4
+LIVE_DATA_FILES = ["alllivedata.log", "bestlivedata.log", "violinlivedata.log", "poplivedata.log", "bitstream_avg.log"]
+
+def build_config(tmp_path):
+    base_config = os.path.join(os.getcwd(), "data", "default_config.ini")
+    primary_config = tmp_path.joinpath("config.ini")
+    primary_config.write_text(
+        "[TOP-LEVEL PARAMETERS]\n"
+        "simulation_mode = FULLY_SIM\n"
+        "base_config = " + base_config + "\n"
+        "[GA PARAMETERS]\n"
+        "population_size = " + str(POPULATION_SIZE) + "\n"
+        "elitism_fraction = 0.2\n"
+        "evolution_mode = STEADY_STATE\n"
+        "steady_state_replacement = TOURNAMENT\n"
+        "[INITIALIZATION PARAMETERS]\n"
+        "init_mode = RANDOM\n"
+        "[STOPPING CONDITION PARAMETERS]\n"
+        "generations = " + str(GENERATIONS) + "\n"
+        "[LOGGING PARAMETERS]\n"
+        "log_level = 0\n"
+        "background_bookkeeping = false\n")
+    built_config = tmp_path.joinpath("built_config.ini")
+    ConfigBuilder(str(primary_config)).build_config(str(built_config))
+    config = Config(str(built_config))
+    config.add_logger(Mock())
+    return config
+
+def test_steady_state_run(tmp_path, monkeypatch):
+    config = build_config(tmp_path)
+    # The live data files are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("workspace")
+    # Created by the Logger in a real run
+    for name in LIVE_DATA_FILES:
+        open(os.path.join("workspace", name), "w").close()
+
+    victims = []
+    choose_victim = Selection.steady_state_victim
+    def checked_victim(rand, fitness, n_protected, replace_worst):
+        victim = choose_victim(rand, fitness, n_protected, replace_worst)
+        victims.append((victim, n_protected))
+        return victim
+    monkeypatch.setattr(Selection, "steady_state_victim", checked_victim)
+
+    updates = []
+    update = PopulationArrays.update
+    def checked_update(self, index):
+        rank = update(self, index)
+        updates.append(bool(np.all(np.diff(self.get_fitness()) <= 0)))
+        return rank
+    monkeypatch.setattr(PopulationArrays, "update", checked_update)
+
+    # Imported here so that the population uses the patched helpers
+    from CircuitPopulation import CircuitPopulation
+    population = CircuitPopulation(Mock(), config, Mock())
+    population.populate()
+    population.evolve()
+
+    # The run stops when it reaches generation GENERATIONS. The first generation is measured as a
+    # whole, every later one is population_size replacements
+    generations_run = GENERATIONS - 1
+    assert len(victims) == (generations_run - 1) * POPULATION_SIZE
+    # The protected elites are never replaced
+    assert all(victim >= n_protected >= 2 for victim, n_protected in victims)
+    # The population stays ranked after every replacement
+    assert len(updates) == len(victims) and all(updates)
+    for name in ["bestlivedata.log", "violinlivedata.log"]:
+        with open(os.path.join("workspace", name)) as live_file:
+            assert len(live_file.read().splitlines()) == generations_run
@@ -0,0 +1,21 @@
+import numpy as np
+from numpy.random import default_rng
+from Surrogate import RidgeSurrogate
+
+def test_ranks_linear_fitness():
+    rand = default_rng(0)
+    weights = rand.normal(size=300)
+    bits = rand.integers(0, 2, (400, 300), dtype=np.uint8)
+    surrogate = RidgeSurrogate(capacity=300)
+    assert len(surrogate) == 0
+    surrogate.add(bits, bits @ weights)
+    assert len(surrogate) == 300
+    surrogate.fit()
+
+    candidates = rand.integers(0, 2, (100, 300), dtype=np.uint8)
+    predicted = surrogate.predict(candidates)
+    assert np.corrcoef(predicted, candidates @ weights)[0, 1] > 0.8
+
+def test_unfit_predicts_mean():
+    surrogate = RidgeSurrogate()
+    assert np.all(surrogate.predict(np.zeros((3, 10), dtype=np.uint8)) == 0.0)
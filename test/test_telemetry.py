@@ -0,0 +1,43 @@
+import time
+from Telemetry import TelemetryBus, TelemetryClient, LiveData, parse_address
+
+def wait_for(condition, timeout=5.0):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end
+        time.sleep(0.01)
+
+def test_live_data():
+    live = LiveData()
+    live.apply({"op": "append", "stream": "best", "text": "1, 2\n"})
+    live.apply({"op": "append", "stream": "best", "text": "2, 3\n"})
+    live.apply({"op": "set_line", "stream": "all", "line": 2, "text": "3,5,\n"})
+    assert live.read("best") == "1, 2\n2, 3\n"
+    assert live.read("all") == "\n\n3,5,\n"
+    live.apply({"op": "replace", "stream": "best", "text": "x\n"})
+    copy = LiveData()
+    copy.apply(live.snapshot())
+    assert copy.read("best") == "x\n" and copy.read("all") == "\n\n3,5,\n"
+    assert copy.read("missing") == ""
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/plots.sock")[1] == "/tmp/plots.sock"
+    assert parse_address("0.0.0.0:8765")[1] == ("0.0.0.0", 8765)
+
+def test_subscriber_gets_snapshot_and_deltas(tmp_path):
+    address = "unix:" + str(tmp_path.joinpath("telemetry.sock"))
+    bus = TelemetryBus()
+    # Publishing before the bus starts does nothing
+    bus.append("bestlivedata.log", "0, 0\n")
+    bus.start(address)
+    bus.append("bestlivedata.log", "1, 5\n")
+    client = TelemetryClient(address)
+    assert client.wait_for_snapshot(5.0)
+    assert client.read("bestlivedata.log") == "1, 5\n"
+    bus.append("bestlivedata.log", "2, 6\n")
+    bus.set_line("alllivedata.log", 1, "2,6,\n")
+    wait_for(lambda: client.read("alllivedata.log") == "\n2,6,\n")
+    assert client.read("bestlivedata.log") == "1, 5\n2, 6\n"
+    bus.stop()
+    wait_for(lambda: not client.is_connected())
+    client.close()
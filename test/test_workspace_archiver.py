@@ -0,0 +1,34 @@
+import tarfile
+from WorkspaceArchiver import archive_workspace, WorkspaceArchiver
+
+def make_workspace(root):
+    root.joinpath("plots").mkdir(parents=True)
+    root.joinpath("experiment_bin").mkdir()
+    root.joinpath("template").mkdir()
+    root.joinpath("bestlivedata.log").write_text("1, 2\n")
+    root.joinpath("pulselivedata.log").write_text("")
+    root.joinpath("plots", "fitness.png").write_bytes(b"png")
+    root.joinpath("experiment_bin", "hardware1.bin").write_bytes(b"bin")
+
+def test_directory_filtered(tmp_path):
+    workspace = tmp_path.joinpath("workspace")
+    make_workspace(workspace)
+    destination = archive_workspace(workspace, tmp_path.joinpath("out"), "DIRECTORY", ["experiment_bin"], drop_empty_logs=True)
+    files = sorted(str(path.relative_to(destination)) for path in destination.rglob("*") if path.is_file())
+    assert files == ["bestlivedata.log", "plots/fitness.png"]
+    # Empty directories are kept
+    assert destination.joinpath("template").is_dir()
+
+def test_tar_in_background(tmp_path):
+    workspace = tmp_path.joinpath("workspace")
+    make_workspace(workspace)
+    archiver = WorkspaceArchiver()
+    archiver.submit(workspace, tmp_path.joinpath("gz"), "TAR_GZ")
+    archiver.submit(workspace, tmp_path.joinpath("xz"), "TAR_XZ")
+    for path in archiver.wait():
+        with tarfile.open(path) as archive:
+            names = sorted(archive.getnames())
+            top = path.name.split(".")[0]
+            assert names == [top + "/" + name for name in ["bestlivedata.log", "experiment_bin", "experiment_bin/hardware1.bin",
+                "plots", "plots/fitness.png", "pulselivedata.log", "template"]]
+            assert archive.extractfile(top + "/bestlivedata.log").read() == b"1, 2\n"